@@ -0,0 +1,67 @@
+"""Create broadcast_runs and broadcast_deliveries for resumable broadcasts
+
+Revision ID: 20261016_broadcast_runs
+Revises: 20260411_lectory_questions
+Create Date: 2026-10-16 00:00:00.000000
+"""
+from __future__ import annotations
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "20261016_broadcast_runs"
+down_revision: Union[str, Sequence[str], None] = "20260411_lectory_questions"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "broadcast_runs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("key", sa.String(length=128), nullable=False, unique=True),
+        sa.Column("title", sa.Text(), nullable=True),
+        sa.Column("status", sa.String(length=16), nullable=False, server_default="running"),
+        sa.Column("total", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("sent", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("blocked", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("errors", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("last_user_id", sa.BigInteger(), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.TIMESTAMP(timezone=True),
+            nullable=False,
+            server_default=sa.text("TIMEZONE('utc', NOW())"),
+        ),
+        sa.Column(
+            "updated_at",
+            sa.TIMESTAMP(timezone=True),
+            nullable=False,
+            server_default=sa.func.now(),
+        ),
+    )
+    op.create_table(
+        "broadcast_deliveries",
+        sa.Column(
+            "run_id",
+            sa.Integer(),
+            sa.ForeignKey("broadcast_runs.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("user_id", sa.BigInteger(), primary_key=True),
+        sa.Column("status", sa.String(length=16), nullable=False),
+        sa.Column("attempts", sa.SmallInteger(), nullable=False, server_default="1"),
+        sa.Column(
+            "updated_at",
+            sa.TIMESTAMP(timezone=True),
+            nullable=False,
+            server_default=sa.func.now(),
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("broadcast_deliveries")
+    op.drop_table("broadcast_runs")
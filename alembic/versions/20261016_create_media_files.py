@@ -0,0 +1,43 @@
+"""Create media_files: content-addressed Telegram file_id registry
+
+Revision ID: 20261016_media_files
+Revises: 20261016_users_roles_gin
+Create Date: 2026-10-16 00:00:00
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "20261016_media_files"
+down_revision = "20261016_users_roles_gin"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "media_files",
+        sa.Column("bot_id", sa.BigInteger(), primary_key=True),
+        sa.Column("content_hash", sa.String(length=64), primary_key=True),
+        sa.Column("kind", sa.String(length=16), primary_key=True),
+        sa.Column("file_id", sa.Text(), nullable=False),
+        sa.Column("source_path", sa.Text(), nullable=True),
+        sa.Column("size", sa.BigInteger(), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.TIMESTAMP(timezone=True),
+            nullable=False,
+            server_default=sa.text("TIMEZONE('utc', NOW())"),
+        ),
+        sa.Column(
+            "updated_at",
+            sa.TIMESTAMP(timezone=True),
+            nullable=False,
+            server_default=sa.func.now(),
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("media_files")
@@ -0,0 +1,28 @@
+"""Add GIN index on users.roles for audience segment queries
+
+Revision ID: 20261016_users_roles_gin
+Revises: 20261016_broadcast_runs
+Create Date: 2026-10-16 00:00:00
+"""
+from __future__ import annotations
+
+from alembic import op
+
+revision = "20261016_users_roles_gin"
+down_revision = "20261016_broadcast_runs"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Serves `roles ?| ARRAY[...]` from compiled segments and `roles ? :role`
+    op.create_index(
+        "idx_users_roles_gin",
+        "users",
+        ["roles"],
+        postgresql_using="gin",
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_users_roles_gin", table_name="users")
@@ -1,9 +1,11 @@
 """
-Main app module. Telegram bot polling entrypoint
+Main app module. Telegram bot entrypoint (long polling or webhook)
 """
 from __future__ import annotations
 
+import asyncio
 import logging
+import signal
 from typing import Any
 
 from redis.asyncio import Redis
@@ -15,7 +17,6 @@ from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
 
 from aiogram.fsm.storage.base import DefaultKeyBuilder
-from aiogram.fsm.storage.redis import RedisStorage
 from aiogram_dialog import setup_dialogs
 
 from config.config import load_config
@@ -31,8 +32,16 @@ from app.bot.middlewares.error_handler import ErrorHandlerMiddleware
 from app.bot.handlers.feedback_callbacks import feedback_callbacks_router
 from app.bot.handlers.admin_lock import setup_admin_lock_router
 from app.bot.middlewares.admin_lock import AdminLockMiddleware
+from app.bot.middlewares.chat_ordering import ChatOrderingMiddleware
+from app.bot.middlewares.fsm_session import FsmSessionMiddleware
+from app.bot.middlewares.throttling import ThrottlingMiddleware
+from app.bot.middlewares.user_context import UserContextMiddleware
+from app.infrastructure.storage.storage.codec import FsmCodec
+from app.infrastructure.storage.storage.redis_storage import IndexedRedisStorage
 
 from app.bot.routers import public_router
+from app.bot.update_stream import UpdateStreamProducer, run_stream_worker
+from app.bot.webhook import run_webhook
 
 
 
@@ -54,7 +63,14 @@ from app.bot.dialogs.forum import forum_dialog
 from app.bot.dialogs.career_fair import career_fair_dialog
 from app.bot.dialogs.lectory import lectory_dialog
 
+from app.services.broadcast import (
+    PriorityRequestMiddleware,
+    RetryAfterFeedbackMiddleware,
+    get_default_limiter,
+)
 from app.services.photo_file_id_manager import startup_photo_check
+from app.services.user_presence import UserPresence
+from app.services.vol_part2_timer import init_timer_wheel
 from app.services.task_file_id_manager import startup_task_files_check
 
 logger = logging.getLogger(__name__)
@@ -95,13 +111,32 @@ async def _init_redis_storage(config):
             config.redis.port,
         )
 
-        storage = RedisStorage(
+        if config.storage.backend == "nats":
+            # Redis stays for locks, throttling, streams and caches
+            return redis_client, await _init_nats_storage(config)
+
+        # Indexes each chat's keys: force-finish reads and wipes them without SCAN
+        storage = IndexedRedisStorage(
             redis=redis_client,
             key_builder=DefaultKeyBuilder(with_bot_id=True, with_destiny=True),
-            state_ttl=86400,  # FSM state life (seconds)
-            data_ttl=86400,  # date life (seconds)
+            state_ttl=config.storage.state_ttl,  # FSM state life (seconds)
+            data_ttl=config.storage.data_ttl,  # date life (seconds)
+            codec=FsmCodec(
+                config.storage.format,
+                compress_min_bytes=config.storage.compress_min_bytes,
+            ),
+            prefetch_max_keys=config.storage.prefetch_max_keys,
         )
-        logger.info("Redis FSM storage created successfully")
+        logger.info(
+            "Redis FSM storage created successfully (format=%s, zstd from %s bytes)",
+            config.storage.format,
+            config.storage.compress_min_bytes or "-",
+        )
+        if not await storage.is_index_ready():
+            logger.warning(
+                "FSM key index not built yet: run scripts/utils/rebuild_fsm_index.py once "
+                "(until then keys missing from the index are read one by one)"
+            )
         return redis_client, storage
 
     except ConnectionError as exc:
@@ -126,6 +161,33 @@ async def _init_redis_storage(config):
         raise
 
 
+async def _init_nats_storage(config):
+    """Connect to NATS and create the JetStream KV FSM storage."""
+    from app.infrastructure.storage.nats_connect import connect_to_nats
+    from app.infrastructure.storage.storage.nats_storage import NatsStorage
+
+    logger.info("Connecting to NATS at %s...", ", ".join(config.storage.nats_servers))
+    nc, js = await connect_to_nats(config.storage.nats_servers)
+    storage = await NatsStorage(
+        nc,
+        js,
+        key_builder=DefaultKeyBuilder(with_bot_id=True, with_destiny=True),
+        state_ttl=config.storage.state_ttl,
+        data_ttl=config.storage.data_ttl,
+        history=config.storage.nats_history,
+        codec=FsmCodec(
+            config.storage.format,
+            compress_min_bytes=config.storage.compress_min_bytes,
+        ),
+    ).create_storage()
+    logger.info(
+        "NATS FSM storage created successfully (format=%s, history %d)",
+        config.storage.format,
+        config.storage.nats_history,
+    )
+    return storage
+
+
 async def _init_database(config, redis_client):
     """Ensure SQLAlchemy engine and session factory are ready."""
     db_cfg = config.db
@@ -216,9 +278,59 @@ def _configure_dispatcher(
     )
 
     logger.info("Including middlewares")
-    dp.update.middleware(AdminLockMiddleware(config.admin_ids, storage))
+    # Stream workers rely on it for per-chat order, whatever UPDATES_ORDERED says
+    ordered = config.updates.ordered or config.updates.mode == "worker"
+    if ordered:
+        # First outer middleware: it takes the chat lane before anything awaits,
+        # so one chat's updates stay in arrival order
+        update_ordering = ChatOrderingMiddleware(max_concurrency=config.updates.max_concurrency)
+        dp["update_ordering"] = update_ordering
+        dp.update.outer_middleware(update_ordering)
+        logger.info(
+            "Per-chat update ordering on, max %d concurrent handlers",
+            config.updates.max_concurrency,
+        )
+
+    if config.updates.throttle:
+        # Floods are dropped before they touch the DB or render a dialog
+        throttling = ThrottlingMiddleware(
+            redis_client,
+            rate=config.updates.throttle_rate,
+            burst=config.updates.throttle_burst,
+            dedup_window=config.updates.throttle_dedup_window,
+            exempt_ids=config.admin_ids,
+        )
+        dp["throttling"] = throttling
+        dp.update.outer_middleware(throttling)
+        logger.info(
+            "Per-user throttling on: %.1f updates/s, burst %d",
+            config.updates.throttle_rate,
+            config.updates.throttle_burst,
+        )
+
+    if config.storage.pipeline and isinstance(storage, IndexedRedisStorage):
+        if ordered:
+            # Takes the place of the dispatcher's FSMContextMiddleware, inside the chat lane
+            dp.update.outer_middleware.unregister(dp.fsm)
+            dp.fsm = FsmSessionMiddleware(
+                storage=storage,
+                events_isolation=dp.fsm.events_isolation,
+                strategy=dp.fsm.strategy,
+            )
+            dp.update.outer_middleware(dp.fsm)
+            logger.info("FSM storage pipelining on: one prefetch and one write-back per update")
+        else:
+            logger.warning("FSM_PIPELINE needs per-chat ordering (UPDATES_ORDERED); left off")
+
+    admin_lock_middleware = AdminLockMiddleware(config.admin_ids, redis_client)
+    dp.update.middleware(admin_lock_middleware)
+    dp.shutdown.register(admin_lock_middleware.lock_flag.close)
 
     dp.update.middleware(ErrorHandlerMiddleware())
+    # Outside DatabaseMiddleware: it drops cached contexts after the commit
+    user_ctx_middleware = UserContextMiddleware(session_factory, redis_client)
+    dp["user_ctx_middleware"] = user_ctx_middleware
+    dp.update.middleware(user_ctx_middleware)
     dp.update.middleware(DatabaseMiddleware())
 
     bg_factory = setup_dialogs(dp)
@@ -226,8 +338,72 @@ def _configure_dispatcher(
     return dp, bg_factory
 
 
+def _install_stop_signals(stop_event: asyncio.Event) -> None:
+    """Stop the webhook server or stream worker on SIGINT/SIGTERM (polling handles them itself)."""
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:  # Windows
+            pass
+
+
+async def _receive_updates(config, dp: Dispatcher, bot: Bot, redis_client, **kwargs: Any) -> None:
+    """Run until stopped in the configured mode (``UPDATES_MODE``, ``WEBHOOK_ENABLED``)."""
+    mode = config.updates.mode
+    if mode == "worker":
+        stop_event = asyncio.Event()
+        _install_stop_signals(stop_event)
+        await run_stream_worker(
+            dp,
+            bot,
+            redis_client,
+            worker_index=config.updates.worker_index,
+            workers=config.updates.workers,
+            partitions=config.updates.stream_partitions,
+            stop_event=stop_event,
+            **kwargs,
+        )
+        return
+
+    allowed_updates = None
+    handle_as_tasks = True
+    if mode == "ingest":
+        # Receive only: every update goes to the stream in arrival order, workers handle it
+        allowed_updates = dp.resolve_used_update_types()
+        dp = Dispatcher()
+        dp.update.outer_middleware(
+            UpdateStreamProducer(
+                redis_client,
+                partitions=config.updates.stream_partitions,
+                maxlen=config.updates.stream_maxlen,
+            )
+        )
+        handle_as_tasks = False
+        kwargs = {}
+        logger.info("Ingest mode: updates go to %d stream partitions", config.updates.stream_partitions)
+
+    if config.webhook is not None:
+        stop_event = asyncio.Event()
+        _install_stop_signals(stop_event)
+        await run_webhook(
+            dp,
+            bot,
+            config.webhook,
+            stop_event=stop_event,
+            inline=mode == "ingest",
+            allowed_updates=allowed_updates,
+            **kwargs,
+        )
+    else:
+        await bot.delete_webhook(drop_pending_updates=True)
+
+        polling_options = {"allowed_updates": allowed_updates} if allowed_updates is not None else {}
+        await dp.start_polling(bot, handle_as_tasks=handle_as_tasks, **polling_options, **kwargs)
+
+
 async def main():
-    """Configure dependencies and run the Telegram bot polling loop."""
+    """Configure dependencies and receive updates by polling or webhook."""
     logger.info("Loading config")
     config = load_config()
 
@@ -239,6 +415,11 @@ async def main():
         token=config.tg_bot.token,
         default=DefaultBotProperties(parse_mode=ParseMode.HTML),
     )
+    # Dialog traffic takes the interactive lane of the shared limiter, so
+    # in-process broadcasts only get the capacity it leaves over; flood-control
+    # answers to any request slow broadcasts down too
+    bot.session.middleware(PriorityRequestMiddleware(get_default_limiter()))
+    bot.session.middleware(RetryAfterFeedbackMiddleware(get_default_limiter()))
 
     redis_client, storage = await _init_redis_storage(config)
     session_factory = await _init_database(config, redis_client)
@@ -251,6 +432,13 @@ async def main():
         storage=storage,
     )
 
+    # Registration and last-seen marks for DatabaseMiddleware (write-behind)
+    user_presence = UserPresence(session_factory, redis_client)
+    dp["user_presence"] = user_presence
+
+    # Volunteer part 2 test deadlines (reminders, force finish); polled by every process
+    timer_wheel = init_timer_wheel(redis_client)
+
     from app.services.app_container import setup_container
     setup_container(bot=bot, dp=dp)
     logger.info("✅ AppContainer initialized")
@@ -262,7 +450,7 @@ async def main():
     try:
         logger.info(
             "Photo file_id check completed. Total photos: %d",
-            len(await startup_photo_check(bot)),
+            len(await startup_photo_check(bot, session_factory=session_factory)),
         )
     except Exception as exc:  # pylint: disable=broad-except
         logger.error("Error during photo file_id check: %s", exc)
@@ -335,18 +523,28 @@ async def main():
         logger.error("Failed to set up scheduler: %s", exc)
 
 
-    # Launch polling
+    # Launch polling, the webhook server or a stream worker
     try:
-        await bot.delete_webhook(drop_pending_updates=True)
-
-        await dp.start_polling(
+        await user_presence.rebuild_known()
+    except Exception as exc:  # pylint: disable=broad-except
+        logger.error("Failed to rebuild known users set: %s", exc)
+    user_presence.start()
+    timer_wheel.start()
+    try:
+        await _receive_updates(
+            config,
+            dp,
             bot,
+            redis_client,
             bg_factory=bg_factory,
             db_session_factory=session_factory,
         )
     except Exception as exc:  # pylint: disable=broad-except
-        logger.exception("Unhandled error while polling: %s", exc)
+        logger.exception("Unhandled error while receiving updates: %s", exc)
     finally:
+        await timer_wheel.stop()
+        await user_presence.stop()
+
         if redis_client:
             try:
                 await redis_client.aclose()
@@ -14,6 +14,7 @@ from aiogram_dialog import DialogManager
 from aiogram_dialog.api.entities import MediaAttachment, MediaId
 from sqlalchemy.exc import SQLAlchemyError
 
+from app.bot.middlewares.user_context import UserContext
 from app.infrastructure.database.dao.feedback import FeedbackDAO
 from app.infrastructure.database.dao.interview import InterviewDAO
 from app.infrastructure.database.database.db import DB
@@ -108,6 +109,27 @@ async def get_support_contacts(
     }
 
 
+async def _get_profile(dialog_manager: DialogManager, user_id: int) -> UserContext | None:
+    """Profile snapshot for the menu: cached user_ctx, else one DB query."""
+    user_ctx: UserContext | None = dialog_manager.middleware_data.get("user_ctx")
+    if user_ctx is not None:
+        return user_ctx
+
+    db: DB | None = dialog_manager.middleware_data.get("db")
+    if db is None:
+        LOGGER.warning("profile snapshot user_id=%d: db is None, skipping DB check", user_id)
+        return None
+    try:
+        row = await db.users.get_profile_snapshot(user_id=user_id)
+    except Exception as exc:  # noqa: BLE001
+        LOGGER.error("profile snapshot: DB error for user %d: %s", user_id, exc)
+        return None
+    profile = UserContext.from_snapshot(user_id, row) if row else UserContext(user_id=user_id)
+    # Shared with the other getters of this render
+    dialog_manager.middleware_data["user_ctx"] = profile
+    return profile
+
+
 async def get_is_admin(
     dialog_manager: DialogManager,
     event_from_user: User,
@@ -119,45 +141,19 @@ async def get_is_admin(
         return {"is_admin": False, "show_casting": False}
     is_admin = event_from_user.id in config.admin_ids
     is_fair_user = event_from_user.id in _FAIR_USER_IDS
+    is_vol_part2_user = event_from_user.id in _VOL_GENERAL_PASSED_IDS
 
-    db: DB | None = dialog_manager.middleware_data.get("db")
+    profile = await _get_profile(dialog_manager, event_from_user.id)
 
     # Hide casting button if user already completed part 2
-    already_done = False
-    if is_fair_user or is_admin:
-        if db:
-            app = await db.creative_applications.get_application(user_id=event_from_user.id)
-            if app is not None:
-                already_done = any([
-                    app.part2_open_q1, app.part2_open_q2, app.part2_open_q3,
-                    app.part2_case_q1, app.part2_case_q2, app.part2_case_q3,
-                ])
-
-    is_vol_part2_user = event_from_user.id in _VOL_GENERAL_PASSED_IDS
-
-    in_csv = is_cert_eligible(event_from_user.id)
-    is_db_participant = False
-    if db:
-        try:
-            reg = await db.forum_registrations.get_by_user_id(user_id=event_from_user.id)
-            LOGGER.debug(
-                "cert check user_id=%d: in_csv=%s, reg=%s, status=%r",
-                event_from_user.id,
-                in_csv,
-                reg,
-                reg.get("status") if reg else None,
-            )
-            is_db_participant = reg is not None and reg.get("status") == "participant"
-        except Exception as exc:  # noqa: BLE001
-            LOGGER.error("get_is_admin: DB error checking forum reg for user %d: %s", event_from_user.id, exc)
-    else:
-        LOGGER.warning("cert check user_id=%d: db is None, skipping DB check", event_from_user.id)
+    already_done = profile is not None and profile.creative_part2_done
+    is_db_participant = profile is not None and profile.forum_status == "participant"
 
     LOGGER.debug(
         "cert visibility user_id=%d: is_admin=%s, in_csv=%s, is_db_participant=%s → show=%s",
         event_from_user.id,
         is_admin,
-        in_csv,
+        is_cert_eligible(event_from_user.id),
         is_db_participant,
         is_admin or is_db_participant,
     )
@@ -176,15 +172,8 @@ async def get_forum_registration_badge(
     **_kwargs: Any,
 ) -> dict[str, Any]:
     """Return registration badge for main menu if user is registered on forum."""
-    db: DB | None = dialog_manager.middleware_data.get("db")
-    is_registered = False
-    if db:
-        try:
-            reg = await db.forum_registrations.get_by_user_id(user_id=event_from_user.id)
-            if reg and reg.get("track"):
-                is_registered = True
-        except Exception as exc:  # noqa: BLE001
-            LOGGER.error("get_forum_registration_badge: DB error for user %d: %s", event_from_user.id, exc)
+    profile = await _get_profile(dialog_manager, event_from_user.id)
+    is_registered = profile is not None and bool(profile.forum_track)
     return {
         "registration_badge": "✅ Ты успешно зарегистрирован на КБК'26!\n\n" if is_registered else "",
     }
@@ -53,7 +53,7 @@ async def on_start_yes(
     now_msk = now_utc + MSK_OFFSET
     deadline_msk = now_msk + timedelta(minutes=FINISH_OFFSET_MIN)
 
-    schedule_user_timer(user_id)
+    await schedule_user_timer(user_id)
     await callback.message.answer(
         STARTED_TEXT.format(
             started=now_msk.strftime("%H:%M"),
@@ -82,7 +82,7 @@ async def on_part2_dialog_close(result: Any, manager: DialogManager) -> None:
     except AttributeError:
         return
     from app.services.vol_part2_timer import cancel_user_timer
-    cancel_user_timer(user_id)
+    await cancel_user_timer(user_id)
     logger.info("[VOL_PART2] Timer cancelled on dialog close for user_id=%d", user_id)
 
 
@@ -291,7 +291,7 @@ async def on_vq3(
     user_id = message.from_user.id
 
     from app.services.vol_part2_timer import cancel_user_timer
-    cancel_user_timer(user_id)
+    await cancel_user_timer(user_id)
 
     try:
         await _save_to_db(dialog_manager, user_id)
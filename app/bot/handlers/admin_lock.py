@@ -5,11 +5,13 @@ from aiogram import Router
 from aiogram.types import Message, CallbackQuery
 from aiogram.filters import Command, Filter
 from aiogram.fsm.context import FSMContext
-from aiogram.fsm.storage.redis import RedisStorage
 from aiogram_dialog import DialogManager, StartMode
+from redis.asyncio import Redis
 
 from app.bot.dialogs.registration.states import RegistrationSG
-from app.utils.rbac import is_lock_mode_enabled
+from app.utils.rbac import LOCK_CHANNEL, is_lock_mode_enabled
+from app.services.broadcast import get_default_limiter
+from app.infrastructure.storage.storage.redis_storage import IndexedRedisStorage
 
 from app.bot.filters.admin import AdminFilter
 
@@ -19,19 +21,16 @@ logger = logging.getLogger(__name__)
 LOCK_KEY = "bot:lock_mode"
 
 
-async def set_lock_mode(storage: RedisStorage, enabled: bool) -> bool:
-    """Set lock mode in Redis storage"""
+async def set_lock_mode(redis: Redis, enabled: bool) -> bool:
+    """Set lock mode in Redis and notify every bot process"""
+    value = "1" if enabled else "0"
     try:
-        redis = storage.redis
-        if enabled:
-            await redis.set(LOCK_KEY, "1")
-            logger.info("Lock mode is set in Redis: 1")
-        else:
-            await redis.set(LOCK_KEY, "0")
-            logger.info("Lock mode is set in Redis: 0")
+        await redis.set(LOCK_KEY, value)
+        await redis.publish(LOCK_CHANNEL, value)
+        logger.info("Lock mode is set in Redis: %s", value)
         return True
     except Exception as e: # pylint: disable=broad-exception-caught
-        logger.excpeption("Exception while setting lock mode in Redis: %s", e)
+        logger.exception("Exception while setting lock mode in Redis: %s", e)
         return False
 
 
@@ -44,16 +43,15 @@ def setup_admin_lock_router(admin_ids: list[int]) -> Router: # pylint: disable=t
     admin_lock_router = Router(name="admin_commands")
 
     @admin_lock_router.message(Command("lock"), admin_check)
-    async def cmd_lock(message: Message, state: FSMContext):
+    async def cmd_lock(message: Message, redis: Redis):
         logger.info("Admin %s executes /lock", message.from_user.id)
-        storage = state.storage
 
-        current_mode = await is_lock_mode_enabled(storage)
+        current_mode = await is_lock_mode_enabled(redis)
         logger.info("Current lock mode: %s", current_mode)
 
         if current_mode:
             # Режим включен - выключаем
-            success = await set_lock_mode(storage, False)
+            success = await set_lock_mode(redis, False)
             if success:
                 await message.answer(
                     "� Режим блокировки выключен!\n"
@@ -67,7 +65,7 @@ def setup_admin_lock_router(admin_ids: list[int]) -> Router: # pylint: disable=t
                 await message.answer("❌ Ошибка при выключении режима блокировки")
         else:
             # Режим выключен - включаем
-            success = await set_lock_mode(storage, True)
+            success = await set_lock_mode(redis, True)
             if success:
                 await message.answer(
                     "🔒 Lock mode is now ON!\n"
@@ -80,17 +78,16 @@ def setup_admin_lock_router(admin_ids: list[int]) -> Router: # pylint: disable=t
                 await message.answer("❌ Ошибка при включении режима блокировки")
 
     @admin_lock_router.message(Command("unlock"), admin_check)
-    async def cmd_unlock(message: Message, state: FSMContext):
+    async def cmd_unlock(message: Message, redis: Redis):
         """/unlock - turns lock mode off"""
         logger.info("Админ %s выполняет команду /unlock", message.from_user.id)
-        storage = state.storage
 
-        current_mode = await is_lock_mode_enabled(storage)
+        current_mode = await is_lock_mode_enabled(redis)
 
         if not current_mode:
             await message.answer("🔓 Lock mode is off")
         else:
-            success = await set_lock_mode(storage, False)
+            success = await set_lock_mode(redis, False)
             if success:
                 await message.answer(
                     "🔓 Lock mode is off"
@@ -100,11 +97,19 @@ def setup_admin_lock_router(admin_ids: list[int]) -> Router: # pylint: disable=t
                 await message.answer("❌ Error while turning lock mode off")
 
     @admin_lock_router.message(Command("status"), admin_check)
-    async def cmd_status(message: Message, state: FSMContext):
+    async def cmd_status(
+        message: Message,
+        state: FSMContext,
+        redis: Redis,
+        update_ordering=None,
+        throttling=None,
+        webhook_ingress=None,
+        update_stream=None,
+    ):
         """/status - shows current lock status"""
         storage = state.storage
 
-        current_mode = await is_lock_mode_enabled(storage)
+        current_mode = await is_lock_mode_enabled(redis)
         logger.info("Lock status: %s", current_mode)
 
         if current_mode:
@@ -113,10 +118,51 @@ def setup_admin_lock_router(admin_ids: list[int]) -> Router: # pylint: disable=t
             status_text = "🔓 Lock mode is OFF"
 
         admin_list = ", ".join(map(str, admin_ids))
+        limiter = get_default_limiter().snapshot()
+
+        updates_text = ""
+        if update_ordering is not None:
+            updates = update_ordering.snapshot()
+            updates_text = (
+                f"• Updates: running {updates['running']}/{updates['max_concurrency']}, "
+                f"backlog {updates['backlog']} (peak {updates['peak_backlog']}), "
+                f"deepest chat {updates['deepest_chat']}, max wait {updates['max_wait_ms']} ms\n"
+            )
+        if throttling is not None:
+            throttled = throttling.snapshot()
+            updates_text += (
+                f"• Throttling: {throttled['rate']}/s, burst {throttled['burst']}, "
+                f"dropped {throttled['limited']} (double taps {throttled['duplicates']})\n"
+            )
+        if webhook_ingress is not None:
+            ingress = webhook_ingress.snapshot()
+            updates_text += (
+                f"• Webhook: queued {ingress['queued']}, in flight {ingress['in_flight']}, "
+                f"received {ingress['received']}, rejected {ingress['rejected']}\n"
+            )
+        if update_stream is not None:
+            stream = update_stream.snapshot()
+            updates_text += (
+                f"• Stream {stream['consumer']}: {stream['partitions']} partitions, "
+                f"in flight {stream['in_flight']}, processed {stream['processed']}, "
+                f"redelivered {stream['redelivered']}, claimed {stream['claimed']}\n"
+            )
+
+        if isinstance(storage, IndexedRedisStorage):
+            fsm = storage.snapshot()
+            if fsm["sessions"]:
+                updates_text += (
+                    f"• FSM: {fsm['sessions']} updates, {fsm['prefetched']} keys prefetched, "
+                    f"reads from memory {fsm['hits']}, extra reads {fsm['misses']}, "
+                    f"written {fsm['flushed']}\n"
+                )
 
         await message.answer(
             f"{status_text}\n\n"
-            f"• Админы: {admin_list}\n\n"
+            f"• Админы: {admin_list}\n"
+            f"• Broadcast rate: {limiter['rate']} msg/s "
+            f"(429 events: {limiter.get('throttle_events', 0)})\n"
+            f"{updates_text}\n"
         )
     
     @admin_lock_router.message(Command("ch_roles"), admin_check)
@@ -137,8 +183,12 @@ def setup_admin_lock_router(admin_ids: list[int]) -> Router: # pylint: disable=t
         logger.debug(f"redis_client получен: {redis_client is not None}")
         
         try:
-            # Get current roles of a user
-            current_roles = await db.users.get_user_roles(user_id=message.from_user.id)
+            # Get current roles of a user (cached context when available)
+            user_ctx = kwargs.get("user_ctx")
+            if user_ctx is not None:
+                current_roles = list(user_ctx.roles)
+            else:
+                current_roles = await db.users.get_user_roles(user_id=message.from_user.id)
             logger.info(f"Текущие роли админа {message.from_user.id}: {current_roles}")
             
             # Get new role (switch)
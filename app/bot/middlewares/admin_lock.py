@@ -6,9 +6,9 @@ from typing import Callable, Dict, Any, Awaitable
 
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject
-from aiogram.fsm.storage.redis import RedisStorage
+from redis.asyncio import Redis
 
-from app.utils.rbac import is_lock_mode_enabled
+from app.utils.rbac import LockModeFlag
 
 logger = logging.getLogger(__name__)
 
@@ -16,9 +16,11 @@ LOCK_KEY = "bot:lock_mode"
 
 
 class AdminLockMiddleware(BaseMiddleware):
-    def __init__(self, admin_ids: list[int], storage: RedisStorage):
+    def __init__(self, admin_ids: list[int], redis: Redis):
         self.admin_ids = set(admin_ids)
-        self.storage = storage
+        # In-memory flag, updated over pub/sub: no Redis round trip per update
+        # (the client, not the FSM storage: that may be NATS)
+        self.lock_flag = LockModeFlag(redis)
         logger.info("AdminLockMiddleware is initialized with admins: %s", admin_ids)
     
     async def __call__(
@@ -28,6 +30,10 @@ class AdminLockMiddleware(BaseMiddleware):
         data: Dict[str, Any]
     ) -> Any:
         
+        # No lock – go further
+        if not await self.lock_flag.is_enabled():
+            return await handler(event, data)
+
         # Get user from update
         user = None
         
@@ -42,40 +48,20 @@ class AdminLockMiddleware(BaseMiddleware):
             user = event.from_user
         
         if not user:
-            logger.debug(f"Нет пользователя в событии {type(event).__name__}")
+            logger.debug("Нет пользователя в событии %s", type(event).__name__)
             return await handler(event, data)
         
         user_id = user.id
-        username = user.username
-        
-        # Logging 
-        message_text = "Unknown"
-        if hasattr(event, 'message') and event.message and hasattr(event.message, 'text'):
-            message_text = event.message.text
-        elif hasattr(event, 'callback_query') and event.callback_query and hasattr(event.callback_query, 'data'):
-            message_text = f"callback: {event.callback_query.data}"
-        
-        logger.debug(f"Middleware: processing user id={user_id} @{username}, message: {message_text}")
-        
-
-        lock_enabled = await is_lock_mode_enabled(self.storage.redis)
-        logger.debug(f"AdminLockMiddleware: lock status = {lock_enabled}")
-        
-        # No lock – go further
-        if not lock_enabled:
-            logger.debug(f"User {user_id} goes through - admin lock is off, message: {message_text}")
-            return await handler(event, data)
-        
 
         is_admin = user_id in self.admin_ids
         
         if is_admin:
             # Admin – go
-            logger.debug(f"Admin {user_id} goes thorugh - admin lock is ON")
+            logger.debug("Admin %s goes thorugh - admin lock is ON", user_id)
             return await handler(event, data)
         
         # No admin? Go f yourself
-        logger.info(f"ADMIN LOCK — {user_id} (@{user.username}) update dropped. Admin lock is ON.")
+        logger.info("ADMIN LOCK — %s (@%s) update dropped. Admin lock is ON.", user_id, user.username)
         
 
         # Send lock message
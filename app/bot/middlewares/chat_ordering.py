@@ -0,0 +1,117 @@
+"""
+Outer update middleware: strict per-chat ordering, bounded parallelism.
+
+Polling hands every update to its own task. Without coordination a
+double-tap from one user runs two dialog transitions at once, while a slow
+handler (Google sync, PDF render) says nothing about the next update.
+Here updates of one chat wait on that chat's FIFO lock, so they run one
+after another in arrival order; different chats run in parallel, at most
+``max_concurrency`` handlers at a time.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import Chat, TelegramObject, User
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = 64
+# Log a warning when one chat has this many updates queued
+BACKLOG_WARNING = 10
+
+
+class _ChatLane:
+    __slots__ = ("lock", "depth")
+
+    def __init__(self) -> None:
+        self.lock = asyncio.Lock()
+        self.depth = 0  # updates of this chat queued or running
+
+
+class ChatOrderingMiddleware(BaseMiddleware):
+    def __init__(self, *, max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> None:
+        self.max_concurrency = max(1, max_concurrency)
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._lanes: dict[int, _ChatLane] = {}
+        self._running = 0
+        self._queued = 0  # accepted, not running yet
+        self._waiting_for_slot = 0
+        self._peak_backlog = 0
+        self._max_wait = 0.0
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        chat: Chat | None = data.get("event_chat")
+        user: User | None = data.get("event_from_user")
+        key = chat.id if chat is not None else user.id if user is not None else None
+        if key is None:
+            async with self._slot():
+                return await handler(event, data)
+
+        lane = self._lanes.get(key)
+        if lane is None:
+            lane = self._lanes[key] = _ChatLane()
+        lane.depth += 1
+        if lane.depth == BACKLOG_WARNING:
+            logger.warning("Chat %s has %d updates queued", key, lane.depth)
+        self._queued += 1
+        self._peak_backlog = max(self._peak_backlog, self._queued)
+        queued_at = time.monotonic()
+        started = False
+        try:
+            # asyncio.Lock wakes waiters in FIFO order: arrival order per chat
+            async with lane.lock:
+                async with self._slot():
+                    started = True
+                    self._queued -= 1
+                    self._max_wait = max(self._max_wait, time.monotonic() - queued_at)
+                    return await handler(event, data)
+        finally:
+            if not started:
+                self._queued -= 1
+            lane.depth -= 1
+            if not lane.depth:
+                del self._lanes[key]
+
+    @asynccontextmanager
+    async def _slot(self) -> AsyncIterator[None]:
+        """One of ``max_concurrency`` handler slots."""
+        self._waiting_for_slot += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting_for_slot -= 1
+        self._running += 1
+        try:
+            yield
+        finally:
+            self._running -= 1
+            self._slots.release()
+
+    def snapshot(self) -> dict[str, Any]:
+        """Queue-depth metrics; peak values reset on every call."""
+        depths = [lane.depth for lane in self._lanes.values()]
+        snapshot = {
+            "running": self._running,
+            "max_concurrency": self.max_concurrency,
+            "waiting_for_slot": self._waiting_for_slot,
+            "backlog": self._queued,
+            "active_chats": len(depths),
+            "deepest_chat": max(depths, default=0),
+            "peak_backlog": self._peak_backlog,
+            "max_wait_ms": round(self._max_wait * 1000),
+        }
+        self._peak_backlog = 0
+        self._max_wait = 0.0
+        return snapshot
@@ -7,7 +7,7 @@ from aiogram.types import TelegramObject, User
 
 from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
 
-from app.infrastructure.database.database.db import DB
+from app.infrastructure.database.database.db import LazyDB
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +28,7 @@ class DatabaseMiddleware(BaseMiddleware):
         config = None
         redis_client = None
         user_ctx_middleware = None
+        user_presence = None
 
         if dispatcher:
             session_factory = dispatcher.get("db_session_factory")
@@ -35,6 +36,7 @@ class DatabaseMiddleware(BaseMiddleware):
             config = dispatcher.get("config")
             redis_client = dispatcher.get("redis")
             user_ctx_middleware = dispatcher.get("user_ctx_middleware")
+            user_presence = dispatcher.get("user_presence")
 
         if session_factory is None:
             session_factory = data.get("db_session_factory")
@@ -47,6 +49,8 @@ class DatabaseMiddleware(BaseMiddleware):
             redis_client = data.get("redis")
         if user_ctx_middleware is None:
             user_ctx_middleware = data.get("user_ctx_middleware")
+        if user_presence is None:
+            user_presence = data.get("user_presence")
 
 
         if session_factory is None:
@@ -61,10 +65,15 @@ class DatabaseMiddleware(BaseMiddleware):
 
         logger.debug("DatabaseMiddleware: processing user id=%s (@%s)", user.id, user.username)
         try:
-            async with session_factory() as session:
-                async with session.begin():
-                    database = DB(session=session)
-
+            if user_presence is not None:
+                # Known users cost no DB round trip here; see UserPresence
+                if await user_presence.touch(user.id):
+                    logger.info("New user created: id=%s, @%s", user.id, user.username)
+
+            # The session is opened only if the handler actually uses data["db"]
+            database = LazyDB(session_factory)
+            try:
+                if user_presence is None:
                     user_record = await database.users.get_user_record(user_id=user.id)
 
                     if not user_record:
@@ -78,20 +87,23 @@ class DatabaseMiddleware(BaseMiddleware):
                         logger.debug("Update alive status user id=%s", user.id)
                         await database.users.update_alive_status(user_id=user.id, is_alive=True)
 
-                    data["db"] = database
-                    if bot:
-                        data["bot"] = bot
-                    if config:
-                        data["config"] = config
-                    if redis_client:
-                        data["redis"] = redis_client
-                    if user_ctx_middleware:
-                        data["user_ctx_middleware"] = user_ctx_middleware
-
-                    logger.debug("Hadnler call for id=%s", user.id)
-                    result = await handler(event, data)
-
-                return result
+                data["db"] = database
+                if bot:
+                    data["bot"] = bot
+                if config:
+                    data["config"] = config
+                if redis_client:
+                    data["redis"] = redis_client
+                if user_ctx_middleware:
+                    data["user_ctx_middleware"] = user_ctx_middleware
+
+                logger.debug("Hadnler call for id=%s", user.id)
+                result = await handler(event, data)
+                await database.commit()
+            finally:
+                await database.close()
+
+            return result
         except TelegramBadRequest as e:  # pragma: no cover
             if "message is too long" in str(e).lower():
                 logger.warning("⚠️ Message too long in DatabaseMiddleware for id=%s: %s", user.id, e)
@@ -0,0 +1,44 @@
+"""
+Outer update middleware: one FSM storage round trip each way per update.
+
+aiogram-dialog reads the FSM state, the dialog stack and every context of
+the stack one GET at a time, and saves them one SET pipeline at a time.
+This replaces the dispatcher's ``FSMContextMiddleware`` (same ``state`` /
+``raw_state`` / ``fsm_storage`` data) and runs the rest of the update inside
+``IndexedRedisStorage.pipelined``: the chat's keys come in one script call,
+changes go back in one pipeline after the handlers.
+
+Register it after ``ChatOrderingMiddleware``: the prefetch must not start
+before the previous update of the chat has written back. That also moves
+the ``raw_state`` read inside the chat lane, and dropped (throttled) updates
+no longer touch the storage.
+"""
+from __future__ import annotations
+
+from typing import Any, Awaitable, Callable, Dict, cast
+
+from aiogram import Bot
+from aiogram.fsm.middleware import FSMContextMiddleware
+from aiogram.types import TelegramObject
+
+from app.infrastructure.storage.storage.redis_storage import IndexedRedisStorage
+
+
+class FsmSessionMiddleware(FSMContextMiddleware):
+    storage: IndexedRedisStorage
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        bot = cast(Bot, data["bot"])
+        context = self.resolve_event_context(bot, data)
+        data["fsm_storage"] = self.storage
+        if context is None:
+            return await handler(event, data)
+        async with self.events_isolation.lock(key=context.key):
+            async with self.storage.pipelined(context.key.bot_id, context.key.chat_id):
+                data.update({"state": context, "raw_state": await context.get_state()})
+                return await handler(event, data)
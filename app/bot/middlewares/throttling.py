@@ -0,0 +1,158 @@
+"""
+Outer update middleware: per-user flood control before any database work.
+Registered after ``ChatOrderingMiddleware``, whose lane must be taken before
+the first await to keep a chat's updates in order.
+
+Each user has a token bucket in Redis (``throttle:{user_id}``), refilled at
+``rate`` updates per second up to ``burst``. A callback with the same
+``callback_data`` on the same message within ``dedup_window`` seconds is a
+double tap and is dropped without spending a token. A media group (album)
+costs one token: its first message is charged and the other parts share that
+verdict for ``ALBUM_WINDOW_MS``. All checks are one Lua call, so a dropped update costs one Redis round trip: it never opens a
+transaction and never renders a dialog.
+
+Dropped callbacks are answered right away so the button spinner stops;
+dropped messages are ignored. Admins and aiogram_dialog internal updates
+are never throttled. If Redis is unavailable the update goes through.
+"""
+from __future__ import annotations
+
+import logging
+from typing import Any, Awaitable, Callable, Dict, Iterable
+
+from aiogram import BaseMiddleware
+from aiogram.exceptions import TelegramAPIError
+from aiogram.types import TelegramObject, Update, User
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+BUCKET_KEY = "throttle:{user_id}"
+DEDUP_KEY = "throttle:{user_id}:cb:{message_id}:{data}"
+ALBUM_KEY = "throttle:{user_id}:album:{media_group_id}"
+
+DEFAULT_RATE = 2.0
+DEFAULT_BURST = 8
+DEFAULT_DEDUP_WINDOW = 1.0
+# Telegram delivers the parts of an album within a second or two
+ALBUM_WINDOW_MS = 10_000
+
+ALLOWED, LIMITED, DUPLICATE = 0, 1, 2
+
+LIMITED_TEXT = "Слишком много нажатий, подождите пару секунд."
+
+# KEYS[1] bucket hash, KEYS[2] dedup key ("" when the update is not a callback),
+# KEYS[3] album key ("" when the message is not part of a media group)
+# ARGV: rate, burst, dedup window ms, album window ms
+# Returns ALLOWED / LIMITED / DUPLICATE
+_CHECK = """
+if KEYS[2] ~= '' then
+  if not redis.call('SET', KEYS[2], '1', 'NX', 'PX', ARGV[3]) then
+    return 2
+  end
+end
+if KEYS[3] ~= '' then
+  local verdict = redis.call('GET', KEYS[3])
+  if verdict then
+    return tonumber(verdict)
+  end
+end
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local result = 1
+if tokens >= 1 then
+  tokens = tokens - 1
+  result = 0
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+if KEYS[3] ~= '' then
+  redis.call('SET', KEYS[3], tostring(result), 'PX', ARGV[4])
+end
+return result
+"""
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    def __init__(
+        self,
+        redis: Redis,
+        *,
+        rate: float = DEFAULT_RATE,
+        burst: int = DEFAULT_BURST,
+        dedup_window: float = DEFAULT_DEDUP_WINDOW,
+        exempt_ids: Iterable[int] = (),
+    ) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.dedup_window_ms = max(1, int(dedup_window * 1000))
+        self.exempt_ids = set(exempt_ids)
+        self._check = redis.register_script(_CHECK)
+        self.limited = 0
+        self.duplicates = 0
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user: User | None = data.get("event_from_user")
+        if (
+            user is None
+            or user.id in self.exempt_ids
+            or not isinstance(event, Update)
+            or event.event_type not in ("message", "callback_query")
+        ):
+            return await handler(event, data)
+
+        callback = event.callback_query
+        dedup_key = ""
+        if callback is not None and callback.data is not None:
+            dedup_key = DEDUP_KEY.format(
+                user_id=user.id,
+                message_id=callback.message.message_id if callback.message else callback.inline_message_id,
+                data=callback.data,
+            )
+        album_key = ""
+        if event.message is not None and event.message.media_group_id is not None:
+            album_key = ALBUM_KEY.format(user_id=user.id, media_group_id=event.message.media_group_id)
+        try:
+            verdict = int(await self._check(
+                keys=[BUCKET_KEY.format(user_id=user.id), dedup_key, album_key],
+                args=[self.rate, self.burst, self.dedup_window_ms, ALBUM_WINDOW_MS],
+            ))
+        except RedisError as exc:
+            logger.warning("Throttling check failed for id=%s, letting update through: %s", user.id, exc)
+            return await handler(event, data)
+
+        if verdict == ALLOWED:
+            return await handler(event, data)
+
+        if verdict == DUPLICATE:
+            self.duplicates += 1
+            logger.debug("Duplicate callback from %s dropped: %s", user.id, callback.data)
+        else:
+            self.limited += 1
+            logger.debug("Update %s from %s dropped by rate limit", event.update_id, user.id)
+        if callback is not None:
+            try:
+                await callback.answer(LIMITED_TEXT if verdict == LIMITED else None)
+            except TelegramAPIError as exc:
+                logger.debug("Failed to answer dropped callback: %s", exc)
+        return None
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "limited": self.limited,
+            "duplicates": self.duplicates,
+        }
@@ -0,0 +1,155 @@
+"""
+Middleware that resolves the per-user context (roles, forum registration,
+selection progress) once per update from the ``rbac:{user_id}`` Redis hash.
+
+Handlers and getters take it from ``data["user_ctx"]``
+(``dialog_manager.middleware_data["user_ctx"]``) instead of querying users.
+The hash lives for ``ttl`` seconds and is dropped explicitly when a DAO
+changes roles, the forum registration or the creative application (see
+``mark_user_context_stale``).
+"""
+from __future__ import annotations
+
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, User
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.infrastructure.database.database.db import DB
+from app.infrastructure.database.database.users import STALE_USER_CONTEXTS
+
+logger = logging.getLogger(__name__)
+
+USER_CONTEXT_KEY = "rbac:{user_id}"
+DEFAULT_TTL = 120
+
+
+@dataclass(slots=True)
+class UserContext:
+    user_id: int
+    roles: list[str] = field(default_factory=lambda: ["guest"])
+    is_blocked: bool = False
+    forum_registered: bool = False
+    forum_status: str | None = None
+    forum_track: str | None = None
+    creative_part2_done: bool = False
+
+    def has_role(self, *roles: str) -> bool:
+        return bool(set(roles) & set(self.roles))
+
+    def to_redis(self) -> dict[str, str]:
+        return {
+            "roles": json.dumps(self.roles),
+            "is_blocked": "1" if self.is_blocked else "0",
+            "forum_registered": "1" if self.forum_registered else "0",
+            "forum_status": self.forum_status or "",
+            "forum_track": self.forum_track or "",
+            "creative_part2_done": "1" if self.creative_part2_done else "0",
+        }
+
+    @classmethod
+    def from_redis(cls, user_id: int, raw: dict[Any, Any]) -> "UserContext":
+        values = {
+            (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+            for k, v in raw.items()
+        }
+        return cls(
+            user_id=user_id,
+            roles=json.loads(values.get("roles") or '["guest"]'),
+            is_blocked=values.get("is_blocked") == "1",
+            forum_registered=values.get("forum_registered") == "1",
+            forum_status=values.get("forum_status") or None,
+            forum_track=values.get("forum_track") or None,
+            creative_part2_done=values.get("creative_part2_done") == "1",
+        )
+
+    @classmethod
+    def from_snapshot(cls, user_id: int, row: dict[str, Any]) -> "UserContext":
+        """Build from ``_UsersDB.get_profile_snapshot``."""
+        return cls(
+            user_id=user_id,
+            roles=row["roles"] or ["guest"],
+            is_blocked=bool(row["is_blocked"]),
+            forum_registered=bool(row["forum_registered"]),
+            forum_status=row["forum_status"],
+            forum_track=row["forum_track"],
+            creative_part2_done=bool(row["creative_part2_done"]),
+        )
+
+
+class UserContextMiddleware(BaseMiddleware):
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        redis: Redis,
+        *,
+        ttl: int = DEFAULT_TTL,
+    ) -> None:
+        self.session_factory = session_factory
+        self.redis = redis
+        self.ttl = ttl
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        data["user_ctx_middleware"] = self
+
+        user: User | None = data.get("event_from_user")
+        if user is None:
+            return await handler(event, data)
+
+        try:
+            data["user_ctx"] = await self.get_user_context(user.id)
+        except Exception as exc:  # pylint: disable=broad-except
+            # Handlers fall back to the database when user_ctx is missing
+            logger.error("Failed to resolve user context for id=%s: %s", user.id, exc)
+
+        result = await handler(event, data)
+
+        # DatabaseMiddleware has committed by now; drop contexts the handler changed
+        db = data.get("db")
+        if db is not None and getattr(db, "opened", True):
+            for user_id in db.session.info.pop(STALE_USER_CONTEXTS, ()):
+                await self.invalidate_user_cache(user_id)
+        return result
+
+    async def get_user_context(self, user_id: int) -> UserContext:
+        key = USER_CONTEXT_KEY.format(user_id=user_id)
+        try:
+            cached = await self.redis.hgetall(key)
+        except RedisError as exc:
+            logger.warning("User context cache read failed for id=%s: %s", user_id, exc)
+            cached = None
+        if cached:
+            return UserContext.from_redis(user_id, cached)
+
+        async with self.session_factory() as session:
+            row = await DB(session).users.get_profile_snapshot(user_id=user_id)
+        if row is None:
+            # Not registered yet (DatabaseMiddleware creates the row): do not cache
+            return UserContext(user_id=user_id)
+        ctx = UserContext.from_snapshot(user_id, row)
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.hset(key, mapping=ctx.to_redis())
+                pipe.expire(key, self.ttl)
+                await pipe.execute()
+        except RedisError as exc:
+            logger.warning("User context cache write failed for id=%s: %s", user_id, exc)
+        return ctx
+
+    async def invalidate_user_cache(self, user_id: int) -> None:
+        try:
+            await self.redis.delete(USER_CONTEXT_KEY.format(user_id=user_id))
+            logger.debug("User context cache invalidated for id=%s", user_id)
+        except RedisError as exc:
+            logger.warning("Failed to invalidate user context for id=%s: %s", user_id, exc)
@@ -62,7 +62,7 @@ async def start_command(message: Message, command: CommandStart, dialog_manager:
     user = message.from_user
     payload = command.args or ""
 
-    cancel_user_timer(user.id)
+    await cancel_user_timer(user.id)
 
     logger.debug("User id=%s reached /start, payload=%r", user.id, payload)
 
@@ -120,7 +120,7 @@ async def start_command(message: Message, command: CommandStart, dialog_manager:
 @router.message(Command("menu"))
 async def menu_command(message: Message, dialog_manager: DialogManager):
     """Команда /menu - переход в главное меню"""
-    cancel_user_timer(message.from_user.id)
+    await cancel_user_timer(message.from_user.id)
     await dialog_manager.start(state=MainMenuSG.MAIN, mode=StartMode.RESET_STACK)
 
 
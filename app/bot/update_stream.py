@@ -0,0 +1,308 @@
+"""
+Updates through Redis Streams: one ingestor, several worker processes.
+
+The ingestor (polling or webhook, ``UPDATES_MODE=ingest``) handles nothing
+itself: ``UpdateStreamProducer`` is the only middleware of its dispatcher
+and appends every update to ``updates:stream:{partition}``, the partition
+being ``chat_id % partitions`` (user id for updates without a chat).
+
+Workers (``UPDATES_MODE=worker``) run the full dispatcher. Worker ``i`` of
+``N`` reads partitions ``p`` with ``p % N == i`` through the ``bot-workers``
+consumer group under the fixed consumer name ``worker-{i}``, so one chat is
+always handled by one process, and ``ChatOrderingMiddleware`` keeps its
+updates in order inside that process. An entry is acknowledged after its
+handler has finished (successfully or not). Entries of a crashed worker stay
+pending under its consumer name and are handled again first thing after the
+restart: delivery is at least once. Entries pending under another consumer
+for longer than ``CLAIM_MIN_IDLE_MS`` (a partition that moved when the
+worker count changed, a worker that never came back) are taken over with
+XAUTOCLAIM at start and every ``CLAIM_INTERVAL`` seconds.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Sequence
+
+from aiogram import BaseMiddleware, Bot, Dispatcher
+from aiogram.dispatcher.middlewares.user_context import UserContextMiddleware
+from aiogram.methods import TelegramMethod
+from aiogram.types import TelegramObject, Update
+from pydantic import ValidationError
+from redis.asyncio import Redis
+from redis.exceptions import RedisError, ResponseError
+
+logger = logging.getLogger(__name__)
+
+STREAM_KEY = "updates:stream:{partition}"
+GROUP = "bot-workers"
+UPDATE_FIELD = "update"
+
+DEFAULT_PARTITIONS = 16
+DEFAULT_MAXLEN = 100_000  # per partition, approximate; keep it above any expected backlog
+READ_BATCH = 100
+READ_BLOCK_MS = 2000
+MAX_IN_FLIGHT = 256
+# In-flight updates finish within this many seconds on shutdown; the rest is redelivered
+DRAIN_TIMEOUT = 30.0
+# Pending entries idle this long are taken over from whichever consumer holds them
+CLAIM_MIN_IDLE_MS = 60_000
+CLAIM_INTERVAL = 30.0
+# Pause after a failed read, doubled up to the max while Redis stays unavailable
+RETRY_DELAY = 1.0
+RETRY_DELAY_MAX = 30.0
+
+
+def partition_for(update: Update, partitions: int) -> int:
+    context = UserContextMiddleware.resolve_event_context(update)
+    if context.chat is not None:
+        key = context.chat.id
+    elif context.user is not None:
+        key = context.user.id
+    else:
+        key = 0
+    return key % partitions
+
+
+def worker_partitions(worker_index: int, workers: int, partitions: int) -> list[int]:
+    return [p for p in range(partitions) if p % workers == worker_index]
+
+
+class UpdateStreamProducer(BaseMiddleware):
+    """Outer update middleware of the ingest dispatcher: publish, do not handle."""
+
+    def __init__(
+        self,
+        redis: Redis,
+        *,
+        partitions: int = DEFAULT_PARTITIONS,
+        maxlen: int = DEFAULT_MAXLEN,
+    ) -> None:
+        self.redis = redis
+        self.partitions = partitions
+        self.maxlen = maxlen
+        self.published = 0
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        await self.publish(event)
+        return None
+
+    async def publish(self, update: Update) -> None:
+        key = STREAM_KEY.format(partition=partition_for(update, self.partitions))
+        await self.redis.xadd(
+            key,
+            {UPDATE_FIELD: update.model_dump_json(exclude_unset=True, by_alias=True)},
+            maxlen=self.maxlen,
+            approximate=True,
+        )
+        self.published += 1
+
+
+class UpdateStreamWorker:
+    def __init__(
+        self,
+        dp: Dispatcher,
+        bot: Bot,
+        redis: Redis,
+        *,
+        partitions: Sequence[int],
+        consumer: str,
+        batch: int = READ_BATCH,
+        max_in_flight: int = MAX_IN_FLIGHT,
+        **workflow_data: Any,
+    ) -> None:
+        self.dp = dp
+        self.bot = bot
+        self.redis = redis
+        self.keys = [STREAM_KEY.format(partition=p) for p in partitions]
+        self.consumer = consumer
+        self.batch = batch
+        self.workflow_data = workflow_data
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._tasks: set[asyncio.Task[Any]] = set()
+        self._in_flight_ids: set[Any] = set()
+        self.processed = 0
+        self.redelivered = 0
+        self.claimed = 0
+
+    async def _ensure_groups(self) -> None:
+        for key in self.keys:
+            try:
+                # "0": entries published before the first worker started are handled too
+                await self.redis.xgroup_create(key, GROUP, id="0", mkstream=True)
+            except ResponseError as exc:
+                if "BUSYGROUP" not in str(exc):
+                    raise
+
+    async def _claim_idle(self, key: str) -> int:
+        """Move entries idle for CLAIM_MIN_IDLE_MS into this consumer's pending list."""
+        claimed = 0
+        start: Any = "0-0"
+        while True:
+            response = await self.redis.xautoclaim(
+                key, GROUP, self.consumer, CLAIM_MIN_IDLE_MS,
+                start_id=start, count=self.batch,
+            )
+            # redis-py drops the next cursor with justid=True, so entries come with fields
+            start, entries = response[0], response[1]
+            # Own in-flight entries show up too when a handler runs long
+            claimed += sum(1 for entry_id, _ in entries if entry_id not in self._in_flight_ids)
+            if start in (b"0-0", "0-0"):
+                return claimed
+
+    async def _claim_all(self, cursors: dict[str, str]) -> None:
+        for key in self.keys:
+            try:
+                claimed = await self._claim_idle(key)
+            except RedisError as exc:
+                logger.warning("XAUTOCLAIM on %s failed: %s", key, exc)
+                continue
+            if claimed:
+                logger.info("Stream worker %s took over %d idle entries of %s", self.consumer, claimed, key)
+                self.claimed += claimed
+                # Claimed entries are now in our pending list: read it again
+                cursors[key] = "0"
+
+    async def run(self, stop_event: asyncio.Event) -> None:
+        await self._ensure_groups()
+        # Own pending entries first (left unacknowledged by a previous run,
+        # or idle under another consumer), then new ones
+        cursors: dict[str, str] = {key: "0" for key in self.keys}
+        await self._claim_all(cursors)
+        loop = asyncio.get_running_loop()
+        next_claim = loop.time() + CLAIM_INTERVAL
+        retry_delay = RETRY_DELAY
+        logger.info("Stream worker %s reading %d partitions", self.consumer, len(self.keys))
+        try:
+            while not stop_event.is_set():
+                if loop.time() >= next_claim:
+                    await self._claim_all(cursors)
+                    next_claim = loop.time() + CLAIM_INTERVAL
+                block = None if any(c != ">" for c in cursors.values()) else READ_BLOCK_MS
+                try:
+                    response = await self.redis.xreadgroup(
+                        GROUP, self.consumer, cursors, count=self.batch, block=block,
+                    )
+                except RedisError as exc:
+                    logger.warning(
+                        "XREADGROUP for %s failed, retrying in %.0fs: %s", self.consumer, retry_delay, exc
+                    )
+                    try:
+                        await asyncio.wait_for(stop_event.wait(), retry_delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    retry_delay = min(retry_delay * 2, RETRY_DELAY_MAX)
+                    if "NOGROUP" in str(exc):
+                        # Redis restarted without its data: recreate the streams and the group
+                        try:
+                            await self._ensure_groups()
+                        except RedisError as group_exc:
+                            logger.warning("Failed to recreate consumer groups: %s", group_exc)
+                    continue
+                retry_delay = RETRY_DELAY
+                drained = set(cursors)
+                for raw_key, entries in response or ():
+                    key = raw_key.decode() if isinstance(raw_key, bytes) else raw_key
+                    recovering = cursors[key] != ">"
+                    if entries:
+                        drained.discard(key)
+                    for entry_id, fields in entries:
+                        if recovering:
+                            cursors[key] = entry_id.decode() if isinstance(entry_id, bytes) else entry_id
+                            if entry_id in self._in_flight_ids:
+                                continue  # still being handled here
+                            self.redelivered += 1
+                        await self._slots.acquire()
+                        self._in_flight_ids.add(entry_id)
+                        task = asyncio.create_task(self._process(key, entry_id, fields))
+                        self._tasks.add(task)
+                        task.add_done_callback(self._on_done)
+                # A partition with no pending entries left switches to new ones
+                for key in drained:
+                    cursors[key] = ">"
+        finally:
+            await self.drain()
+
+    def _on_done(self, task: asyncio.Task[Any]) -> None:
+        self._tasks.discard(task)
+        self._slots.release()
+
+    async def _process(self, key: str, entry_id: Any, fields: dict[Any, Any]) -> None:
+        try:
+            payload = fields.get(UPDATE_FIELD.encode(), fields.get(UPDATE_FIELD))
+            update = Update.model_validate_json(payload, context={"bot": self.bot})
+        except (TypeError, ValueError, ValidationError) as exc:
+            logger.error("Malformed stream entry %s in %s dropped: %s", entry_id, key, exc)
+        else:
+            try:
+                response = await self.dp.feed_update(self.bot, update, **self.workflow_data)
+                if isinstance(response, TelegramMethod):
+                    await self.dp.silent_call_request(bot=self.bot, result=response)
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.exception("Error while processing update %s: %s", update.update_id, exc)
+            self.processed += 1
+        try:
+            await self.redis.xack(key, GROUP, entry_id)
+        except RedisError as exc:
+            logger.warning("Failed to acknowledge %s in %s, it will be redelivered: %s", entry_id, key, exc)
+        finally:
+            self._in_flight_ids.discard(entry_id)
+
+    async def drain(self, timeout: float = DRAIN_TIMEOUT) -> None:
+        if not self._tasks:
+            return
+        logger.info("Waiting for %d in-flight updates", len(self._tasks))
+        _, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+        for task in pending:
+            # Not acknowledged: handled again after the restart
+            task.cancel()
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "consumer": self.consumer,
+            "partitions": len(self.keys),
+            "in_flight": len(self._tasks),
+            "processed": self.processed,
+            "redelivered": self.redelivered,
+            "claimed": self.claimed,
+        }
+
+
+async def run_stream_worker(
+    dp: Dispatcher,
+    bot: Bot,
+    redis: Redis,
+    *,
+    worker_index: int,
+    workers: int,
+    partitions: int,
+    stop_event: asyncio.Event,
+    **kwargs: Any,
+) -> None:
+    """Consume this worker's partitions until ``stop_event`` is set (startup/shutdown hooks included)."""
+    if not 0 <= worker_index < workers <= partitions:
+        raise ValueError(
+            f"Need 0 <= worker index ({worker_index}) < workers ({workers}) <= partitions ({partitions})"
+        )
+    workflow_data = {"dispatcher": dp, "bots": [bot], **dp.workflow_data, **kwargs}
+    worker = UpdateStreamWorker(
+        dp,
+        bot,
+        redis,
+        partitions=worker_partitions(worker_index, workers, partitions),
+        consumer=f"worker-{worker_index}",
+        **workflow_data,
+    )
+    dp["update_stream"] = worker
+
+    await dp.emit_startup(bot=bot, **workflow_data)
+    try:
+        await worker.run(stop_event)
+    finally:
+        await dp.emit_shutdown(bot=bot, **workflow_data)
+        await bot.session.close()
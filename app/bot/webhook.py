@@ -0,0 +1,173 @@
+"""
+Webhook ingestion: an aiohttp endpoint in front of the dispatcher.
+
+The request handler only checks the secret token, parses the update and puts
+it on an in-process queue, then answers 200 at once; Telegram never waits
+for a handler. A dispatch loop takes updates off the queue and processes
+each one in its own task, as polling does, so the outer middlewares
+(throttling, per-chat ordering) behave the same in both modes.
+
+When the queue is full the endpoint answers 503 and Telegram redelivers the
+update later. Several workers can run behind one reverse proxy; only one of
+them has to call ``setWebhook`` (``WEBHOOK_SET``).
+
+With ``inline=True`` the update is fed to the dispatcher inside the request
+and 200 means it went through (503 if it raised). The stream ingestor uses
+it: its dispatcher only appends the update to Redis.
+"""
+from __future__ import annotations
+
+import asyncio
+import hmac
+import logging
+from typing import Any
+
+from aiogram import Bot, Dispatcher
+from aiogram.methods import TelegramMethod
+from aiogram.types import Update
+from aiohttp import web
+from pydantic import ValidationError
+
+from config.config import WebhookConfig
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+# In-flight updates finish within this many seconds on shutdown
+DRAIN_TIMEOUT = 30.0
+
+
+class WebhookIngress:
+    def __init__(
+        self,
+        dp: Dispatcher,
+        bot: Bot,
+        config: WebhookConfig,
+        *,
+        inline: bool = False,
+        **workflow_data: Any,
+    ) -> None:
+        self.dp = dp
+        self.bot = bot
+        self.config = config
+        self.inline = inline
+        self.workflow_data = workflow_data
+        self._secret = config.secret.encode()
+        self._queue: asyncio.Queue[Update] = asyncio.Queue(maxsize=config.queue_size)
+        self._tasks: set[asyncio.Task[Any]] = set()
+        self.received = 0
+        self.rejected = 0
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(self.config.path, self.handle)
+        return app
+
+    async def handle(self, request: web.Request) -> web.Response:
+        token = request.headers.get(SECRET_HEADER, "").encode()
+        if not hmac.compare_digest(token, self._secret):
+            logger.warning("Webhook request with a wrong secret token from %s", request.remote)
+            return web.Response(status=401)
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": self.bot})
+        except (ValueError, ValidationError) as exc:
+            logger.warning("Malformed webhook update: %s", exc)
+            return web.Response(status=400)
+        if self.inline:
+            try:
+                await self.dp.feed_update(self.bot, update, **self.workflow_data)
+            except Exception as exc:  # pylint: disable=broad-except
+                self.rejected += 1
+                logger.error("Update %s not accepted, it will be redelivered: %s", update.update_id, exc)
+                return web.Response(status=503)
+            self.received += 1
+            return web.Response()
+        try:
+            self._queue.put_nowait(update)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            logger.warning("Webhook queue is full, update %s will be redelivered", update.update_id)
+            return web.Response(status=503)
+        self.received += 1
+        return web.Response()
+
+    async def dispatch_forever(self) -> None:
+        while True:
+            update = await self._queue.get()
+            task = asyncio.create_task(self._process(update))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _process(self, update: Update) -> None:
+        try:
+            response = await self.dp.feed_update(self.bot, update, **self.workflow_data)
+            if isinstance(response, TelegramMethod):
+                # No HTTP response to put it in: the update was acknowledged already
+                await self.dp.silent_call_request(bot=self.bot, result=response)
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.exception("Error while processing update %s: %s", update.update_id, exc)
+
+    async def drain(self, timeout: float = DRAIN_TIMEOUT) -> None:
+        """Finish what was accepted: queued updates and running handlers."""
+        while not self._queue.empty():
+            update = self._queue.get_nowait()
+            task = asyncio.create_task(self._process(update))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        if self._tasks:
+            logger.info("Waiting for %d in-flight updates", len(self._tasks))
+            _, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+            for task in pending:
+                task.cancel()
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "queued": self._queue.qsize(),
+            "in_flight": len(self._tasks),
+            "received": self.received,
+            "rejected": self.rejected,
+        }
+
+
+async def run_webhook(
+    dp: Dispatcher,
+    bot: Bot,
+    config: WebhookConfig,
+    *,
+    stop_event: asyncio.Event,
+    inline: bool = False,
+    allowed_updates: list[str] | None = None,
+    **kwargs: Any,
+) -> None:
+    """Serve the webhook until ``stop_event`` is set (startup/shutdown hooks included)."""
+    workflow_data = {"dispatcher": dp, "bots": [bot], **dp.workflow_data, **kwargs}
+    ingress = WebhookIngress(dp, bot, config, inline=inline, **workflow_data)
+    dp["webhook_ingress"] = ingress
+
+    await dp.emit_startup(bot=bot, **workflow_data)
+    runner = web.AppRunner(ingress.build_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, config.host, config.port)
+    dispatcher_task = asyncio.create_task(ingress.dispatch_forever())
+    try:
+        await site.start()
+        logger.info("Webhook listening on %s:%s%s", config.host, config.port, config.path)
+        if config.set_webhook:
+            await bot.set_webhook(
+                url=config.url,
+                secret_token=config.secret,
+                allowed_updates=(
+                    allowed_updates if allowed_updates is not None else dp.resolve_used_update_types()
+                ),
+                drop_pending_updates=config.drop_pending_updates,
+            )
+            logger.info("Webhook registered: %s", config.url)
+        await stop_event.wait()
+    finally:
+        logger.info("Webhook stopping")
+        # Stop accepting first, then finish what was already acknowledged
+        await runner.cleanup()
+        dispatcher_task.cancel()
+        await ingress.drain()
+        await dp.emit_shutdown(bot=bot, **workflow_data)
+        await bot.session.close()
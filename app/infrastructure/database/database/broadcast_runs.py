@@ -0,0 +1,153 @@
+"""DAO for broadcast run records and per-recipient delivery checkpoints."""
+from __future__ import annotations
+
+import logging
+from collections.abc import Sequence
+
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.infrastructure.database.models.broadcast_runs import (
+    BroadcastDelivery,
+    BroadcastRun,
+    BroadcastRunModel,
+)
+
+logger = logging.getLogger(__name__)
+
+# Outcomes that must not be retried when a run is resumed; "partial" (some
+# steps of a multi-message delivery went out) is not, to avoid duplicates
+DONE_STATUSES = ("sent", "blocked", "partial")
+
+
+class _BroadcastRunsDB:
+    __tablename__ = "broadcast_runs"
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def start(
+        self,
+        *,
+        key: str,
+        title: str | None = None,
+        total: int | None = None,
+    ) -> BroadcastRunModel:
+        """Create the run or reopen an unfinished one with the same key.
+
+        A ``completed`` run is never reopened: it is returned unchanged.
+        """
+        stmt = (
+            insert(BroadcastRun)
+            .values(key=key, title=title, status="running", total=total or 0)
+            .on_conflict_do_update(
+                index_elements=[BroadcastRun.key],
+                set_={
+                    "status": "running",
+                    "total": func.greatest(BroadcastRun.total, total or 0),
+                    "updated_at": func.now(),
+                },
+                where=BroadcastRun.status != "completed",
+            )
+            .returning(BroadcastRun)
+        )
+        result = await self.session.execute(stmt)
+        entity = result.scalar_one_or_none()
+        if entity is None:
+            run = await self.get_by_key(key=key)
+            logger.info("Broadcast run already completed. id=%d key=%s", run.id, key)
+            return run
+        run = entity.to_model()
+        logger.info("Broadcast run started. id=%d key=%s status=%s", run.id, key, run.status)
+        return run
+
+    async def get_by_key(self, *, key: str) -> BroadcastRunModel | None:
+        result = await self.session.execute(select(BroadcastRun).where(BroadcastRun.key == key))
+        entity = result.scalar_one_or_none()
+        return entity.to_model() if entity else None
+
+    async def count_deliveries(self, *, key_prefix: str) -> dict[str, int]:
+        """Outcome counts across every run whose key starts with ``key_prefix``."""
+        stmt = (
+            select(BroadcastDelivery.status, func.count())
+            .join(BroadcastRun, BroadcastRun.id == BroadcastDelivery.run_id)
+            .where(BroadcastRun.key.startswith(key_prefix, autoescape=True))
+            .group_by(BroadcastDelivery.status)
+        )
+        result = await self.session.execute(stmt)
+        return dict(result.tuples().all())
+
+    async def list_done_user_ids(self, *, run_id: int, after: int | None = None) -> set[int]:
+        """Recipients that were already delivered (or are known dead) in this run.
+
+        ``after`` limits the result to ids past the run's keyset position.
+        """
+        stmt = select(BroadcastDelivery.user_id).where(
+            BroadcastDelivery.run_id == run_id,
+            BroadcastDelivery.status.in_(DONE_STATUSES),
+        )
+        if after is not None:
+            stmt = stmt.where(BroadcastDelivery.user_id > after)
+        result = await self.session.execute(stmt)
+        return set(result.scalars().all())
+
+    async def record_deliveries(
+        self,
+        *,
+        run_id: int,
+        outcomes: Sequence[tuple[int, str]],
+        position: int | None = None,
+    ) -> None:
+        """Upsert a batch of ``(user_id, status)`` outcomes in one statement.
+
+        ``position`` advances the run's keyset position in the same transaction.
+        """
+        if position is not None:
+            await self.session.execute(
+                update(BroadcastRun)
+                .where(BroadcastRun.id == run_id)
+                .values(last_user_id=func.greatest(BroadcastRun.last_user_id, position))
+            )
+        if not outcomes:
+            return
+        stmt = insert(BroadcastDelivery).values(
+            [{"run_id": run_id, "user_id": uid, "status": status} for uid, status in outcomes]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[BroadcastDelivery.run_id, BroadcastDelivery.user_id],
+            set_={
+                "status": stmt.excluded.status,
+                "attempts": BroadcastDelivery.attempts + 1,
+                "updated_at": func.now(),
+            },
+        )
+        await self.session.execute(stmt)
+
+    async def finish(self, *, run_id: int, status: str) -> BroadcastRunModel:
+        """Store the final status and recompute counters from the deliveries."""
+        counts = await self.session.execute(
+            select(BroadcastDelivery.status, func.count())
+            .where(BroadcastDelivery.run_id == run_id)
+            .group_by(BroadcastDelivery.status)
+        )
+        by_status = dict(counts.all())
+        stmt = (
+            update(BroadcastRun)
+            .where(BroadcastRun.id == run_id)
+            .values(
+                status=status,
+                sent=by_status.get("sent", 0),
+                blocked=by_status.get("blocked", 0),
+                errors=by_status.get("error", 0) + by_status.get("partial", 0),
+                updated_at=func.now(),
+            )
+            .returning(BroadcastRun)
+        )
+        result = await self.session.execute(stmt)
+        run = result.scalar_one().to_model()
+        logger.info(
+            "Broadcast run finished. id=%d status=%s sent=%d blocked=%d errors=%d",
+            run.id, run.status, run.sent, run.blocked, run.errors,
+        )
+        return run
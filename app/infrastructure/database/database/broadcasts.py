@@ -6,6 +6,7 @@ from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.infrastructure.database.models.broadcasts import BroadcastModel, Broadcasts
+from app.infrastructure.database.database.read_cache import cached_read
 
 logger = logging.getLogger(__name__)
 
@@ -65,6 +66,7 @@ class _BroadcastsDB:
             return None
         return entity.to_model()
 
+    @cached_read
     async def list_all(self) -> list[BroadcastModel]:
         result = await self.session.execute(select(Broadcasts))
         rows = result.scalars().all()
@@ -10,6 +10,8 @@ from app.infrastructure.database.models.creative_application import (
     CreativeApplicationModel,
     CreativeApplications,
 )
+from app.infrastructure.database.database.read_cache import cached_read
+from app.infrastructure.database.database.users import mark_user_context_stale
 
 logger = logging.getLogger(__name__)
 
@@ -43,6 +45,7 @@ class _CreativeApplicationsDB:
             set_=payload,
         )
         await self.session.execute(stmt)
+        mark_user_context_stale(self.session, normalized.user_id)
 
         logger.info(
             "Creative application saved. db='%s', user_id=%d, direction=%s",
@@ -51,6 +54,7 @@ class _CreativeApplicationsDB:
             normalized.direction,
         )
 
+    @cached_read
     async def get_application(self, *, user_id: int) -> CreativeApplicationModel | None:
         """Retrieve user's application."""
         stmt = select(CreativeApplications).where(
@@ -117,6 +121,7 @@ class _CreativeApplicationsDB:
                 f"No creative_applications row found for user_id={user_id}. "
                 "Cannot save part 2 answers."
             )
+        mark_user_context_stale(self.session, user_id)
         logger.info(
             "Part2 fields updated for user_id=%d (%d row(s) affected)",
             user_id,
@@ -1,4 +1,6 @@
-from sqlalchemy.ext.asyncio import AsyncSession
+from functools import cached_property
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from app.infrastructure.database.database.users import _UsersDB
 from app.infrastructure.database.database.feedback import _FeedbackDB
@@ -16,28 +18,123 @@ from app.infrastructure.database.database.volunteer_selection_part2 import _VolS
 from app.infrastructure.database.database.forum_registrations import _ForumRegistrationsDB
 from app.infrastructure.database.database.career_fair_stats import _CareerFairStatsDB
 from app.infrastructure.database.database.lectory_questions import _LectoryQuestionsDB
+from app.infrastructure.database.database.broadcast_runs import _BroadcastRunsDB
+from app.infrastructure.database.database.media_files import _MediaFilesDB
+from app.infrastructure.database.database.read_cache import enable_read_cache
 
 
 class DB:
+    """Entry point to the DAOs. Each one is created on first access."""
+
     def __init__(self, session: AsyncSession) -> None:
         self._session = session
-        self.users = _UsersDB(session=session)
-        self.feedback = _FeedbackDB(session=session)
-        self.quiz_dod = _QuizDodDB(session=session)
-        self.quiz_dod_users_info = _QuizDodUsersInfoDB(session=session)
-        self.users_info = _UsersInfoDB(session=session)
-        self.broadcasts = _BroadcastsDB(session=session)
-        self.user_subscriptions = _UserSubscriptionsDB(session=session)
-        self.creative_applications = _CreativeApplicationsDB(session=session)
-        self.online_events = _OnlineEventsDB(session=session)
-        self.online_registrations = _OnlineRegistrationsDB(session=session)
-        self.user_mentors = _UserMentorsDB(session=session)
-        self.volunteer_applications = _VolunteerApplicationsDB(session=session)
-        self.volunteer_selection_part2 = _VolSelPart2DB(session=session)
-        self.forum_registrations = _ForumRegistrationsDB(session=session)
-        self.career_fair_stats = _CareerFairStatsDB(session=session)
-        self.lectory_questions = _LectoryQuestionsDB(session=session)
 
     @property
     def session(self) -> AsyncSession:
         return self._session
+
+    @cached_property
+    def users(self) -> _UsersDB:
+        return _UsersDB(session=self.session)
+
+    @cached_property
+    def feedback(self) -> _FeedbackDB:
+        return _FeedbackDB(session=self.session)
+
+    @cached_property
+    def quiz_dod(self) -> _QuizDodDB:
+        return _QuizDodDB(session=self.session)
+
+    @cached_property
+    def quiz_dod_users_info(self) -> _QuizDodUsersInfoDB:
+        return _QuizDodUsersInfoDB(session=self.session)
+
+    @cached_property
+    def users_info(self) -> _UsersInfoDB:
+        return _UsersInfoDB(session=self.session)
+
+    @cached_property
+    def broadcasts(self) -> _BroadcastsDB:
+        return _BroadcastsDB(session=self.session)
+
+    @cached_property
+    def user_subscriptions(self) -> _UserSubscriptionsDB:
+        return _UserSubscriptionsDB(session=self.session)
+
+    @cached_property
+    def creative_applications(self) -> _CreativeApplicationsDB:
+        return _CreativeApplicationsDB(session=self.session)
+
+    @cached_property
+    def online_events(self) -> _OnlineEventsDB:
+        return _OnlineEventsDB(session=self.session)
+
+    @cached_property
+    def online_registrations(self) -> _OnlineRegistrationsDB:
+        return _OnlineRegistrationsDB(session=self.session)
+
+    @cached_property
+    def user_mentors(self) -> _UserMentorsDB:
+        return _UserMentorsDB(session=self.session)
+
+    @cached_property
+    def volunteer_applications(self) -> _VolunteerApplicationsDB:
+        return _VolunteerApplicationsDB(session=self.session)
+
+    @cached_property
+    def volunteer_selection_part2(self) -> _VolSelPart2DB:
+        return _VolSelPart2DB(session=self.session)
+
+    @cached_property
+    def forum_registrations(self) -> _ForumRegistrationsDB:
+        return _ForumRegistrationsDB(session=self.session)
+
+    @cached_property
+    def career_fair_stats(self) -> _CareerFairStatsDB:
+        return _CareerFairStatsDB(session=self.session)
+
+    @cached_property
+    def lectory_questions(self) -> _LectoryQuestionsDB:
+        return _LectoryQuestionsDB(session=self.session)
+
+    @cached_property
+    def broadcast_runs(self) -> _BroadcastRunsDB:
+        return _BroadcastRunsDB(session=self.session)
+
+    @cached_property
+    def media_files(self) -> _MediaFilesDB:
+        return _MediaFilesDB(session=self.session)
+
+
+class LazyDB(DB):
+    """``DB`` that opens its session only when a DAO or ``session`` is first used.
+
+    Updates that never touch the database cost no session and no pool
+    checkout. The transaction starts on the first statement (autobegin);
+    call ``commit()`` when the work succeeded and ``close()`` in any case.
+    Repeated ``cached_read`` lookups within the update hit the read cache.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession]) -> None:
+        self._session_factory = session_factory
+        self._session: AsyncSession | None = None
+
+    @property
+    def session(self) -> AsyncSession:
+        if self._session is None:
+            self._session = self._session_factory()
+            enable_read_cache(self._session)
+        return self._session
+
+    @property
+    def opened(self) -> bool:
+        return self._session is not None
+
+    async def commit(self) -> None:
+        if self._session is not None:
+            await self._session.commit()
+
+    async def close(self) -> None:
+        """Release the connection; anything not committed is rolled back."""
+        if self._session is not None:
+            await self._session.close()
@@ -7,6 +7,9 @@ import logging
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.infrastructure.database.database.users import mark_user_context_stale
+from app.infrastructure.database.database.read_cache import cached_read
+
 logger = logging.getLogger(__name__)
 
 
@@ -14,6 +17,7 @@ class _ForumRegistrationsDB:
     def __init__(self, session: AsyncSession) -> None:
         self.session = session
 
+    @cached_read
     async def get_by_user_id(self, *, user_id: int) -> dict | None:
         """Return bot_forum_registrations row for the given Telegram user, or None."""
         result = await self.session.execute(
@@ -38,6 +42,7 @@ class _ForumRegistrationsDB:
             ),
             {"track": track, "user_id": user_id},
         )
+        mark_user_context_stale(self.session, user_id)
         logger.info(
             "bot_forum_registrations: updated track for user_id=%d to '%s'",
             user_id,
@@ -110,6 +115,7 @@ class _ForumRegistrationsDB:
                 "passport": site_reg.get("passport"),
             },
         )
+        mark_user_context_stale(self.session, user_id)
         logger.info(
             "bot_forum_registrations: created entry for user_id=%d, unique_id=%s",
             user_id,
@@ -0,0 +1,91 @@
+"""DAO for the content-addressed Telegram file_id registry."""
+from __future__ import annotations
+
+import logging
+from collections.abc import Collection
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.infrastructure.database.models.media_files import MediaFile
+
+logger = logging.getLogger(__name__)
+
+
+class _MediaFilesDB:
+    __tablename__ = "media_files"
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def get_file_ids(
+        self,
+        *,
+        bot_id: int,
+        kind: str,
+        content_hashes: Collection[str],
+    ) -> dict[str, str]:
+        """Map content hash -> file_id for the hashes that are already known."""
+        if not content_hashes:
+            return {}
+        stmt = select(MediaFile.content_hash, MediaFile.file_id).where(
+            MediaFile.bot_id == bot_id,
+            MediaFile.kind == kind,
+            MediaFile.content_hash.in_(list(content_hashes)),
+        )
+        result = await self.session.execute(stmt)
+        return dict(result.tuples().all())
+
+    async def list_source_paths(
+        self,
+        *,
+        bot_id: int,
+        kind: str,
+        source_paths: Collection[str],
+    ) -> set[str]:
+        """The given paths that already have a registry entry (any content)."""
+        if not source_paths:
+            return set()
+        stmt = select(MediaFile.source_path).where(
+            MediaFile.bot_id == bot_id,
+            MediaFile.kind == kind,
+            MediaFile.source_path.in_(list(source_paths)),
+        )
+        result = await self.session.execute(stmt)
+        return set(result.scalars().all())
+
+    async def save_file_id(
+        self,
+        *,
+        bot_id: int,
+        content_hash: str,
+        kind: str,
+        file_id: str,
+        source_path: str | None = None,
+        size: int | None = None,
+    ) -> None:
+        stmt = insert(MediaFile).values(
+            bot_id=bot_id,
+            content_hash=content_hash,
+            kind=kind,
+            file_id=file_id,
+            source_path=source_path,
+            size=size,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[MediaFile.bot_id, MediaFile.content_hash, MediaFile.kind],
+            set_={
+                "file_id": stmt.excluded.file_id,
+                "source_path": stmt.excluded.source_path,
+                "updated_at": func.now(),
+            },
+        )
+        await self.session.execute(stmt)
+        logger.info(
+            "Media file_id saved. db='%s', kind=%s, hash=%s, path=%s",
+            self.__tablename__,
+            kind,
+            content_hash[:12],
+            source_path,
+        )
@@ -6,6 +6,7 @@ from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.infrastructure.database.models.online_events import OnlineEventModel, OnlineEvents
+from app.infrastructure.database.database.read_cache import cached_read
 
 logger = logging.getLogger(__name__)
 
@@ -62,6 +63,7 @@ class _OnlineEventsDB:
             title,
         )
 
+    @cached_read
     async def get_by_slug(self, *, slug: str) -> OnlineEventModel | None:
         """Get event by slug identifier."""
         stmt = select(OnlineEvents).where(OnlineEvents.slug == slug)
@@ -71,6 +73,7 @@ class _OnlineEventsDB:
             return None
         return entity.to_model()
 
+    @cached_read
     async def get_by_id(self, *, id: int) -> OnlineEventModel | None:
         """Get event by database ID."""
         stmt = select(OnlineEvents).where(OnlineEvents.id == id)
@@ -80,6 +83,7 @@ class _OnlineEventsDB:
             return None
         return entity.to_model()
 
+    @cached_read
     async def list_active_upcoming(self, *, hide_older_than_hours: int = 3) -> list[OnlineEventModel]:
         """List active events, hiding those that started more than N hours ago."""
         # Calculate cutoff time in Python
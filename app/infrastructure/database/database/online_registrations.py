@@ -7,6 +7,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.infrastructure.database.models.online_registrations import OnlineRegistrationModel, OnlineRegistrations
 from app.infrastructure.database.models.online_events import OnlineEvents
+from app.infrastructure.database.database.read_cache import cached_read
 
 logger = logging.getLogger(__name__)
 
@@ -44,6 +45,7 @@ class _OnlineRegistrationsDB:
         await self.session.execute(stmt)
         logger.info("User %s cancelled registration for event %s", user_id, event_id)
 
+    @cached_read
     async def check_registration_status(self, *, user_id: int, event_id: int) -> str | None:
         """Check if user is registered for an event. Returns status or None."""
         stmt = (
@@ -55,6 +57,7 @@ class _OnlineRegistrationsDB:
         status = result.scalar_one_or_none()
         return status
 
+    @cached_read
     async def get_user_registrations(self, *, user_id: int, active_only: bool = True) -> list[OnlineRegistrationModel]:
         """Get all registrations for a user."""
         stmt = select(OnlineRegistrations).where(OnlineRegistrations.user_id == user_id)
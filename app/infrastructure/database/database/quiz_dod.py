@@ -2,6 +2,7 @@ import logging
 
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.infrastructure.database.database.read_cache import cached_read
 
 logger = logging.getLogger(__name__)
 
@@ -12,6 +13,7 @@ class _QuizDodDB:
     def __init__(self, session: AsyncSession) -> None:
         self.session = session
 
+    @cached_read
     async def get_best_result(self, *, user_id: int) -> int | None:
         result = await self.session.execute(
             text(
@@ -0,0 +1,81 @@
+"""Read-through cache for DAO lookups, scoped to one session.
+
+Within one update the same row is often read by several getters of the same
+window (forum registration, broadcast list, ...). DAO read methods decorated
+with ``cached_read`` keep their results in ``session.info`` once the cache
+is enabled for that session (``LazyDB`` does it for the request session),
+so repeated calls with the same arguments cost one query.
+
+Any write on the session — a non-SELECT statement or a flush — empties the
+cache, so reads after a write always see fresh data. Sessions without the
+cache enabled (scripts, schedulers) are not affected.
+"""
+from __future__ import annotations
+
+import functools
+from collections.abc import Awaitable, Callable
+from typing import Any, ParamSpec, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import ORMExecuteState, Session
+from sqlalchemy.sql.elements import TextClause
+
+READ_CACHE_KEY = "dao_read_cache"
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+
+def enable_read_cache(session: AsyncSession) -> None:
+    """Turn on ``cached_read`` for ``session`` and drop the cache on every write."""
+    session.info[READ_CACHE_KEY] = {}
+    sync_session = session.sync_session
+    event.listen(sync_session, "do_orm_execute", _on_execute)
+    event.listen(sync_session, "after_flush", _on_flush)
+
+
+def clear_read_cache(session: AsyncSession | Session) -> None:
+    cache = session.info.get(READ_CACHE_KEY)
+    if cache:
+        cache.clear()
+
+
+def _is_read(statement: Any) -> bool:
+    if isinstance(statement, TextClause):
+        return statement.text.lstrip()[:6].upper() == "SELECT"
+    return bool(getattr(statement, "is_select", False))
+
+
+def _on_execute(state: ORMExecuteState) -> None:
+    if not _is_read(state.statement):
+        clear_read_cache(state.session)
+
+
+def _on_flush(session: Session, _flush_context: Any) -> None:
+    clear_read_cache(session)
+
+
+def cached_read(
+    method: Callable[P, Awaitable[R]],
+) -> Callable[P, Awaitable[R]]:
+    """Cache a keyword-only DAO read method per ``(DAO, method, kwargs)``."""
+    name = method.__qualname__
+
+    @functools.wraps(method)
+    async def wrapper(self, *args: Any, **kwargs: Any) -> R:
+        cache = self.session.info.get(READ_CACHE_KEY)
+        if cache is None or args:
+            return await method(self, *args, **kwargs)
+        key = (name, tuple(sorted(kwargs.items())))
+        try:
+            return cache[key]
+        except KeyError:
+            pass
+        except TypeError:  # unhashable argument
+            return await method(self, *args, **kwargs)
+        result = await method(self, **kwargs)
+        cache[key] = result
+        return result
+
+    return wrapper  # type: ignore[return-value]
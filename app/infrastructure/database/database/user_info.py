@@ -5,6 +5,7 @@ from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.infrastructure.database.models.user_info import UsersInfoModel, UsersInfo
+from app.infrastructure.database.database.read_cache import cached_read
 
 logger = logging.getLogger(__name__)
 
@@ -41,6 +42,7 @@ class _UsersInfoDB:
         else:
             logger.debug("User info delete skipped (missing). db='%s', user_id=%d", self.__tablename__, user_id)
 
+    @cached_read
     async def get_user_info(self, *, user_id: int) -> UsersInfoModel | None:
         stmt = select(UsersInfo).where(UsersInfo.user_id == user_id)
         result = await self.session.execute(stmt)
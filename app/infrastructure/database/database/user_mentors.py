@@ -5,6 +5,7 @@ from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.infrastructure.database.models.user_mentors import UserMentors, UserMentorsModel
+from app.infrastructure.database.database.read_cache import cached_read
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +16,7 @@ class _UserMentorsDB:
     def __init__(self, session: AsyncSession) -> None:
         self.session = session
 
+    @cached_read
     async def get_by_user_id(self, *, user_id: int) -> UserMentorsModel | None:
         """Return the user_mentors record for *user_id*, or *None*."""
         stmt = select(UserMentors).where(UserMentors.user_id == user_id)
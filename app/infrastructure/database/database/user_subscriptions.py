@@ -7,6 +7,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.infrastructure.database.models.user_subscriptions import UserSubscriptionModel, UserSubscriptions
 from app.infrastructure.database.models.broadcasts import Broadcasts
+from app.infrastructure.database.database.read_cache import cached_read
 
 logger = logging.getLogger(__name__)
 
@@ -76,6 +77,7 @@ class _UserSubscriptionsDB:
         result = await self.session.execute(sql, params)
         return [row.user_id for row in result]
 
+    @cached_read
     async def get_user_subscriptions(self, *, user_id: int) -> list[UserSubscriptionModel]:
         result = await self.session.execute(select(UserSubscriptions).where(UserSubscriptions.user_id == user_id))
         rows = result.scalars().all()
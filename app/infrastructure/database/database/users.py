@@ -1,14 +1,24 @@
 import logging
+from collections.abc import Collection, Mapping, Sequence
 from datetime import datetime, timezone
+from typing import Any
 
-from sqlalchemy import select, update, delete, text
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import BigInteger, ColumnElement, DateTime, any_, bindparam, func, select, update, delete, text
+from sqlalchemy.dialects.postgresql import ARRAY, insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.infrastructure.database.models.users import UsersModel, Users
+from app.infrastructure.database.database.read_cache import cached_read
 
 logger = logging.getLogger(__name__)
 
+# session.info key: users whose cached context (rbac:{id}) is stale once the session commits
+STALE_USER_CONTEXTS = "stale_user_contexts"
+
+
+def mark_user_context_stale(session: AsyncSession, user_id: int) -> None:
+    session.info.setdefault(STALE_USER_CONTEXTS, set()).add(user_id)
+
 
 class _UsersDB:
     __tablename__ = "users"
@@ -23,7 +33,8 @@ class _UsersDB:
         roles: list[str] | None = None,
         is_alive: bool = True,
         is_blocked: bool = False,
-    ) -> None:
+    ) -> bool:
+        """Insert the user unless it exists; return True if a row was created."""
         stmt = (
             insert(Users)
             .values(
@@ -34,7 +45,9 @@ class _UsersDB:
             )
             .on_conflict_do_nothing(index_elements=[Users.user_id])
         )
-        await self.session.execute(stmt)
+        result = await self.session.execute(stmt)
+        if not result.rowcount:
+            return False
         logger.info(
             "User added. db='%s', user_id=%d, date_time='%s', is_alive=%s, is_blocked=%s",
             self.__tablename__,
@@ -43,12 +56,14 @@ class _UsersDB:
             is_alive,
             is_blocked,
         )
+        return True
 
     async def delete(self, *, user_id: int) -> None:
         stmt = delete(Users).where(Users.user_id == user_id)
         await self.session.execute(stmt)
         logger.info("User deleted. db='%s', user_id='%d'", self.__tablename__, user_id)
 
+    @cached_read
     async def get_user_record(self, *, user_id: int) -> UsersModel | None:
         stmt = select(Users).where(Users.user_id == user_id)
         result = await self.session.execute(stmt)
@@ -71,6 +86,59 @@ class _UsersDB:
             is_alive,
         )
 
+    async def mark_dead(self, *, user_ids: Collection[int]) -> int:
+        """Set ``is_alive = false`` for many users in one ``= ANY(:ids)`` statement."""
+        if not user_ids:
+            return 0
+        stmt = (
+            update(Users)
+            .where(Users.user_id == any_(bindparam("ids", type_=ARRAY(BigInteger))))
+            .where(Users.is_alive.is_(True))
+            .values(is_alive=False)
+            .execution_options(synchronize_session=False)
+        )
+        result = await self.session.execute(stmt, {"ids": list(user_ids)})
+        logger.info(
+            "Users marked dead. db='%s', requested=%d, updated=%d",
+            self.__tablename__,
+            len(user_ids),
+            result.rowcount,
+        )
+        return result.rowcount
+
+    async def mark_seen(self, *, seen: Mapping[int, datetime]) -> set[int]:
+        """Batch "user is alive" marks: one ``UPDATE ... FROM unnest(:ids, :seen_at)``.
+
+        ``updated`` is set to the time each user was last seen. Returns the ids
+        that had a row; the rest are missing from the table.
+        """
+        if not seen:
+            return set()
+        result = await self.session.execute(
+            text(
+                """
+                UPDATE users AS u
+                   SET is_alive = TRUE,
+                       updated = s.seen_at
+                  FROM unnest(:ids, :seen_at) AS s(user_id, seen_at)
+                 WHERE u.user_id = s.user_id
+             RETURNING u.user_id
+                """
+            ).bindparams(
+                bindparam("ids", type_=ARRAY(BigInteger)),
+                bindparam("seen_at", type_=ARRAY(DateTime(timezone=True))),
+            ),
+            {"ids": list(seen), "seen_at": list(seen.values())},
+        )
+        updated_ids = set(result.scalars().all())
+        logger.debug(
+            "Users marked seen. db='%s', requested=%d, updated=%d",
+            self.__tablename__,
+            len(seen),
+            len(updated_ids),
+        )
+        return updated_ids
+
     async def update_user_lang(self, *, user_id: int, user_lang: str) -> None:
         logger.warning(
             "Skipping update_user_lang for user %s: language column removed", user_id
@@ -88,6 +156,7 @@ class _UsersDB:
         )
         return False
 
+    @cached_read
     async def get_user_roles(self, *, user_id: int) -> list[str]:
         stmt = select(Users.roles).where(Users.user_id == user_id)
         result = await self.session.execute(stmt)
@@ -95,6 +164,35 @@ class _UsersDB:
         roles = row[0] if row else None
         return roles if roles else ["guest"]
 
+    async def get_profile_snapshot(self, *, user_id: int) -> dict[str, Any] | None:
+        """Everything the main menu and role checks need about a user, in one query.
+
+        Roles and flags from ``users``, the forum registration and whether
+        the creative selection part 2 has been answered.
+        """
+        result = await self.session.execute(
+            text(
+                """
+                SELECT u.roles, u.is_blocked,
+                       fr.user_id IS NOT NULL AS forum_registered,
+                       fr.status AS forum_status, fr.track AS forum_track,
+                       COALESCE(
+                           NULLIF(ca.part2_open_q1, ''), NULLIF(ca.part2_open_q2, ''),
+                           NULLIF(ca.part2_open_q3, ''), NULLIF(ca.part2_case_q1, ''),
+                           NULLIF(ca.part2_case_q2, ''), NULLIF(ca.part2_case_q3, '')
+                       ) IS NOT NULL AS creative_part2_done
+                  FROM users u
+                  LEFT JOIN bot_forum_registrations fr ON fr.user_id = u.user_id
+                  LEFT JOIN creative_applications ca ON ca.user_id = u.user_id
+                 WHERE u.user_id = :user_id
+                 LIMIT 1
+                """
+            ),
+            {"user_id": user_id},
+        )
+        row = result.mappings().first()
+        return dict(row) if row else None
+
     async def set_user_roles(self, *, user_id: int, roles: list[str], granted_by: int | None = None) -> None:
         stmt = (
             update(Users)
@@ -102,6 +200,7 @@ class _UsersDB:
             .values(roles=roles or ["guest"])
         )
         await self.session.execute(stmt)
+        mark_user_context_stale(self.session, user_id)
 
         if granted_by:
             logger.info(
@@ -154,3 +253,44 @@ class _UsersDB:
             {"role": role},
         )
         return [row.user_id for row in result]
+
+    async def list_user_ids_page(
+        self,
+        *,
+        after: int | None = None,
+        limit: int = 1000,
+        where: Sequence[ColumnElement[bool]] = (),
+    ) -> list[int]:
+        """One keyset page: ``WHERE user_id > :after ORDER BY user_id LIMIT :limit``."""
+        stmt = select(Users.user_id).where(*where).order_by(Users.user_id).limit(limit)
+        if after is not None:
+            stmt = stmt.where(Users.user_id > after)
+        result = await self.session.execute(stmt)
+        return list(result.scalars().all())
+
+    async def count_user_ids(self, *, where: Sequence[ColumnElement[bool]] = ()) -> int:
+        result = await self.session.execute(select(func.count()).select_from(Users).where(*where))
+        return result.scalar_one()
+
+    async def get_template_context(self, *, user_ids: Collection[int]) -> dict[int, dict[str, Any]]:
+        """Personalisation fields for many users in one joined ``= ANY(:ids)`` query."""
+        if not user_ids:
+            return {}
+        result = await self.session.execute(
+            text(
+                """
+                SELECT u.user_id, ui.full_name, ui.username, fr.track
+                  FROM users u
+                  LEFT JOIN user_info ui ON ui.user_id = u.user_id
+                  LEFT JOIN LATERAL (
+                        SELECT track
+                          FROM bot_forum_registrations
+                         WHERE user_id = u.user_id
+                         LIMIT 1
+                  ) fr ON TRUE
+                 WHERE u.user_id = ANY(:ids)
+                """
+            ).bindparams(bindparam("ids", type_=ARRAY(BigInteger))),
+            {"ids": list(user_ids)},
+        )
+        return {row["user_id"]: dict(row) for row in result.mappings()}
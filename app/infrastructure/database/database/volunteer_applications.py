@@ -10,6 +10,7 @@ from app.infrastructure.database.models.volunteer_application import (
     VolunteerApplicationModel,
     VolunteerApplications,
 )
+from app.infrastructure.database.database.read_cache import cached_read
 
 logger = logging.getLogger(__name__)
 
@@ -49,6 +50,7 @@ class _VolunteerApplicationsDB:
             normalized.function,
         )
 
+    @cached_read
     async def get_application(self, *, user_id: int) -> VolunteerApplicationModel | None:
         """Retrieve a user's volunteer application."""
         stmt = select(VolunteerApplications).where(
@@ -10,6 +10,7 @@ from app.infrastructure.database.models.volunteer_selection_part2 import (
     VolSelPart2Model,
     VolSelPart2,
 )
+from app.infrastructure.database.database.read_cache import cached_read
 
 logger = logging.getLogger(__name__)
 
@@ -41,6 +42,7 @@ class _VolSelPart2DB:
             model.user_id,
         )
 
+    @cached_read
     async def get(self, *, user_id: int) -> VolSelPart2Model | None:
         """Retrieve an existing part 2 submission for a user, or None."""
         stmt = select(VolSelPart2).where(VolSelPart2.user_id == user_id)
@@ -0,0 +1,84 @@
+"""SQLAlchemy models for resumable broadcast runs."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import BigInteger, ForeignKey, Integer, SmallInteger, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.infrastructure.database.models.types import created, intpk, updated
+from app.infrastructure.database.orm.base import Base
+
+
+@dataclass(slots=True)
+class BroadcastRunModel:
+    id: int
+    key: str
+    title: str | None
+    status: str
+    total: int
+    sent: int
+    blocked: int
+    errors: int
+    last_user_id: int | None
+    created_at: datetime
+    updated_at: datetime
+
+
+class BroadcastRun(Base):
+    """One execution of a broadcast; ``key`` identifies it across restarts.
+
+    status values:
+      - 'running'     — in progress (or crashed; resumable)
+      - 'interrupted' — stopped by Ctrl-C / cancellation (resumable)
+      - 'completed'   — every recipient was processed
+    """
+
+    __tablename__ = "broadcast_runs"
+
+    id: Mapped[intpk]
+    key: Mapped[str] = mapped_column(String(128), nullable=False, unique=True)
+    title: Mapped[str | None] = mapped_column(Text, nullable=True)
+    status: Mapped[str] = mapped_column(String(16), nullable=False, server_default="running")
+    total: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    sent: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    blocked: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    errors: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    # Keyset position: every user_id <= last_user_id has been handled
+    last_user_id: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    created_at: Mapped[created]
+    updated_at: Mapped[updated]
+
+    def to_model(self) -> BroadcastRunModel:
+        return BroadcastRunModel(
+            id=self.id,
+            key=self.key,
+            title=self.title,
+            status=self.status,
+            total=self.total,
+            sent=self.sent,
+            blocked=self.blocked,
+            errors=self.errors,
+            last_user_id=self.last_user_id,
+            created_at=self.created_at,
+            updated_at=self.updated_at,
+        )
+
+
+class BroadcastDelivery(Base):
+    """Per-recipient outcome of a run: 'sent', 'blocked', 'partial' or 'error'.
+
+    'partial' — a multi-step delivery failed after its first step(s); it is
+    not retried.
+    """
+
+    __tablename__ = "broadcast_deliveries"
+
+    run_id: Mapped[int] = mapped_column(
+        ForeignKey("broadcast_runs.id", ondelete="CASCADE"), primary_key=True
+    )
+    user_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    status: Mapped[str] = mapped_column(String(16), nullable=False)
+    attempts: Mapped[int] = mapped_column(SmallInteger, nullable=False, server_default="1")
+    updated_at: Mapped[updated]
@@ -0,0 +1,55 @@
+"""SQLAlchemy model for the content-addressed Telegram file_id registry."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import BigInteger, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.infrastructure.database.models.types import created, updated
+from app.infrastructure.database.orm.base import Base
+
+
+@dataclass(slots=True)
+class MediaFileModel:
+    bot_id: int
+    content_hash: str
+    kind: str
+    file_id: str
+    source_path: str | None
+    size: int | None
+    created_at: datetime
+    updated_at: datetime
+
+
+class MediaFile(Base):
+    """file_id obtained by one bot for one file content.
+
+    file_ids are only valid for the bot that uploaded the file, hence
+    ``bot_id`` in the key. ``kind`` is 'photo' or 'document': the same bytes
+    sent both ways get different file_ids.
+    """
+
+    __tablename__ = "media_files"
+
+    bot_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    content_hash: Mapped[str] = mapped_column(String(64), primary_key=True)  # sha256 hex
+    kind: Mapped[str] = mapped_column(String(16), primary_key=True)
+    file_id: Mapped[str] = mapped_column(Text, nullable=False)
+    source_path: Mapped[str | None] = mapped_column(Text, nullable=True)
+    size: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    created_at: Mapped[created]
+    updated_at: Mapped[updated]
+
+    def to_model(self) -> MediaFileModel:
+        return MediaFileModel(
+            bot_id=self.bot_id,
+            content_hash=self.content_hash,
+            kind=self.kind,
+            file_id=self.file_id,
+            source_path=self.source_path,
+            size=self.size,
+            created_at=self.created_at,
+            updated_at=self.updated_at,
+        )
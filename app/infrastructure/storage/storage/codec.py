@@ -0,0 +1,73 @@
+"""Value encoding for FSM data records.
+
+``json`` is what the stock ``RedisStorage`` writes. ``msgpack`` (ormsgpack)
+is smaller and faster for the long text answers kept in dialog_data, and
+payloads of at least ``compress_min_bytes`` are additionally zstd-compressed
+(needs the optional ``zstandard`` package).
+
+Reading does not depend on the configured format: a value starting with
+``{`` is JSON, a zstd frame is decompressed first, anything else is
+msgpack. Keys written by the old storage stay readable and are rewritten in
+the new format on their next save, so switching formats needs no downtime
+(``scripts/utils/migrate_fsm_storage.py`` converts the rest eagerly).
+"""
+from __future__ import annotations
+
+import json
+from typing import Any
+
+import ormsgpack
+
+try:
+    import zstandard
+except ImportError:  # optional: compression is off without it
+    zstandard = None
+
+FORMAT_JSON = "json"
+FORMAT_MSGPACK = "msgpack"
+
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+class FsmCodec:
+    def __init__(
+        self,
+        fmt: str = FORMAT_JSON,
+        *,
+        compress_min_bytes: int = 0,
+        level: int = 3,
+    ) -> None:
+        if fmt not in (FORMAT_JSON, FORMAT_MSGPACK):
+            raise ValueError(f"Unknown FSM storage format: {fmt!r}")
+        if compress_min_bytes and zstandard is None:
+            raise RuntimeError("zstd compression needs the zstandard package")
+        self.fmt = fmt
+        self.compress_min_bytes = compress_min_bytes
+        self._compressor = zstandard.ZstdCompressor(level=level) if compress_min_bytes else None
+        self._decompressor = zstandard.ZstdDecompressor() if zstandard is not None else None
+
+    def dumps(self, data: dict[str, Any]) -> bytes:
+        raw = None
+        if self.fmt == FORMAT_MSGPACK:
+            try:
+                raw = ormsgpack.packb(data)
+            except TypeError:
+                # Non-str keys: JSON turns them into strings, msgpack would keep ints.
+                # Stay JSON-compatible for such records
+                raw = None
+        if raw is None:
+            raw = json.dumps(data).encode()
+        if self._compressor is not None and len(raw) >= self.compress_min_bytes:
+            return self._compressor.compress(raw)
+        return raw
+
+    def loads(self, raw: bytes | str) -> dict[str, Any]:
+        if isinstance(raw, str):
+            return json.loads(raw)
+        if raw[:4] == _ZSTD_MAGIC:
+            if self._decompressor is None:
+                raise RuntimeError("zstd-compressed FSM record, but zstandard is not installed")
+            raw = self._decompressor.decompress(raw)
+        if raw[:1] == b"{":
+            return json.loads(raw)
+        return ormsgpack.unpackb(raw)
@@ -1,21 +1,58 @@
-from typing import Any, Optional, Self
+"""FSM storage in NATS JetStream key-value buckets.
 
-import ormsgpack
-from aiogram.filters.state import StateType
+States and data live in two buckets, so one logical key holds both, as the
+``:state`` / ``:data`` pair does in Redis. Keys are built by the same
+``DefaultKeyBuilder(with_bot_id=True, with_destiny=True)`` as the Redis
+storage and then mapped to a valid KV key: every ``:``-separated part
+becomes one ``.``-separated token, characters outside ``[-/_a-zA-Z0-9]``
+are escaped as ``=XX`` and an empty part (the default aiogram-dialog stack
+id) is ``=``. ``fsm:1:42:42:aiogd:stack:`` becomes ``fsm.1.42.42.aiogd.stack.=``.
+All keys of a chat then match ``fsm.{bot_id}.{chat_id}.>``, which the
+force-finish helpers (``get_chat_data``, ``clear_chat``) watch instead of
+keeping an index.
+
+``state_ttl`` / ``data_ttl`` are the buckets' max age: like ``SET ... EX``
+a value expires that long after its last write. TTL and history of an
+existing bucket are brought in line with the settings on start.
+Data records are encoded by ``FsmCodec``; states are plain UTF-8.
+"""
+from __future__ import annotations
+
+import re
+from datetime import timedelta
+from typing import Any, Dict, Mapping, Optional, Self, Union
+
+from aiogram.exceptions import DataNotDictLikeError
 from aiogram.fsm.state import State
 from aiogram.fsm.storage.base import (
     BaseStorage,
     DefaultKeyBuilder,
     KeyBuilder,
+    StateType,
     StorageKey,
 )
-
 from nats.aio.client import Client
 from nats.js import JetStreamContext
-from nats.js.api import KeyValueConfig
-from nats.js.errors import NotFoundError
+from nats.js.api import KeyValueConfig, StorageType
+from nats.js.errors import BucketNotFoundError, NotFoundError
 from nats.js.kv import KeyValue
 
+from app.infrastructure.storage.storage.codec import FORMAT_MSGPACK, FsmCodec
+
+DEFAULT_STATES_BUCKET = "fsm_states_aiogram"
+DEFAULT_DATA_BUCKET = "fsm_data_aiogram"
+DEFAULT_HISTORY = 5
+
+_UNSAFE = re.compile(r"[^-/_a-zA-Z0-9]")
+
+
+def kv_key(key: str, separator: str = ":") -> str:
+    """Map a key-builder key to a NATS KV key (one token per part, reversible)."""
+    return ".".join(
+        _UNSAFE.sub(lambda m: "".join(f"={b:02X}" for b in m.group().encode()), part) or "="
+        for part in key.split(separator)
+    )
+
 
 class NatsStorage(BaseStorage):
     def __init__(
@@ -23,59 +60,140 @@ class NatsStorage(BaseStorage):
         nc: Client,
         js: JetStreamContext,
         key_builder: Optional[KeyBuilder] = None,
-        fsm_states_bucket: str = "fsm_states_aiogram",
-        fsm_data_bucket: str = "fsm_data_aiogram",
+        fsm_states_bucket: str = DEFAULT_STATES_BUCKET,
+        fsm_data_bucket: str = DEFAULT_DATA_BUCKET,
+        state_ttl: Optional[Union[int, timedelta]] = None,
+        data_ttl: Optional[Union[int, timedelta]] = None,
+        history: int = DEFAULT_HISTORY,
+        codec: Optional[FsmCodec] = None,
     ) -> None:
         if key_builder is None:
-            key_builder = DefaultKeyBuilder()
+            key_builder = DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
         self.nc = nc
         self.js = js
+        self.key_builder = key_builder
         self.fsm_states_bucket = fsm_states_bucket
         self.fsm_data_bucket = fsm_data_bucket
-        self._key_builder = key_builder
+        self.state_ttl = state_ttl
+        self.data_ttl = data_ttl
+        self.history = history
+        self.codec = codec or FsmCodec(FORMAT_MSGPACK)
 
     async def create_storage(self) -> Self:
-        self.kv_states = await self._get_kv_states()
-        self.kv_data = await self._get_kv_data()
+        """Create (or reconcile) both buckets; call once before use."""
+        self.kv_states = await self._bucket(self.fsm_states_bucket, self.state_ttl)
+        self.kv_data = await self._bucket(self.fsm_data_bucket, self.data_ttl)
         return self
 
-    async def _get_kv_states(self) -> KeyValue:
-        return await self.js.create_key_value(
-            config=KeyValueConfig(
-                bucket=self.fsm_states_bucket, history=5, storage="file"
+    async def _bucket(self, bucket: str, ttl: Optional[Union[int, timedelta]]) -> KeyValue:
+        max_age = _seconds(ttl)
+        try:
+            kv = await self.js.key_value(bucket)
+        except BucketNotFoundError:
+            return await self.js.create_key_value(
+                config=KeyValueConfig(
+                    bucket=bucket,
+                    history=self.history,
+                    ttl=max_age,
+                    storage=StorageType.FILE,
+                )
             )
-        )
-
-    async def _get_kv_data(self) -> KeyValue:
-        return await self.js.create_key_value(
-            config=KeyValueConfig(
-                bucket=self.fsm_data_bucket, history=5, storage="file"
+        info = await self.js.stream_info(f"KV_{bucket}")
+        config = info.config
+        if (config.max_age or None) != max_age or config.max_msgs_per_subject != self.history:
+            duplicate_window = config.duplicate_window
+            if max_age and duplicate_window and duplicate_window > max_age:
+                duplicate_window = max_age
+            await self.js.update_stream(
+                config.evolve(
+                    max_age=max_age or 0,
+                    max_msgs_per_subject=self.history,
+                    duplicate_window=duplicate_window,
+                )
             )
-        )
+        return kv
+
+    def _key(self, key: StorageKey) -> str:
+        return kv_key(self.key_builder.build(key))
+
+    def _chat_filter(self, bot_id: int, chat_id: int) -> str:
+        # DefaultKeyBuilder layout: prefix, [bot_id], chat_id, ...
+        builder = self.key_builder
+        if not isinstance(builder, DefaultKeyBuilder) or builder.with_business_connection_id:
+            raise TypeError("Per-chat lookups need DefaultKeyBuilder without business connection ids")
+        parts = [builder.prefix]
+        if builder.with_bot_id:
+            parts.append(str(bot_id))
+        parts.append(str(chat_id))
+        return kv_key(builder.separator.join(parts), builder.separator) + ".>"
 
     async def set_state(self, key: StorageKey, state: StateType = None) -> None:
-        state = state.state if isinstance(state, State) else state
-        await self.kv_states.put(
-            self._key_builder.build(key), ormsgpack.packb(state or None)
-        )
+        value = state.state if isinstance(state, State) else state
+        if value is None:
+            await self.kv_states.delete(self._key(key))
+        else:
+            await self.kv_states.put(self._key(key), value.encode())
 
     async def get_state(self, key: StorageKey) -> Optional[str]:
         try:
-            entry = await self.kv_states.get(self._key_builder.build(key))
-            data = ormsgpack.unpackb(entry.value)
+            entry = await self.kv_states.get(self._key(key))
         except NotFoundError:
             return None
-        return data
+        return entry.value.decode() if entry.value else None
 
-    async def set_data(self, key: StorageKey, data: dict[str, Any]) -> None:
-        await self.kv_data.put(self._key_builder.build(key), ormsgpack.packb(data))
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            raise DataNotDictLikeError(
+                f"Data must be a dict or dict-like object, got {type(data).__name__}"
+            )
+        if not data:
+            await self.kv_data.delete(self._key(key))
+        else:
+            await self.kv_data.put(self._key(key), self.codec.dumps(data))
 
-    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
         try:
-            entry = await self.kv_data.get(self._key_builder.build(key))
-            return ormsgpack.unpackb(entry.value)
+            entry = await self.kv_data.get(self._key(key))
         except NotFoundError:
             return {}
+        return self.codec.loads(entry.value) if entry.value else {}
+
+    async def _chat_entries(self, kv: KeyValue, bot_id: int, chat_id: int, meta_only: bool) -> list:
+        # Latest revision of every live key of the chat, filtered on the server
+        watcher = await kv.watch(self._chat_filter(bot_id, chat_id), ignore_deletes=True, meta_only=meta_only)
+        entries = []
+        try:
+            async for entry in watcher:
+                if entry is None:
+                    break
+                entries.append(entry)
+        finally:
+            await watcher.stop()
+        return entries
+
+    async def get_chat_data(self, bot_id: int, chat_id: int) -> dict[str, dict[str, Any]]:
+        """All live data records of a chat, by KV key (one filtered watch)."""
+        return {
+            entry.key: self.codec.loads(entry.value)
+            for entry in await self._chat_entries(self.kv_data, bot_id, chat_id, meta_only=False)
+            if entry.value
+        }
+
+    async def clear_chat(self, bot_id: int, chat_id: int) -> int:
+        """Delete every state and data key of a chat; return how many there were."""
+        deleted = 0
+        for kv in (self.kv_states, self.kv_data):
+            for entry in await self._chat_entries(kv, bot_id, chat_id, meta_only=True):
+                await kv.delete(entry.key)
+                deleted += 1
+        return deleted
 
     async def close(self) -> None:
-        await self.nc.close()
+        if not self.nc.is_closed:
+            await self.nc.drain()
+
+
+def _seconds(ttl: Optional[Union[int, timedelta]]) -> Optional[float]:
+    if not ttl:
+        return None
+    return ttl.total_seconds() if isinstance(ttl, timedelta) else float(ttl)
@@ -0,0 +1,305 @@
+"""Redis FSM storage that keeps an index of every key written for a chat.
+
+aiogram-dialog spreads one chat's state over many keys
+(``fsm:{bot}:{chat}:{user}:aiogd:stack:*``, ``...:aiogd:context:{intent}:data``,
+plain FSM ``state``/``data``). Finding them by pattern means a SCAN over the
+whole keyspace. ``IndexedRedisStorage`` adds every key it writes to the set
+``fsm:index:{bot_id}:{chat_id}`` in the same pipeline as the write, so the
+keys of one chat (one user, for private chats) are one SMEMBERS away.
+
+Members of the index may outlive their keys (TTL); readers skip missing
+values. ``rebuild_index`` indexes keys written before this storage was used.
+
+Data records are encoded by ``FsmCodec`` (JSON by default, as the stock
+storage; msgpack and zstd optionally); states stay plain strings.
+
+Inside ``pipelined(bot_id, chat_id)`` (one per update, opened by
+``FsmSessionMiddleware``) every indexed key of the chat is fetched by one
+script call; reads of that chat are served from memory and writes are
+buffered, then sent in one pipeline when the block exits. Other chats are
+read and written directly. A key missing from the index is treated as absent
+only after ``rebuild_index`` has run once (``fsm:index:ready``); before that
+such reads still go to Redis.
+"""
+from __future__ import annotations
+
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Mapping, Optional, cast
+
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import StateType, StorageKey
+from aiogram.fsm.storage.redis import RedisStorage
+from redis.asyncio import Redis
+
+from app.infrastructure.storage.storage.codec import FsmCodec
+
+INDEX_KEY = "fsm:index:{bot_id}:{chat_id}"
+# Set by rebuild_index: from then on every existing key is indexed
+INDEX_READY_KEY = "fsm:index:ready"
+DEFAULT_PREFETCH_MAX_KEYS = 64
+
+# KEYS[1] index set; deletes every indexed key and the index itself atomically,
+# so a key written concurrently is either deleted or stays indexed
+_CLEAR = """
+local keys = redis.call('SMEMBERS', KEYS[1])
+for i = 1, #keys, 500 do
+  redis.call('DEL', unpack(keys, i, math.min(i + 499, #keys)))
+end
+redis.call('DEL', KEYS[1])
+return #keys
+"""
+
+
+# KEYS[1] index set, KEYS[2] ready flag; ARGV[1] max keys
+# Returns {complete, key, value, key, value, ...}; nothing is prefetched for
+# chats with more than ARGV[1] keys (big groups)
+_PREFETCH = """
+local n = redis.call('SCARD', KEYS[1])
+if n > tonumber(ARGV[1]) then
+  return {0}
+end
+local out = {redis.call('EXISTS', KEYS[2])}
+if n == 0 then
+  return out
+end
+local keys = redis.call('SMEMBERS', KEYS[1])
+local values = redis.call('MGET', unpack(keys))
+for i = 1, #keys do
+  out[#out + 1] = keys[i]
+  out[#out + 1] = values[i]
+end
+return out
+"""
+
+
+class _Session:
+    __slots__ = ("storage", "bot_id", "chat_id", "complete", "values", "pending", "closed")
+
+    def __init__(self, storage: IndexedRedisStorage, bot_id: int, chat_id: int) -> None:
+        self.storage = storage
+        self.bot_id = bot_id
+        self.chat_id = chat_id
+        self.complete = False  # a key not in ``values`` does not exist
+        self.values: dict[str, Any] = {}  # raw Redis values, None = absent
+        self.pending: dict[str, Any] = {}  # key -> TTL of buffered writes
+        self.closed = False
+
+
+# Tasks started during an update inherit it; they see ``closed`` once the update is done
+_SESSION: ContextVar[Optional[_Session]] = ContextVar("fsm_session", default=None)
+
+
+class IndexedRedisStorage(RedisStorage):
+    def __init__(
+        self,
+        redis: Redis,
+        *args: Any,
+        codec: Optional[FsmCodec] = None,
+        prefetch_max_keys: int = DEFAULT_PREFETCH_MAX_KEYS,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(redis, *args, **kwargs)
+        self.codec = codec or FsmCodec()
+        self.prefetch_max_keys = prefetch_max_keys
+        self._clear = redis.register_script(_CLEAR)
+        self._prefetch = redis.register_script(_PREFETCH)
+        self._sessions = 0
+        self._prefetched = 0
+        self._hits = 0
+        self._misses = 0
+        self._flushed = 0
+
+    @staticmethod
+    def index_key(bot_id: int, chat_id: int) -> str:
+        return INDEX_KEY.format(bot_id=bot_id, chat_id=chat_id)
+
+    def _index_ttl(self) -> Any:
+        # The index must live as long as the longest-lived key it lists
+        if self.state_ttl is None or self.data_ttl is None:
+            return None
+        return max(self.state_ttl, self.data_ttl, key=_seconds)
+
+    def _queue_write(self, pipe: Any, index_key: str, redis_key: str, value: Any, ttl: Any) -> None:
+        if value is None:
+            pipe.delete(redis_key)
+            pipe.srem(index_key, redis_key)
+        else:
+            pipe.set(redis_key, value, ex=ttl)
+            pipe.sadd(index_key, redis_key)
+
+    async def _write(self, key: StorageKey, redis_key: str, value: Any, ttl: Any) -> None:
+        session = self._session_for(key)
+        if session is not None:
+            session.values[redis_key] = value
+            session.pending[redis_key] = ttl
+            return
+        index_key = self.index_key(key.bot_id, key.chat_id)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            self._queue_write(pipe, index_key, redis_key, value, ttl)
+            index_ttl = self._index_ttl()
+            if value is not None and index_ttl is not None:
+                pipe.expire(index_key, index_ttl)
+            await pipe.execute()
+
+    async def _read(self, key: StorageKey, redis_key: str) -> Any:
+        session = self._session_for(key)
+        if session is None:
+            return await self.redis.get(redis_key)
+        if redis_key in session.values:
+            self._hits += 1
+            return session.values[redis_key]
+        value = None
+        if not session.complete:
+            self._misses += 1
+            value = await self.redis.get(redis_key)
+        session.values[redis_key] = value
+        return value
+
+    def _session_for(self, key: StorageKey) -> Optional[_Session]:
+        session = _SESSION.get()
+        if (
+            session is None
+            or session.closed
+            or session.storage is not self
+            or session.bot_id != key.bot_id
+            or session.chat_id != key.chat_id
+        ):
+            return None
+        return session
+
+    @asynccontextmanager
+    async def pipelined(self, bot_id: int, chat_id: int) -> AsyncIterator[None]:
+        """Serve this chat's keys from one prefetch and write them back in one pipeline."""
+        session = _Session(self, bot_id, chat_id)
+        raw = await self._prefetch(
+            keys=[self.index_key(bot_id, chat_id), INDEX_READY_KEY],
+            args=[self.prefetch_max_keys],
+        )
+        session.complete = bool(raw[0])
+        for member, value in zip(raw[1::2], raw[2::2], strict=True):
+            session.values[member.decode() if isinstance(member, bytes) else member] = value
+        self._sessions += 1
+        self._prefetched += len(session.values)
+        token = _SESSION.set(session)
+        try:
+            yield
+        finally:
+            _SESSION.reset(token)
+            session.closed = True
+            await self._flush(session)
+
+    async def _flush(self, session: _Session) -> None:
+        pending, session.pending = session.pending, {}
+        if not pending:
+            return
+        index_key = self.index_key(session.bot_id, session.chat_id)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for redis_key, ttl in pending.items():
+                self._queue_write(pipe, index_key, redis_key, session.values.get(redis_key), ttl)
+            index_ttl = self._index_ttl()
+            if index_ttl is not None and any(session.values.get(k) is not None for k in pending):
+                pipe.expire(index_key, index_ttl)
+            await pipe.execute()
+        self._flushed += len(pending)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        value = None if state is None else cast(str, state.state if isinstance(state, State) else state)
+        await self._write(key, self.key_builder.build(key, "state"), value, self.state_ttl)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        value = await self._read(key, self.key_builder.build(key, "state"))
+        if isinstance(value, bytes):
+            return value.decode("utf-8")
+        return cast(Optional[str], value)
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            raise DataNotDictLikeError(
+                f"Data must be a dict or dict-like object, got {type(data).__name__}"
+            )
+        value = self.codec.dumps(data) if data else None
+        await self._write(key, self.key_builder.build(key, "data"), value, self.data_ttl)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        value = await self._read(key, self.key_builder.build(key, "data"))
+        if value is None:
+            return {}
+        return self.codec.loads(value)
+
+    async def chat_keys(self, bot_id: int, chat_id: int) -> list[str]:
+        await self._flush_current(bot_id, chat_id)
+        members = await self.redis.smembers(self.index_key(bot_id, chat_id))
+        return [m.decode() if isinstance(m, bytes) else m for m in members]
+
+    async def get_chat_data(self, bot_id: int, chat_id: int) -> dict[str, dict[str, Any]]:
+        """All live data records of a chat, by Redis key (one SMEMBERS + one MGET)."""
+        keys = [k for k in await self.chat_keys(bot_id, chat_id) if k.endswith(":data")]
+        if not keys:
+            return {}
+        values = await self.redis.mget(keys)
+        return {
+            key: self.codec.loads(value)
+            for key, value in zip(keys, values, strict=True)
+            if value is not None
+        }
+
+    async def clear_chat(self, bot_id: int, chat_id: int) -> int:
+        """Delete every state and data key of a chat; return how many were indexed."""
+        cleared = int(await self._clear(keys=[self.index_key(bot_id, chat_id)]))
+        session = self._session_for(StorageKey(bot_id=bot_id, chat_id=chat_id, user_id=chat_id))
+        if session is not None:
+            session.values.clear()
+            session.pending.clear()
+        return cleared
+
+    async def _flush_current(self, bot_id: int, chat_id: int) -> None:
+        session = self._session_for(StorageKey(bot_id=bot_id, chat_id=chat_id, user_id=chat_id))
+        if session is not None:
+            await self._flush(session)
+
+    async def is_index_ready(self) -> bool:
+        return bool(await self.redis.exists(INDEX_READY_KEY))
+
+    def snapshot(self) -> dict[str, Any]:
+        """Per-update session metrics since the last call."""
+        snapshot = {
+            "sessions": self._sessions,
+            "prefetched": self._prefetched,
+            "hits": self._hits,
+            "misses": self._misses,
+            "flushed": self._flushed,
+        }
+        self._sessions = self._prefetched = self._hits = self._misses = self._flushed = 0
+        return snapshot
+
+    async def rebuild_index(self, match: str = "fsm:*", batch: int = 1000) -> int:
+        """Index existing keys (one full SCAN); run once after switching to this storage."""
+        indexed = 0
+        async with self.redis.pipeline(transaction=False) as pipe:
+            async for raw in self.redis.scan_iter(match=match, count=batch):
+                key = raw.decode() if isinstance(raw, bytes) else raw
+                parts = key.split(":")
+                # fsm:{bot_id}:{chat_id}:...:(state|data); skips locks and the index sets
+                if len(parts) < 5 or parts[-1] not in ("state", "data"):
+                    continue
+                try:
+                    index_key = self.index_key(int(parts[1]), int(parts[2]))
+                except ValueError:
+                    continue
+                pipe.sadd(index_key, key)
+                index_ttl = self._index_ttl()
+                if index_ttl is not None:
+                    pipe.expire(index_key, index_ttl)
+                indexed += 1
+                if len(pipe) >= batch:
+                    await pipe.execute()
+            pipe.set(INDEX_READY_KEY, 1)
+            await pipe.execute()
+        return indexed
+
+
+def _seconds(ttl: Any) -> float:
+    return ttl.total_seconds() if hasattr(ttl, "total_seconds") else float(ttl)
@@ -0,0 +1,47 @@
+"""Shared broadcast engine"""
+
+from .audience import KeysetAudience
+from .checkpoint import RunCheckpoint, RunCompletedError, make_run_key
+from .dead_recipients import DeadRecipientSink
+from .engine import BroadcastEngine, BroadcastStats, SendStep, is_dead_chat_error
+from .rate_limit import (
+    LANE_BULK,
+    LANE_INTERACTIVE,
+    AdaptiveRateLimiter,
+    PriorityRequestMiddleware,
+    RateLimiter,
+    RetryAfterFeedbackMiddleware,
+    TokenBucket,
+    get_default_limiter,
+)
+from .redis_limiter import RedisRateLimiter
+from .segments import SegmentError, compile_segment, load_cohort, load_segment
+from .templating import MessageTemplate, PersonalizedMessage, TemplateError
+
+__all__ = [
+    "LANE_BULK",
+    "LANE_INTERACTIVE",
+    "AdaptiveRateLimiter",
+    "BroadcastEngine",
+    "BroadcastStats",
+    "DeadRecipientSink",
+    "KeysetAudience",
+    "MessageTemplate",
+    "PersonalizedMessage",
+    "PriorityRequestMiddleware",
+    "RateLimiter",
+    "RedisRateLimiter",
+    "RetryAfterFeedbackMiddleware",
+    "RunCheckpoint",
+    "RunCompletedError",
+    "SegmentError",
+    "SendStep",
+    "TemplateError",
+    "TokenBucket",
+    "compile_segment",
+    "get_default_limiter",
+    "is_dead_chat_error",
+    "load_cohort",
+    "load_segment",
+    "make_run_key",
+]
@@ -0,0 +1,57 @@
+"""Streaming broadcast audiences read from ``users`` with keyset pagination."""
+from __future__ import annotations
+
+import logging
+from collections.abc import AsyncIterator
+
+from sqlalchemy import ColumnElement
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.infrastructure.database.database.db import DB
+from app.services.broadcast.checkpoint import RunCheckpoint
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 1000
+
+
+class KeysetAudience:
+    """Async iterable of user_ids matching ``where``, in ascending order.
+
+    Each page is one short query (``WHERE user_id > :last ORDER BY user_id
+    LIMIT n``) in its own session, so sending starts after the first page and
+    memory stays flat however large the audience is. With a keyset
+    ``checkpoint`` the stream starts after the run's stored position.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        *where: ColumnElement[bool],
+        page_size: int = DEFAULT_PAGE_SIZE,
+        checkpoint: RunCheckpoint | None = None,
+    ) -> None:
+        if checkpoint is not None and not checkpoint.keyset:
+            raise ValueError("KeysetAudience needs a RunCheckpoint created with keyset=True")
+        self.session_factory = session_factory
+        self.where = where
+        self.page_size = max(1, page_size)
+        self.checkpoint = checkpoint
+
+    async def count(self) -> int:
+        async with self.session_factory() as session:
+            return await DB(session).users.count_user_ids(where=self.where)
+
+    async def __aiter__(self) -> AsyncIterator[int]:
+        # Read lazily: the engine opens the checkpoint before the first page
+        after = self.checkpoint.resume_position if self.checkpoint is not None else None
+        while True:
+            async with self.session_factory() as session:
+                page = await DB(session).users.list_user_ids_page(
+                    after=after, limit=self.page_size, where=self.where
+                )
+            for user_id in page:
+                yield user_id
+            if len(page) < self.page_size:
+                return
+            after = page[-1]
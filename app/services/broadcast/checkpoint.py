@@ -0,0 +1,166 @@
+"""Persistent per-recipient checkpoints that make broadcast runs resumable."""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+from collections import deque
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.infrastructure.database.database.broadcast_runs import DONE_STATUSES
+from app.infrastructure.database.database.db import DB
+from app.infrastructure.database.models.broadcast_runs import BroadcastRunModel
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_EVERY = 100
+
+
+class RunCompletedError(RuntimeError):
+    """The run key belongs to a run that has already completed."""
+
+
+def make_run_key(name: str, *content: str) -> str:
+    """Stable run key: the same script with the same message resumes the same run."""
+    digest = hashlib.sha1("\x1f".join(content).encode("utf-8")).hexdigest()[:12]
+    return f"{name}:{digest}"
+
+
+class RunCheckpoint:
+    """Buffers delivery outcomes and writes them to Postgres in batches.
+
+    ``open()`` creates (or reopens) the ``broadcast_runs`` row and loads the
+    recipients that were already handled, so the engine can skip them. A
+    completed run is not reopened: ``open()`` raises ``RunCompletedError``.
+
+    With ``keyset=True`` recipients must arrive in ascending user_id order
+    (as a ``KeysetAudience`` yields them). The checkpoint then also tracks a
+    keyset position — the highest user_id up to which every recipient has an
+    outcome — and stores it as ``broadcast_runs.last_user_id``. A resumed
+    stream starts right after it, so only outcomes past it are loaded.
+    The position never passes a recipient whose outcome is not in
+    ``DONE_STATUSES``: a resumed run re-sends ``error`` recipients, as it
+    does without keyset.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        key: str,
+        *,
+        title: str | None = None,
+        flush_every: int = DEFAULT_FLUSH_EVERY,
+        keyset: bool = False,
+    ) -> None:
+        self.session_factory = session_factory
+        self.key = key
+        self.title = title
+        self.flush_every = max(1, flush_every)
+        self.keyset = keyset
+        self.run: BroadcastRunModel | None = None
+        # Position loaded by open(); the live one advances as outcomes arrive
+        self.resume_position: int | None = None
+        self.position: int | None = None
+        self._done: set[int] = set()
+        self._pending: list[tuple[int, str]] = []
+        self._lock = asyncio.Lock()
+        # Issued-but-unfinished ids in stream order, and finished ids that are
+        # not yet folded into ``position``
+        self._in_flight: deque[int] = deque()
+        self._finished: set[int] = set()
+        self._last_issued: int | None = None
+        # Lowest failed user_id: the position stops below it for this run
+        self._barrier: int | None = None
+
+    async def open(self, total: int | None = None) -> BroadcastRunModel:
+        async with self.session_factory() as session:
+            async with session.begin():
+                db = DB(session)
+                run = await db.broadcast_runs.start(key=self.key, title=self.title, total=total)
+                if run.status == "completed":
+                    raise RunCompletedError(
+                        f"Broadcast run {self.key!r} (id={run.id}) is already completed; "
+                        "change the message or the run key to send it again"
+                    )
+                self.run = run
+                if self.keyset:
+                    self.resume_position = self.position = self.run.last_user_id
+                self._done = await db.broadcast_runs.list_done_user_ids(
+                    run_id=self.run.id, after=self.resume_position
+                )
+        if self._done or self.resume_position is not None:
+            logger.info(
+                "Resuming broadcast run id=%d key=%s: position=%s, %d more recipients already handled",
+                self.run.id, self.key, self.resume_position, len(self._done),
+            )
+        return self.run
+
+    def is_done(self, chat_id: int) -> bool:
+        if self.resume_position is not None and chat_id <= self.resume_position:
+            return True
+        return chat_id in self._done
+
+    @property
+    def done_count(self) -> int:
+        return len(self._done)
+
+    def issue(self, chat_id: int) -> None:
+        """Note that ``chat_id`` was handed to a worker; called in stream order."""
+        if not self.keyset:
+            return
+        last = self._last_issued if self._last_issued is not None else self.position
+        if last is not None and chat_id <= last:
+            raise ValueError(
+                f"Keyset checkpoint {self.key!r} got user_id {chat_id} after {last}; "
+                "recipients must be in ascending order"
+            )
+        self._last_issued = chat_id
+        # Past a failure the position cannot move, no need to track the order
+        if self._barrier is None:
+            self._in_flight.append(chat_id)
+
+    async def record(self, chat_id: int, status: str) -> None:
+        self._pending.append((chat_id, status))
+        if self.keyset:
+            if status not in DONE_STATUSES:
+                if self._barrier is None or chat_id < self._barrier:
+                    self._barrier = chat_id
+            elif self._barrier is None or chat_id < self._barrier:
+                self._finished.add(chat_id)
+            # A failed id is never in _finished: the position stops right below it
+            while self._in_flight and self._in_flight[0] in self._finished:
+                self.position = self._in_flight.popleft()
+                self._finished.discard(self.position)
+        if len(self._pending) >= self.flush_every:
+            await self.flush()
+
+    async def flush(self) -> None:
+        async with self._lock:
+            if not self._pending or self.run is None:
+                return
+            batch, self._pending = self._pending, []
+            # Every outcome up to the current position is in this batch or an earlier one
+            position = self.position
+            try:
+                async with self.session_factory() as session:
+                    async with session.begin():
+                        await DB(session).broadcast_runs.record_deliveries(
+                            run_id=self.run.id, outcomes=batch, position=position
+                        )
+            except Exception:
+                # Keep the outcomes so the next flush (or close) retries them
+                self._pending[:0] = batch
+                raise
+
+    async def close(self, *, completed: bool) -> BroadcastRunModel | None:
+        if self.run is None:
+            return None
+        await self.flush()
+        async with self.session_factory() as session:
+            async with session.begin():
+                self.run = await DB(session).broadcast_runs.finish(
+                    run_id=self.run.id,
+                    status="completed" if completed else "interrupted",
+                )
+        return self.run
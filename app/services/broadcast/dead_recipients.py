@@ -0,0 +1,52 @@
+"""Batched write-back of unreachable broadcast recipients to ``users.is_alive``."""
+from __future__ import annotations
+
+import asyncio
+import logging
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.infrastructure.database.database.db import DB
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_EVERY = 500
+
+
+class DeadRecipientSink:
+    """Collects blocked/deactivated chats during a run and marks them dead in bulk.
+
+    One ``UPDATE ... WHERE user_id = ANY(:ids)`` per ``flush_every`` ids replaces
+    a connection round trip per failed delivery.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        *,
+        flush_every: int = DEFAULT_FLUSH_EVERY,
+    ) -> None:
+        self.session_factory = session_factory
+        self.flush_every = max(1, flush_every)
+        self.marked = 0
+        self._pending: list[int] = []
+        self._lock = asyncio.Lock()
+
+    async def add(self, chat_id: int) -> None:
+        self._pending.append(chat_id)
+        if len(self._pending) >= self.flush_every:
+            await self.flush()
+
+    async def flush(self) -> None:
+        async with self._lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, []
+            try:
+                async with self.session_factory() as session:
+                    async with session.begin():
+                        self.marked += await DB(session).users.mark_dead(user_ids=batch)
+            except Exception:
+                # Keep the ids so the next flush retries them
+                self._pending[:0] = batch
+                raise
@@ -0,0 +1,290 @@
+"""Concurrent broadcast engine shared by the bot and the ``scripts/`` senders.
+
+A run feeds recipients into a bounded queue that a fixed pool of workers
+drains. Every Bot API call first takes a token from the process-wide
+adaptive limiter, so concurrent runs never exceed the global budget, and
+multi-message deliveries (e.g. media group + text) are paced per chat.
+``TelegramRetryAfter`` is fed back into the limiter, which slows every
+sender down at once instead of one coroutine sleeping on its own.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections.abc import AsyncIterable, Awaitable, Callable, Iterable, Sequence
+from dataclasses import dataclass, field
+from typing import Any
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramRetryAfter,
+)
+
+from app.services.broadcast.checkpoint import RunCheckpoint
+from app.services.broadcast.dead_recipients import DeadRecipientSink
+from app.services.broadcast.rate_limit import (
+    LANE_BULK,
+    RateLimiter,
+    get_default_limiter,
+    token_held,
+)
+
+logger = logging.getLogger(__name__)
+
+SendStep = Callable[[Bot, int], Awaitable[Any]]
+
+DEFAULT_CONCURRENCY = 16
+DEFAULT_PER_CHAT_INTERVAL = 1.0  # Telegram: ~1 message/second inside one chat
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_PROGRESS_EVERY = 100
+
+_DEAD_CHAT_MARKERS = (
+    "chat not found",
+    "user not found",
+    "user is deactivated",
+    "user_is_blocked",
+    "blocked",
+)
+
+
+def is_dead_chat_error(exc: Exception) -> bool:
+    """True when the error means the chat will never accept messages again."""
+    if isinstance(exc, TelegramForbiddenError):
+        return True
+    if isinstance(exc, TelegramBadRequest):
+        message = str(exc).lower()
+        return any(marker in message for marker in _DEAD_CHAT_MARKERS)
+    return False
+
+
+@dataclass(slots=True)
+class BroadcastStats:
+    total: int = 0
+    sent: int = 0
+    blocked: int = 0
+    errors: int = 0
+    skipped: int = 0
+    blocked_ids: list[int] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def processed(self) -> int:
+        return self.sent + self.blocked + self.errors
+
+    def as_dict(self) -> dict[str, int]:
+        return {
+            "total": self.total,
+            "sent": self.sent,
+            "blocked": self.blocked,
+            "errors": self.errors,
+            "skipped": self.skipped,
+        }
+
+
+class BroadcastEngine:
+    """Send one delivery to many chats at the highest safe throughput."""
+
+    def __init__(
+        self,
+        bot: Bot,
+        *,
+        limiter: RateLimiter | None = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        per_chat_interval: float = DEFAULT_PER_CHAT_INTERVAL,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        progress_every: int = DEFAULT_PROGRESS_EVERY,
+        log: logging.Logger | None = None,
+    ) -> None:
+        self.bot = bot
+        self.limiter = limiter or get_default_limiter()
+        self.concurrency = max(1, concurrency)
+        self.per_chat_interval = per_chat_interval
+        self.max_retries = max_retries
+        self.progress_every = max(1, progress_every)
+        self.log = log or logger
+
+    async def run(
+        self,
+        recipients: Iterable[int] | AsyncIterable[int],
+        send: SendStep | Sequence[SendStep],
+        *,
+        total: int | None = None,
+        checkpoint: RunCheckpoint | None = None,
+        dead_sink: DeadRecipientSink | None = None,
+    ) -> BroadcastStats:
+        """Deliver ``send`` to every chat in ``recipients``.
+
+        ``send`` is either one coroutine function ``(bot, chat_id)`` or a
+        sequence of them that are executed in order for each chat. With a
+        ``checkpoint`` every outcome is persisted, and recipients handled by
+        an earlier attempt of the same run are skipped. With a ``dead_sink``
+        unreachable chats are marked ``is_alive = false`` in batches.
+        """
+        steps: tuple[SendStep, ...] = tuple(send) if isinstance(send, Sequence) else (send,)
+        if total is None and isinstance(recipients, Sequence):
+            total = len(recipients)
+
+        if checkpoint is not None:
+            await checkpoint.open(total)
+
+        stats = BroadcastStats(total=total or 0)
+        queue: asyncio.Queue[int | None] = asyncio.Queue(maxsize=self.concurrency * 2)
+        started = time.monotonic()
+
+        self.log.info(
+            "Broadcast started: recipients=%s concurrency=%d rate=%.1f/s",
+            total if total is not None else "?",
+            self.concurrency,
+            self.limiter.rate,
+        )
+
+        workers = [
+            asyncio.create_task(self._worker(queue, steps, stats, checkpoint, dead_sink))
+            for _ in range(self.concurrency)
+        ]
+        completed = False
+        try:
+            await self._produce(recipients, queue, stats, checkpoint)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+            completed = True
+        finally:
+            for worker in workers:
+                worker.cancel()
+            if checkpoint is not None:
+                await checkpoint.close(completed=completed)
+            if dead_sink is not None:
+                await dead_sink.flush()
+
+        stats.elapsed = time.monotonic() - started
+        if total is None:
+            stats.total = stats.processed + stats.skipped
+        self.log.info(
+            "Broadcast complete. total=%d sent=%d blocked=%d errors=%d skipped=%d "
+            "elapsed=%.1fs limiter=%s",
+            stats.total, stats.sent, stats.blocked, stats.errors, stats.skipped, stats.elapsed,
+            self.limiter.snapshot(),
+        )
+        return stats
+
+    async def _produce(
+        self,
+        recipients: Iterable[int] | AsyncIterable[int],
+        queue: asyncio.Queue[int | None],
+        stats: BroadcastStats,
+        checkpoint: RunCheckpoint | None,
+    ) -> None:
+        async def _put(chat_id: int) -> None:
+            if checkpoint is not None and checkpoint.is_done(chat_id):
+                stats.skipped += 1
+                return
+            if checkpoint is not None:
+                checkpoint.issue(chat_id)
+            await queue.put(chat_id)
+
+        if isinstance(recipients, AsyncIterable):
+            async for chat_id in recipients:
+                await _put(chat_id)
+        else:
+            for chat_id in recipients:
+                await _put(chat_id)
+
+    async def _worker(
+        self,
+        queue: asyncio.Queue[int | None],
+        steps: tuple[SendStep, ...],
+        stats: BroadcastStats,
+        checkpoint: RunCheckpoint | None,
+        dead_sink: DeadRecipientSink | None,
+    ) -> None:
+        while True:
+            chat_id = await queue.get()
+            if chat_id is None:
+                return
+            outcome = await self._deliver(chat_id, steps, stats)
+            if checkpoint is not None:
+                try:
+                    await checkpoint.record(chat_id, outcome)
+                except Exception as exc:  # pylint: disable=broad-except
+                    self.log.error("Failed to persist broadcast checkpoint: %s", exc)
+            if dead_sink is not None and outcome == "blocked":
+                try:
+                    await dead_sink.add(chat_id)
+                except Exception as exc:  # pylint: disable=broad-except
+                    self.log.error("Failed to mark dead recipients: %s", exc)
+            if stats.processed % self.progress_every == 0:
+                self.log.info(
+                    "Progress: %d/%s sent=%d blocked=%d errors=%d rate=%.1f/s",
+                    stats.processed + stats.skipped,
+                    stats.total or "?",
+                    stats.sent,
+                    stats.blocked,
+                    stats.errors,
+                    self.limiter.rate,
+                )
+
+    async def _deliver(
+        self,
+        chat_id: int,
+        steps: tuple[SendStep, ...],
+        stats: BroadcastStats,
+    ) -> str:
+        """Deliver every step to one chat; return 'sent', 'blocked', 'partial' or 'error'.
+
+        'partial' means some steps went out before one failed: the recipient is
+        counted as an error but never retried, so nothing is sent twice.
+        """
+        last_sent: float | None = None
+        delivered = 0
+        try:
+            for step in steps:
+                if last_sent is not None:
+                    pause = self.per_chat_interval - (time.monotonic() - last_sent)
+                    if pause > 0:
+                        await asyncio.sleep(pause)
+                await self._call(chat_id, step)
+                last_sent = time.monotonic()
+                delivered += 1
+        except Exception as exc:  # pylint: disable=broad-except
+            if is_dead_chat_error(exc):
+                self.log.warning("Chat %d is unreachable: %s", chat_id, exc)
+                stats.blocked += 1
+                stats.blocked_ids.append(chat_id)
+                return "blocked"
+            stats.errors += 1
+            if delivered:
+                self.log.error(
+                    "Partial delivery to %d (%d/%d steps), not retried: %s",
+                    chat_id, delivered, len(steps), exc,
+                )
+                return "partial"
+            self.log.error("Failed to deliver to %d: %s", chat_id, exc)
+            return "error"
+        stats.sent += 1
+        return "sent"
+
+    async def _call(self, chat_id: int, step: SendStep) -> Any:
+        attempt = 0
+        while True:
+            await self.limiter.acquire(lane=LANE_BULK)
+            try:
+                with token_held():
+                    result = await step(self.bot, chat_id)
+            except TelegramRetryAfter as exc:
+                # The limiter pauses every sender and lowers the shared rate,
+                # so the retry below waits in acquire() rather than here.
+                self.limiter.on_retry_after(exc.retry_after)
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                self.log.warning(
+                    "Rate limited on chat %d — retry_after=%ds (attempt %d/%d)",
+                    chat_id, exc.retry_after, attempt, self.max_retries,
+                )
+                continue
+            self.limiter.on_success()
+            return result
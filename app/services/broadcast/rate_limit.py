@@ -0,0 +1,272 @@
+"""Token-bucket rate limiting for outbound Bot API calls.
+
+The bucket has two priority lanes. Interactive traffic (dialog replies,
+callback answers) is always served first; bulk broadcast sends only take
+tokens when no interactive request is waiting and never dig into a small
+reserve kept for interactive bursts, so campaigns use the leftover capacity.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Protocol
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import (
+    DeleteWebhook,
+    GetFile,
+    GetMe,
+    GetUpdates,
+    GetWebhookInfo,
+    Response,
+    SetWebhook,
+    TelegramMethod,
+)
+from aiogram.methods.base import TelegramType
+
+logger = logging.getLogger(__name__)
+
+# Telegram allows ~30 messages/second to different chats; keep a safety margin.
+DEFAULT_RATE = 25.0
+DEFAULT_BURST = 25.0
+MAX_RATE = 30.0
+MIN_RATE = 1.0
+# Tokens bulk sends leave in the bucket so interactive replies rarely wait
+DEFAULT_INTERACTIVE_RESERVE = 3.0
+
+LANE_INTERACTIVE = "interactive"
+LANE_BULK = "bulk"
+
+# Set while a caller already holds a token for the request in flight
+_token_held: ContextVar[bool] = ContextVar("broadcast_token_held", default=False)
+
+
+@contextmanager
+def token_held() -> Iterator[None]:
+    """Mark Bot API calls in this context as already paid for."""
+    reset = _token_held.set(True)
+    try:
+        yield
+    finally:
+        _token_held.reset(reset)
+
+
+class RateLimiter(Protocol):
+    """What ``BroadcastEngine`` and the session middlewares need from a limiter."""
+
+    rate: float
+
+    async def acquire(self, tokens: float = 1.0, *, lane: str = LANE_BULK) -> None: ...
+
+    def on_success(self) -> None: ...
+
+    def on_retry_after(self, retry_after: float) -> None: ...
+
+    def snapshot(self) -> dict[str, Any]: ...
+
+
+class TokenBucket:
+    """Token bucket with two priority lanes: ``rate`` tokens per second, up to ``capacity`` banked.
+
+    Waiters are served in FIFO order within a lane — the lane lock is held
+    while sleeping, so a burst of senders is spread evenly instead of
+    stampeding on every refill. Bulk waiters step aside while any interactive
+    waiter is queued and stop at ``interactive_reserve`` banked tokens.
+    """
+
+    def __init__(
+        self,
+        rate: float = DEFAULT_RATE,
+        capacity: float = DEFAULT_BURST,
+        *,
+        interactive_reserve: float = DEFAULT_INTERACTIVE_RESERVE,
+    ) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.interactive_reserve = max(0.0, min(float(interactive_reserve), self.capacity - 1))
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lane_locks = {LANE_INTERACTIVE: asyncio.Lock(), LANE_BULK: asyncio.Lock()}
+        self._interactive_waiting = 0
+        self._interactive_idle = asyncio.Event()
+        self._interactive_idle.set()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0, *, lane: str = LANE_BULK) -> None:
+        """Wait until ``tokens`` are available in ``lane`` and consume them."""
+        interactive = lane == LANE_INTERACTIVE
+        if interactive:
+            self._interactive_waiting += 1
+            self._interactive_idle.clear()
+        try:
+            async with self._lane_locks[lane]:
+                floor = 0.0 if interactive else self.interactive_reserve
+                while True:
+                    pause = self._paused_until - time.monotonic()
+                    if pause > 0:
+                        await asyncio.sleep(pause)
+                        continue
+                    if not interactive and self._interactive_waiting:
+                        await self._interactive_idle.wait()
+                        continue
+                    self._refill()
+                    if self._tokens - tokens >= floor:
+                        self._tokens -= tokens
+                        return
+                    await asyncio.sleep((tokens + floor - self._tokens) / self.rate)
+        finally:
+            if interactive:
+                self._interactive_waiting -= 1
+                if not self._interactive_waiting:
+                    self._interactive_idle.set()
+
+    def on_success(self) -> None:
+        """Feedback hook: a request went through."""
+
+    def on_retry_after(self, retry_after: float) -> None:
+        """Feedback hook: Telegram answered 429. Hold every sender for ``retry_after``."""
+        now = time.monotonic()
+        self._paused_until = max(self._paused_until, now + retry_after)
+        self._tokens = 0.0
+        self._updated = now
+
+    def snapshot(self) -> dict[str, Any]:
+        return {"rate": round(self.rate, 2), "interactive_waiting": self._interactive_waiting}
+
+
+class AdaptiveRateLimiter(TokenBucket):
+    """AIMD token bucket that converges on the real Bot API limit.
+
+    Every 429 cuts the rate by ``decrease_factor`` (once per throttling
+    episode, so a burst of 429s from concurrent senders counts as one), and
+    each ``increase_every`` seconds of clean sending adds ``increase_step``
+    back, up to ``max_rate``.
+    """
+
+    def __init__(
+        self,
+        rate: float = DEFAULT_RATE,
+        capacity: float = DEFAULT_BURST,
+        *,
+        min_rate: float = MIN_RATE,
+        max_rate: float = MAX_RATE,
+        increase_step: float = 1.0,
+        increase_every: float = 5.0,
+        decrease_factor: float = 0.5,
+        interactive_reserve: float = DEFAULT_INTERACTIVE_RESERVE,
+    ) -> None:
+        super().__init__(rate=rate, capacity=capacity, interactive_reserve=interactive_reserve)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase_step = increase_step
+        self.increase_every = increase_every
+        self.decrease_factor = decrease_factor
+        self.throttle_events = 0
+        self._last_change = time.monotonic()
+
+    def on_success(self) -> None:
+        now = time.monotonic()
+        if self.rate >= self.max_rate or now < self._paused_until:
+            return
+        if now - self._last_change >= self.increase_every:
+            self.rate = min(self.max_rate, self.rate + self.increase_step)
+            self._last_change = now
+
+    def on_retry_after(self, retry_after: float) -> None:
+        # 429s that arrive while we are already backing off belong to the
+        # same episode and must not shrink the rate again.
+        already_throttled = time.monotonic() < self._paused_until
+        super().on_retry_after(retry_after)
+        if already_throttled:
+            return
+        self.throttle_events += 1
+        previous = self.rate
+        self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+        self._last_change = self._paused_until
+        logger.warning(
+            "Bot API flood control: retry_after=%ss, rate %.1f -> %.1f msg/s",
+            retry_after, previous, self.rate,
+        )
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "rate": round(self.rate, 2),
+            "min_rate": self.min_rate,
+            "max_rate": self.max_rate,
+            "throttle_events": self.throttle_events,
+            "interactive_waiting": self._interactive_waiting,
+        }
+
+
+class RetryAfterFeedbackMiddleware(BaseRequestMiddleware):
+    """Bot session middleware that reports every 429 to the shared limiter.
+
+    Registering it on the bot's session means flood-control answers to
+    interactive dialog traffic slow broadcasts down as well.
+    """
+
+    def __init__(self, limiter: RateLimiter) -> None:
+        self.limiter = limiter
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        try:
+            return await make_request(bot, method)
+        except TelegramRetryAfter as exc:
+            self.limiter.on_retry_after(exc.retry_after)
+            raise
+
+
+class PriorityRequestMiddleware(BaseRequestMiddleware):
+    """Bot session middleware that puts ordinary bot traffic on the interactive lane.
+
+    Requests made by ``BroadcastEngine`` already hold a bulk token (see
+    ``token_held``) and pass straight through, as do polling and other
+    housekeeping calls that Telegram does not count as outgoing messages.
+    """
+
+    _UNTHROTTLED = (GetUpdates, GetMe, GetFile, GetWebhookInfo, SetWebhook, DeleteWebhook)
+
+    def __init__(self, limiter: RateLimiter) -> None:
+        self.limiter = limiter
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        if not _token_held.get() and not isinstance(method, self._UNTHROTTLED):
+            await self.limiter.acquire(lane=LANE_INTERACTIVE)
+        return await make_request(bot, method)
+
+
+_default_limiter: TokenBucket | None = None
+
+
+def get_default_limiter() -> TokenBucket:
+    """Return the process-wide limiter shared by every broadcast in this process."""
+    global _default_limiter  # noqa: PLW0603
+    if _default_limiter is None:
+        _default_limiter = AdaptiveRateLimiter()
+    return _default_limiter
@@ -0,0 +1,209 @@
+"""Token bucket shared by several processes through Redis.
+
+The bucket state (tokens, last refill, current rate, flood-control pause)
+lives in one Redis hash and is updated by Lua scripts using Redis ``TIME``,
+so every process sees the same budget and the same 429 back-off. The rate
+adapts with the same AIMD rules as ``AdaptiveRateLimiter``.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any
+
+from redis.asyncio import Redis
+
+from app.services.broadcast.rate_limit import (
+    DEFAULT_BURST,
+    DEFAULT_RATE,
+    LANE_BULK,
+    LANE_INTERACTIVE,
+    MAX_RATE,
+    MIN_RATE,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_KEY = "broadcast:limiter"
+_KEY_TTL = 3600
+
+# KEYS[1] bucket hash
+# ARGV: requested tokens, capacity, initial rate, floor (tokens left untouched), key TTL
+# Returns {wait seconds, rate} as strings (Lua numbers would be truncated).
+_ACQUIRE = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local requested = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local floor = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts', 'rate', 'paused_until')
+local rate = tonumber(state[3]) or tonumber(ARGV[3])
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+local paused_until = tonumber(state[4]) or 0
+if now < paused_until then
+  return {tostring(paused_until - now), tostring(rate)}
+end
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens - requested >= floor then
+  tokens = tokens - requested
+else
+  wait = (requested + floor - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now), 'rate', tostring(rate))
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+return {tostring(wait), tostring(rate)}
+"""
+
+# ARGV: retry_after, initial rate, min rate, decrease factor, key TTL
+# Returns {rate, 1 if this 429 started a new throttling episode else 0}
+_RETRY_AFTER = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'rate', 'paused_until')
+local rate = tonumber(state[1]) or tonumber(ARGV[2])
+local paused_until = tonumber(state[2]) or 0
+local new_episode = 0
+if now >= paused_until then
+  new_episode = 1
+  rate = math.max(tonumber(ARGV[3]), rate * tonumber(ARGV[4]))
+  redis.call('HINCRBY', KEYS[1], 'throttle_events', 1)
+end
+paused_until = math.max(paused_until, now + tonumber(ARGV[1]))
+redis.call('HSET', KEYS[1], 'tokens', '0', 'ts', tostring(now), 'rate', tostring(rate),
+           'paused_until', tostring(paused_until), 'last_change', tostring(paused_until))
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+return {tostring(rate), new_episode}
+"""
+
+# ARGV: initial rate, max rate, increase step, increase every
+_INCREASE = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'rate', 'paused_until', 'last_change')
+local rate = tonumber(state[1]) or tonumber(ARGV[1])
+local paused_until = tonumber(state[2]) or 0
+local last_change = tonumber(state[3]) or 0
+if now >= paused_until and rate < tonumber(ARGV[2]) and now - last_change >= tonumber(ARGV[4]) then
+  rate = math.min(tonumber(ARGV[2]), rate + tonumber(ARGV[3]))
+  redis.call('HSET', KEYS[1], 'rate', tostring(rate), 'last_change', tostring(now))
+end
+return tostring(rate)
+"""
+
+
+class RedisRateLimiter:
+    """Drop-in replacement for ``AdaptiveRateLimiter`` shared across processes.
+
+    Within a process acquires are serialized (FIFO), so each process makes
+    one Redis round trip per token instead of every worker polling at once.
+    Only bulk traffic is expected here; the interactive lane skips the
+    reserve but has no local priority.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        *,
+        key: str = DEFAULT_KEY,
+        rate: float = DEFAULT_RATE,
+        capacity: float = DEFAULT_BURST,
+        min_rate: float = MIN_RATE,
+        max_rate: float = MAX_RATE,
+        increase_step: float = 1.0,
+        increase_every: float = 5.0,
+        decrease_factor: float = 0.5,
+        interactive_reserve: float = 0.0,
+    ) -> None:
+        self.redis = redis
+        self.key = key
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase_step = increase_step
+        self.increase_every = increase_every
+        self.decrease_factor = decrease_factor
+        self.interactive_reserve = interactive_reserve
+        self.throttle_events = 0
+        self._initial_rate = float(rate)
+        self._lock = asyncio.Lock()
+        self._acquire = redis.register_script(_ACQUIRE)
+        self._retry_after = redis.register_script(_RETRY_AFTER)
+        self._increase = redis.register_script(_INCREASE)
+        self._next_increase_check = 0.0
+        # Local copy of the pause so this process stops before Redis is updated
+        self._paused_until = 0.0
+        self._pending: set[asyncio.Task[Any]] = set()
+
+    async def acquire(self, tokens: float = 1.0, *, lane: str = LANE_BULK) -> None:
+        floor = 0.0 if lane == LANE_INTERACTIVE else self.interactive_reserve
+        async with self._lock:
+            while True:
+                pause = self._paused_until - time.monotonic()
+                if pause > 0:
+                    await asyncio.sleep(pause)
+                    continue
+                wait, rate = await self._acquire(
+                    keys=[self.key],
+                    args=[tokens, self.capacity, self._initial_rate, floor, _KEY_TTL],
+                )
+                self.rate = float(rate)
+                wait = float(wait)
+                if wait <= 0:
+                    return
+                await asyncio.sleep(wait)
+
+    def on_success(self) -> None:
+        # Called after every send; only ask Redis once per increase period
+        now = time.monotonic()
+        if now < self._next_increase_check:
+            return
+        self._next_increase_check = now + self.increase_every
+        self._spawn(self._report_success())
+
+    def on_retry_after(self, retry_after: float) -> None:
+        self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+        self._spawn(self._report_retry_after(retry_after))
+
+    async def _report_success(self) -> None:
+        rate = await self._increase(
+            keys=[self.key],
+            args=[self._initial_rate, self.max_rate, self.increase_step, self.increase_every],
+        )
+        self.rate = float(rate)
+
+    async def _report_retry_after(self, retry_after: float) -> None:
+        rate, new_episode = await self._retry_after(
+            keys=[self.key],
+            args=[retry_after, self._initial_rate, self.min_rate, self.decrease_factor, _KEY_TTL],
+        )
+        previous, self.rate = self.rate, float(rate)
+        if int(new_episode):
+            self.throttle_events += 1
+            logger.warning(
+                "Bot API flood control (shared): retry_after=%ss, rate %.1f -> %.1f msg/s",
+                retry_after, previous, self.rate,
+            )
+
+    def _spawn(self, coro: Any) -> None:
+        # Feedback hooks are sync; the Redis update runs in the background
+        task = asyncio.get_running_loop().create_task(coro)
+        self._pending.add(task)
+        task.add_done_callback(self._on_report_done)
+
+    def _on_report_done(self, task: asyncio.Task[Any]) -> None:
+        self._pending.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Failed to update shared rate limiter: %s", task.exception())
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "rate": round(self.rate, 2),
+            "min_rate": self.min_rate,
+            "max_rate": self.max_rate,
+            "throttle_events": self.throttle_events,
+            "shared_key": self.key,
+        }
@@ -0,0 +1,142 @@
+"""Declarative audience segments compiled into one SQL filter on ``users``.
+
+A segment is a JSON-friendly mapping with exactly one key per node::
+
+    {"all": [
+        {"role": "volunteer"},
+        {"forum": {"status": "approved", "track": ["media", "culture"]}},
+        {"not": {"cohort": "export_fair.csv"}}
+    ]}
+
+Nodes:
+  - ``all`` / ``any``: list of segments (AND / OR), ``not``: one segment
+  - ``role``: role name or list — users holding any of them
+  - ``subscribed``: broadcast key — active subscription to an enabled broadcast
+  - ``forum``: ``{column: value | [values]}`` over ``bot_forum_registrations``
+    (``status``, ``track``, ``occupation_status``); ``{}`` — any registration
+  - ``cohort``: list of user_ids or a CSV path (first column is the user_id)
+
+``compile_segment`` returns a WHERE clause for ``users``, so it plugs straight
+into ``KeysetAudience`` and its ``count()`` gives the exact size before sending.
+"""
+from __future__ import annotations
+
+import csv
+import json
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import (
+    BigInteger,
+    ColumnElement,
+    and_,
+    any_,
+    bindparam,
+    column,
+    exists,
+    not_,
+    or_,
+    select,
+    table,
+    true,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, array
+
+from app.infrastructure.database.models.broadcasts import Broadcasts
+from app.infrastructure.database.models.user_subscriptions import UserSubscriptions
+from app.infrastructure.database.models.users import Users
+
+# No ORM model: the table is managed through raw SQL in _ForumRegistrationsDB
+_forum_registrations = table(
+    "bot_forum_registrations",
+    column("user_id"),
+    column("status"),
+    column("track"),
+    column("occupation_status"),
+)
+FORUM_FIELDS = ("status", "track", "occupation_status")
+
+
+class SegmentError(ValueError):
+    """The segment spec is malformed."""
+
+
+def load_segment(path: str | Path) -> dict[str, Any]:
+    with Path(path).open(encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_cohort(path: str | Path) -> list[int]:
+    """Read user_ids from the first column of a CSV; non-numeric rows (headers) are skipped."""
+    path = Path(path)
+    if not path.exists():
+        raise SegmentError(f"Cohort file not found: {path}")
+    ids: list[int] = []
+    with path.open(newline="", encoding="utf-8") as f:
+        for row in csv.reader(f):
+            if row and row[0].strip().isdigit():
+                ids.append(int(row[0].strip()))
+    return ids
+
+
+def compile_segment(spec: Mapping[str, Any], *, reachable_only: bool = True) -> ColumnElement[bool]:
+    """Compile ``spec`` into a filter on ``users``.
+
+    ``reachable_only`` also requires ``is_alive`` and not ``is_blocked``.
+    """
+    clause = _compile(spec)
+    if reachable_only:
+        clause = and_(Users.is_alive.is_(True), Users.is_blocked.is_(False), clause)
+    return clause
+
+
+def _compile(spec: Any) -> ColumnElement[bool]:
+    if not isinstance(spec, Mapping) or len(spec) != 1:
+        raise SegmentError(f"Segment node must be a mapping with exactly one key, got {spec!r}")
+    (op, arg), = spec.items()
+
+    if op in ("all", "any"):
+        if not isinstance(arg, list):
+            raise SegmentError(f"'{op}' expects a list of segments")
+        parts = [_compile(item) for item in arg]
+        if not parts:
+            return true() if op == "all" else not_(true())
+        return and_(*parts) if op == "all" else or_(*parts)
+    if op == "not":
+        return not_(_compile(arg))
+    if op == "role":
+        roles = [arg] if isinstance(arg, str) else list(arg)
+        return Users.roles.has_any(array(roles))
+    if op == "subscribed":
+        return exists(
+            select(UserSubscriptions.id)
+            .join(Broadcasts, Broadcasts.id == UserSubscriptions.broadcast_id)
+            .where(
+                UserSubscriptions.user_id == Users.user_id,
+                UserSubscriptions.unsubscribed_at.is_(None),
+                Broadcasts.enabled.is_(True),
+                Broadcasts.key == str(arg),
+            )
+        )
+    if op == "forum":
+        return _compile_forum(arg)
+    if op == "cohort":
+        ids = load_cohort(arg) if isinstance(arg, (str, Path)) else [int(uid) for uid in arg]
+        return Users.user_id == any_(
+            bindparam("cohort", ids, type_=ARRAY(BigInteger), unique=True)
+        )
+    raise SegmentError(f"Unknown segment node: {op!r}")
+
+
+def _compile_forum(arg: Any) -> ColumnElement[bool]:
+    if not isinstance(arg, Mapping):
+        raise SegmentError("'forum' expects a mapping of column -> value(s)")
+    conditions = [_forum_registrations.c.user_id == Users.user_id]
+    for name, value in arg.items():
+        if name not in FORUM_FIELDS:
+            raise SegmentError(f"Unknown forum field {name!r}; expected one of {FORUM_FIELDS}")
+        col = _forum_registrations.c[name]
+        values = value if isinstance(value, list) else [value]
+        conditions.append(col.in_(values))
+    return exists(select(_forum_registrations.c.user_id).where(*conditions))
@@ -0,0 +1,187 @@
+"""Run one segment broadcast across several worker processes.
+
+The audience is split by ``user_id % shards``. Each shard runs in its own
+process with its own event loop, ``Bot`` session and keyset checkpoint
+(``<run_key>#<i>/<n>`` in ``broadcast_runs``), while a ``RedisRateLimiter``
+keeps the combined rate within Telegram limits. The parent process reports
+merged progress from ``broadcast_deliveries`` and merges the shard stats
+when every worker is done.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any
+
+from aiogram import Bot
+from redis.asyncio import Redis
+
+from app.infrastructure.database.database.db import DB
+from app.infrastructure.database.models.users import Users
+from app.infrastructure.database.sqlalchemy_core import dispose_engine, get_session_factory
+from app.services.broadcast.audience import KeysetAudience
+from app.services.broadcast.checkpoint import RunCheckpoint, RunCompletedError
+from app.services.broadcast.dead_recipients import DeadRecipientSink
+from app.services.broadcast.engine import DEFAULT_CONCURRENCY, BroadcastEngine, BroadcastStats
+from app.services.broadcast.redis_limiter import DEFAULT_KEY, RedisRateLimiter
+from app.services.broadcast.segments import compile_segment
+from app.services.broadcast.templating import MessageTemplate, PersonalizedMessage
+from config.config import load_config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROGRESS_INTERVAL = 10.0
+
+
+@dataclass(frozen=True, slots=True)
+class ShardJob:
+    """Everything a worker process needs; must stay picklable."""
+
+    shard: int
+    shards: int
+    run_key: str
+    segment: dict[str, Any]
+    text: str
+    parse_mode: str | None = "HTML"
+    concurrency: int = DEFAULT_CONCURRENCY
+    limiter_key: str = DEFAULT_KEY
+
+    @property
+    def shard_key(self) -> str:
+        return f"{self.run_key}#{self.shard}/{self.shards}"
+
+
+def redis_url(config) -> str:
+    if config.redis.password:
+        return f"redis://:{config.redis.password}@{config.redis.host}:{config.redis.port}/0"
+    return f"redis://{config.redis.host}:{config.redis.port}/0"
+
+
+def run_shard(job: ShardJob) -> dict[str, int]:
+    """Process entry point: send one shard and return its stats."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f"%(asctime)s - shard {job.shard}/{job.shards} - %(levelname)s - %(message)s",
+        datefmt="%H:%M:%S",
+    )
+    return asyncio.run(_run_shard(job))
+
+
+async def _run_shard(job: ShardJob) -> dict[str, int]:
+    config = load_config()
+    bot = Bot(token=config.tg_bot.token)
+    redis = Redis.from_url(redis_url(config))
+    session_factory = get_session_factory()
+
+    try:
+        checkpoint = RunCheckpoint(session_factory, job.shard_key, keyset=True)
+        message = PersonalizedMessage(
+            session_factory,
+            MessageTemplate(job.text, parse_mode=job.parse_mode),
+            checkpoint=checkpoint,
+        )
+        audience = KeysetAudience(
+            session_factory,
+            compile_segment(job.segment),
+            Users.user_id % job.shards == job.shard,
+            checkpoint=checkpoint,
+        )
+        engine = BroadcastEngine(
+            bot,
+            limiter=RedisRateLimiter(redis, key=job.limiter_key),
+            concurrency=job.concurrency,
+            log=logging.getLogger(f"{__name__}.shard{job.shard}"),
+        )
+        try:
+            stats = await engine.run(
+                message.recipients(audience),
+                message.send,
+                total=await audience.count(),
+                checkpoint=checkpoint,
+                dead_sink=DeadRecipientSink(session_factory),
+            )
+        except RunCompletedError as exc:
+            # Resuming a sharded run: this shard finished last time
+            logger.info("%s", exc)
+            return BroadcastStats().as_dict()
+        return stats.as_dict()
+    finally:
+        await bot.session.close()
+        await redis.aclose()
+        await dispose_engine()
+
+
+async def run_sharded(
+    *,
+    run_key: str,
+    segment: dict[str, Any],
+    text: str,
+    processes: int,
+    parse_mode: str | None = "HTML",
+    concurrency: int = DEFAULT_CONCURRENCY,
+    progress_interval: float = DEFAULT_PROGRESS_INTERVAL,
+    log: logging.Logger | None = None,
+) -> BroadcastStats:
+    """Send ``text`` to ``segment`` from ``processes`` workers and merge their stats."""
+    log = log or logger
+    processes = max(1, processes)
+    jobs = [
+        ShardJob(
+            shard=i,
+            shards=processes,
+            run_key=run_key,
+            segment=segment,
+            text=text,
+            parse_mode=parse_mode,
+            concurrency=concurrency,
+        )
+        for i in range(processes)
+    ]
+    loop = asyncio.get_running_loop()
+    # spawn: workers must not inherit the parent's event loop or DB connections
+    with ProcessPoolExecutor(
+        max_workers=processes, mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        futures = [loop.run_in_executor(pool, run_shard, job) for job in jobs]
+        reporter = asyncio.create_task(_report_progress(run_key, progress_interval, log))
+        try:
+            results = await asyncio.gather(*futures, return_exceptions=True)
+        finally:
+            reporter.cancel()
+
+    merged = BroadcastStats()
+    for job, result in zip(jobs, results, strict=True):
+        if isinstance(result, BaseException):
+            log.error("Shard %s failed: %s", job.shard_key, result)
+            continue
+        merged.total += result["total"]
+        merged.sent += result["sent"]
+        merged.blocked += result["blocked"]
+        merged.errors += result["errors"]
+        merged.skipped += result["skipped"]
+        log.info("Shard %s: %s", job.shard_key, result)
+    log.info(
+        "Sharded broadcast complete. processes=%d total=%d sent=%d blocked=%d errors=%d skipped=%d",
+        processes, merged.total, merged.sent, merged.blocked, merged.errors, merged.skipped,
+    )
+    return merged
+
+
+async def _report_progress(run_key: str, interval: float, log: logging.Logger) -> None:
+    session_factory = get_session_factory()
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with session_factory() as session:
+                counts = await DB(session).broadcast_runs.count_deliveries(key_prefix=f"{run_key}#")
+        except Exception as exc:  # pylint: disable=broad-except
+            log.warning("Progress query failed: %s", exc)
+            continue
+        log.info(
+            "Progress (all shards): sent=%d blocked=%d errors=%d",
+            counts.get("sent", 0), counts.get("blocked", 0),
+            counts.get("error", 0) + counts.get("partial", 0),
+        )
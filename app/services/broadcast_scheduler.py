@@ -1,4 +1,3 @@
-import asyncio
 import json
 import logging
 from dataclasses import dataclass
@@ -16,6 +15,13 @@ from apscheduler.executors.asyncio import AsyncIOExecutor
 from apscheduler.triggers.date import DateTrigger
 
 from app.infrastructure.database.database.db import DB
+from app.infrastructure.database.sqlalchemy_core import get_session_factory
+from app.services.broadcast import (
+    BroadcastEngine,
+    DeadRecipientSink,
+    RunCheckpoint,
+    make_run_key,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -57,9 +63,17 @@ class BroadcastItem:
         return f"broadcast_{hashlib.md5(content.encode()).hexdigest()[:12]}"
 
 
-async def send_broadcast_message(bot: Bot, db_pool: psycopg_pool.AsyncConnectionPool, text: str, groups: List[str]):
+async def send_broadcast_message(
+    bot: Bot,
+    db_pool: psycopg_pool.AsyncConnectionPool,
+    text: str,
+    groups: List[str],
+    job_id: str = "",
+):
     """
-    Функция для отправки рассылки, которая будет выполняться планировщиком
+    Функция для отправки рассылки, которая будет выполняться планировщиком.
+    job_id (BroadcastItem.get_job_id) входит в ключ run: та же рассылка в
+    другое время — новый run, а не продолжение завершённого.
     """
     logger.info("Executing broadcast: '%s' to groups %s", text[:50], groups)
     total = 0
@@ -74,7 +88,10 @@ async def send_broadcast_message(bot: Bot, db_pool: psycopg_pool.AsyncConnection
                     continue
                 
                 logger.info("Sending to %d users in group '%s'", len(user_ids), group)
-                sent = await _broadcast_to_users(bot, db_pool, user_ids, text)
+                sent = await _broadcast_to_users(
+                    bot, user_ids, text,
+                    run_key=make_run_key("scheduled", job_id, text, group),
+                )
                 total += sent
                 
         except Exception as e:
@@ -83,26 +100,27 @@ async def send_broadcast_message(bot: Bot, db_pool: psycopg_pool.AsyncConnection
     logger.info("Broadcast completed: sent to %d users total", total)
 
 
-async def _broadcast_to_users(bot: Bot, db_pool: psycopg_pool.AsyncConnectionPool, user_ids: List[int], text: str) -> int:
+async def _broadcast_to_users(
+    bot: Bot,
+    user_ids: List[int],
+    text: str,
+    run_key: str | None = None,
+) -> int:
     """Helper function to send messages to list of users"""
-    sent = 0
-    for uid in user_ids:
-        try:
-            await bot.send_message(chat_id=uid, text=text)
-            sent += 1
-            # Rate limiting
-            await asyncio.sleep(0.05)
-        except Exception as e:
-            logger.warning("Failed to send broadcast to user %s: %s", uid, e)
-            try:
-                # Mark user as blocked if forbidden
-                if "Forbidden" in str(e) or "bot was blocked" in str(e):
-                    async with db_pool.connection() as conn:
-                        db = DB(users_connection=conn, applications_connection=conn)
-                        await db.users.update_alive_status(user_id=uid, is_alive=False)
-            except Exception:
-                pass
-    return sent
+
+    async def _send(bot: Bot, chat_id: int) -> None:
+        await bot.send_message(chat_id=chat_id, text=text)
+
+    session_factory = get_session_factory()
+    checkpoint = RunCheckpoint(session_factory, run_key) if run_key else None
+    # Users who blocked the bot are marked dead in batches, not one query each
+    stats = await BroadcastEngine(bot).run(
+        user_ids,
+        _send,
+        checkpoint=checkpoint,
+        dead_sink=DeadRecipientSink(session_factory),
+    )
+    return stats.sent
 
 
 class BroadcastScheduler:
@@ -187,7 +205,7 @@ class BroadcastScheduler:
             self.scheduler.add_job(
                 send_broadcast_message,
                 trigger=DateTrigger(run_date=item.when),
-                args=[self.bot, self.db_pool, item.text, item.groups],
+                args=[self.bot, self.db_pool, item.text, item.groups, job_id],
                 id=job_id,
                 name=f"Broadcast: {item.text[:30]}...",
                 replace_existing=False
@@ -0,0 +1,162 @@
+"""Redis sorted-set deadlines shared by every bot process.
+
+Each pending deadline is one member ``"{action}:{target_id}"`` of a ZSET
+scored by its due time (unix seconds). A background task in every process
+polls the set once per ``poll_interval``: a Lua script atomically moves up to
+``batch`` due members into ``{key}:inflight`` (scored by a lease expiry) and
+returns them, so a deadline is claimed by exactly one process. Handlers of a
+batch run concurrently; finished members are removed from the in-flight set.
+
+Members whose claimer died before finishing come back to the queue when the
+lease runs out, so a deadline survives restarts and crashes (a handler may
+then run twice; the vol2 handlers check the DB first). Deadlines more than
+``grace`` seconds late are dropped instead of firing.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable, Iterable, Mapping
+from dataclasses import dataclass
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLL_INTERVAL = 1.0
+DEFAULT_BATCH = 100
+DEFAULT_LEASE = 120.0
+
+# KEYS[1] due zset, KEYS[2] in-flight zset
+# ARGV: batch, lease seconds
+# Returns {member, due, member, due, ...}; due as string (Lua numbers are truncated)
+_CLAIM = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now, 'LIMIT', 0, ARGV[1])
+for _, member in ipairs(expired) do
+  redis.call('ZREM', KEYS[2], member)
+  redis.call('ZADD', KEYS[1], 'NX', now, member)
+end
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', now, 'WITHSCORES', 'LIMIT', 0, ARGV[1])
+local lease = now + tonumber(ARGV[2])
+for i = 1, #due, 2 do
+  redis.call('ZREM', KEYS[1], due[i])
+  redis.call('ZADD', KEYS[2], lease, due[i])
+end
+return due
+"""
+
+
+@dataclass(frozen=True, slots=True)
+class _Action:
+    handler: Callable[[int], Awaitable[None]]
+    grace: float | None
+
+
+class DeadlineWheel:
+    """Durable one-shot deadlines ``(target_id, action)`` with a single poller per process."""
+
+    def __init__(
+        self,
+        redis: Redis,
+        *,
+        key: str,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        batch: int = DEFAULT_BATCH,
+        lease: float = DEFAULT_LEASE,
+    ) -> None:
+        self.redis = redis
+        self.key = key
+        self.inflight_key = f"{key}:inflight"
+        self.poll_interval = poll_interval
+        self.batch = batch
+        self.lease = lease
+        self._actions: dict[str, _Action] = {}
+        self._claim = redis.register_script(_CLAIM)
+        self._task: asyncio.Task[None] | None = None
+
+    def register(
+        self,
+        action: str,
+        handler: Callable[[int], Awaitable[None]],
+        *,
+        grace: float | None = None,
+    ) -> None:
+        """Call ``handler(target_id)`` when an ``action`` deadline is due."""
+        self._actions[action] = _Action(handler, grace)
+
+    async def schedule(self, target_id: int, deadlines: Mapping[str, float]) -> None:
+        """Set (or move) deadlines of ``target_id``: ``{action: unix timestamp}``."""
+        await self.redis.zadd(
+            self.key,
+            {f"{action}:{target_id}": due for action, due in deadlines.items()},
+        )
+
+    async def cancel(self, target_id: int, actions: Iterable[str] | None = None) -> int:
+        """Drop pending deadlines of ``target_id`` (all registered actions by default)."""
+        names = list(self._actions if actions is None else actions)
+        if not names:
+            return 0
+        return await self.redis.zrem(self.key, *(f"{action}:{target_id}" for action in names))
+
+    async def poll_once(self) -> int:
+        """Claim and run one batch of due deadlines; return how many were claimed."""
+        raw = await self._claim(
+            keys=[self.key, self.inflight_key],
+            args=[self.batch, self.lease],
+        )
+        if not raw:
+            return 0
+        now = time.time()
+        members = [m.decode() if isinstance(m, bytes) else m for m in raw[::2]]
+        dues = [float(score) for score in raw[1::2]]
+        await asyncio.gather(*(
+            self._fire(member, now - due) for member, due in zip(members, dues, strict=True)
+        ))
+        try:
+            await self.redis.zrem(self.inflight_key, *members)
+        except RedisError as exc:
+            # Lease runs out and they fire again; handlers must tolerate it
+            logger.warning("Failed to release %d deadlines of %s: %s", len(members), self.key, exc)
+        return len(members)
+
+    async def _fire(self, member: str, late: float) -> None:
+        action_name, _, target = member.rpartition(":")
+        action = self._actions.get(action_name)
+        if action is None:
+            logger.error("No handler for deadline %s in %s; dropped", member, self.key)
+            return
+        if action.grace is not None and late > action.grace:
+            logger.warning("Deadline %s is %.0fs late (grace %ss); skipped", member, late, action.grace)
+            return
+        try:
+            await action.handler(int(target))
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.exception("Deadline handler %s failed: %s", member, exc)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._poll_forever())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _poll_forever(self) -> None:
+        while True:
+            try:
+                claimed = await self.poll_once()
+            except RedisError as exc:
+                logger.error("Deadline poll of %s failed: %s", self.key, exc)
+                claimed = 0
+            # A full batch means more are due right now
+            if claimed < self.batch:
+                await asyncio.sleep(self.poll_interval)
@@ -0,0 +1,161 @@
+"""Content-addressed registry of Telegram file_ids for local media.
+
+Files are identified by the sha256 of their bytes, not by path, so a file is
+uploaded once per bot and re-uploaded only when its content changes. The
+mapping lives in Postgres (``media_files``) and is shared by the bot's
+startup checks and the broadcast scripts.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+from collections.abc import Iterable, Mapping
+from pathlib import Path
+
+from aiogram import Bot
+from aiogram.types import FSInputFile, Message
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.infrastructure.database.database.db import DB
+
+logger = logging.getLogger(__name__)
+
+MEDIA_KINDS = ("photo", "document")
+_CHUNK_SIZE = 1 << 20
+
+
+def file_digest(path: str | Path) -> str:
+    """sha256 hex digest of the file contents."""
+    digest = hashlib.sha256()
+    with Path(path).open("rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class MediaRegistry:
+    """Resolve local files to file_ids, uploading only unknown content.
+
+    Uploads go to ``upload_chat_id`` (an admin chat), one file at a time.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        session_factory: async_sessionmaker[AsyncSession],
+        *,
+        upload_chat_id: int,
+        upload_interval: float = 0.5,
+    ) -> None:
+        self.bot = bot
+        self.session_factory = session_factory
+        self.upload_chat_id = upload_chat_id
+        self.upload_interval = upload_interval
+
+    async def resolve(
+        self,
+        paths: Iterable[str | Path],
+        *,
+        kind: str = "photo",
+        legacy: Mapping[str, str] | None = None,
+    ) -> dict[str, str]:
+        """Return ``{str(path): file_id}`` for every path, uploading only new content.
+
+        ``legacy`` maps ``str(path)`` to a file_id known from before the
+        registry (the old path-keyed JSON). A path the registry has never
+        seen takes that file_id instead of an upload, so the first sync after
+        deploy uploads nothing that was already on Telegram.
+
+        Paths whose upload fails are left out of the result.
+        """
+        if kind not in MEDIA_KINDS:
+            raise ValueError(f"Unsupported media kind: {kind!r}")
+        paths = [Path(p) for p in paths]
+        # Hashing is blocking disk I/O; keep it off the event loop
+        hashes = await asyncio.to_thread(lambda: {p: file_digest(p) for p in paths})
+
+        async with self.session_factory() as session:
+            known = await DB(session).media_files.get_file_ids(
+                bot_id=self.bot.id, kind=kind, content_hashes=set(hashes.values())
+            )
+
+        missing = {h: p for p, h in hashes.items() if h not in known}
+        if missing and legacy:
+            known.update(await self._seed(missing, kind, legacy))
+            missing = {h: p for h, p in missing.items() if h not in known}
+        if missing:
+            logger.info("Uploading %d of %d %s files with unknown content", len(missing), len(paths), kind)
+        for content_hash, path in missing.items():
+            file_id = await self._upload(path, kind)
+            if file_id is None:
+                continue
+            known[content_hash] = file_id
+            async with self.session_factory() as session:
+                async with session.begin():
+                    await DB(session).media_files.save_file_id(
+                        bot_id=self.bot.id,
+                        content_hash=content_hash,
+                        kind=kind,
+                        file_id=file_id,
+                        source_path=str(path),
+                        size=path.stat().st_size,
+                    )
+            await asyncio.sleep(self.upload_interval)
+
+        return {str(p): known[h] for p, h in hashes.items() if h in known}
+
+    async def _seed(self, missing: dict[str, Path], kind: str, legacy: Mapping[str, str]) -> dict[str, str]:
+        candidates = {h: p for h, p in missing.items() if legacy.get(str(p))}
+        if not candidates:
+            return {}
+        async with self.session_factory() as session:
+            async with session.begin():
+                db = DB(session)
+                # A path with any registry entry has been synced before: its new
+                # content must be uploaded, the legacy file_id is stale
+                registered = await db.media_files.list_source_paths(
+                    bot_id=self.bot.id, kind=kind, source_paths={str(p) for p in candidates.values()}
+                )
+                seeded = {}
+                for content_hash, path in candidates.items():
+                    if str(path) in registered:
+                        continue
+                    seeded[content_hash] = legacy[str(path)]
+                    await db.media_files.save_file_id(
+                        bot_id=self.bot.id,
+                        content_hash=content_hash,
+                        kind=kind,
+                        file_id=seeded[content_hash],
+                        source_path=str(path),
+                        size=path.stat().st_size,
+                    )
+        if seeded:
+            logger.info("Seeded %d %s file_ids from the legacy mapping", len(seeded), kind)
+        return seeded
+
+    async def resolve_one(self, path: str | Path, *, kind: str = "photo") -> str | None:
+        return (await self.resolve([path], kind=kind)).get(str(path))
+
+    async def _upload(self, path: Path, kind: str) -> str | None:
+        try:
+            if kind == "photo":
+                message = await self.bot.send_photo(
+                    chat_id=self.upload_chat_id, photo=FSInputFile(path), caption=f"📸 {path.name}"
+                )
+            else:
+                message = await self.bot.send_document(
+                    chat_id=self.upload_chat_id, document=FSInputFile(path)
+                )
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.error("Failed to upload %s: %s", path, exc)
+            return None
+        return _extract_file_id(message, kind)
+
+
+def _extract_file_id(message: Message, kind: str) -> str | None:
+    if kind == "photo" and message.photo:
+        return message.photo[-1].file_id  # largest size
+    if kind == "document" and message.document:
+        return message.document.file_id
+    return None
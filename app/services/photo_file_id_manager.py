@@ -7,6 +7,9 @@ from typing import Dict, Set, Optional
 
 from aiogram import Bot
 from aiogram.types import FSInputFile
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.services.media_registry import MediaRegistry
 
 logger = logging.getLogger(__name__)
 
@@ -14,11 +17,13 @@ logger = logging.getLogger(__name__)
 class PhotoFileIdManager:
     """Менеджер для работы с file_id фотографий"""
     
-    def __init__(self, bot: Bot, images_dir: str, file_id_storage_path: str, target_chat_id: int):
+    def __init__(self, bot: Bot, images_dir: str, file_id_storage_path: str, target_chat_id: int,
+                 registry: Optional[MediaRegistry] = None):
         self.bot = bot
         self.images_dir = Path(images_dir)
         self.file_id_storage_path = Path(file_id_storage_path)
         self.target_chat_id = target_chat_id
+        self.registry = registry
         
     def _get_all_image_files(self) -> Set[str]:
         """Получить все файлы изображений из папки images (относительные пути)"""
@@ -86,6 +91,9 @@ class PhotoFileIdManager:
         
         # Загружаем существующие file_id
         existing_file_ids = self._load_existing_file_ids()
+
+        if self.registry is not None:
+            return await self._sync_with_registry(all_images, existing_file_ids)
         
         # Находим новые файлы
         existing_files = set(existing_file_ids.keys())
@@ -115,6 +123,33 @@ class PhotoFileIdManager:
         logger.info(f"✅ Обработано {len(new_files)} новых фотографий")
         return updated_file_ids
     
+    async def _sync_with_registry(self, all_images: Set[str], existing_file_ids: Dict[str, str]) -> Dict[str, str]:
+        """
+        Сверить фотографии с реестром по хешу содержимого.
+        Загружаются только новые или изменённые файлы, JSON по путям
+        перезаписывается, если что-то поменялось. При первом запуске реестр
+        заполняется file_id из JSON, без повторной загрузки.
+        """
+        resolved = await self.registry.resolve(
+            (self.images_dir / relative_path for relative_path in sorted(all_images)),
+            kind="photo",
+            legacy={
+                str(self.images_dir / relative_path): file_id
+                for relative_path, file_id in existing_file_ids.items()
+            },
+        )
+        # A failed upload keeps the previous file_id instead of dropping the image
+        file_ids = dict(existing_file_ids)
+        file_ids.update(
+            (str(Path(full_path).relative_to(self.images_dir)), file_id)
+            for full_path, file_id in resolved.items()
+        )
+        if file_ids != existing_file_ids:
+            self._save_file_ids(file_ids)
+        else:
+            logger.info("✅ Новых или изменённых фотографий не найдено")
+        return file_ids
+
     async def regenerate_all_file_ids(self) -> Dict[str, str]:
         """
         Полностью пересоздать словарь file_id для всех фотографий.
@@ -163,7 +198,8 @@ class PhotoFileIdManager:
 
 async def startup_photo_check(bot: Bot, images_dir: str = "app/bot/assets/images", 
                              target_chat_id: int = 257026813, 
-                             file_id_storage_path: str = "config/photo_file_ids.json") -> Dict[str, str]:
+                             file_id_storage_path: str = "config/photo_file_ids.json",
+                             session_factory: Optional[async_sessionmaker[AsyncSession]] = None) -> Dict[str, str]:
     """
     Функция для проверки новых фотографий при старте бота.
     
@@ -172,9 +208,14 @@ async def startup_photo_check(bot: Bot, images_dir: str = "app/bot/assets/images
         images_dir: Путь к папке с изображениями
         target_chat_id: ID чата для отправки фотографий
         file_id_storage_path: Путь к файлу с file_id
+        session_factory: Если передан, file_id берутся из реестра media_files
+            по хешу содержимого (загружаются только изменённые файлы)
         
     Returns:
         Словарь с file_id всех фотографий
     """
-    manager = PhotoFileIdManager(bot, images_dir, file_id_storage_path, target_chat_id)
+    registry = None
+    if session_factory is not None:
+        registry = MediaRegistry(bot, session_factory, upload_chat_id=target_chat_id)
+    manager = PhotoFileIdManager(bot, images_dir, file_id_storage_path, target_chat_id, registry)
     return await manager.check_and_upload_new_photos()
@@ -0,0 +1,163 @@
+"""Write-behind tracking of which users are alive and when they were last seen.
+
+``DatabaseMiddleware`` used to run ``SELECT`` + ``UPDATE users`` on every
+update. ``UserPresence`` answers "is this user already registered?" from an
+in-process LRU, then from a Redis set shared by every bot process, and only
+touches Postgres for users it has never seen. Seen marks are collected in
+memory and written by a background task every ``flush_interval`` seconds
+with one ``UPDATE ... FROM unnest(...)`` (``_UsersDB.mark_seen``).
+
+The Redis set can outlive rows (a user deleted by hand, a restored dump), so
+it is rebuilt from the table on start (``rebuild_known``), and a user whose
+seen mark found no row is inserted again by the same flush.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.infrastructure.database.database.db import DB
+
+logger = logging.getLogger(__name__)
+
+KNOWN_USERS_KEY = "users:known"
+DEFAULT_LRU_SIZE = 50_000
+DEFAULT_FLUSH_INTERVAL = 5.0
+REBUILD_PAGE_SIZE = 5000
+
+
+class UserPresence:
+    """Registers new users immediately and batches "seen" marks for known ones."""
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        redis: Redis | None = None,
+        *,
+        lru_size: int = DEFAULT_LRU_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        known_key: str = KNOWN_USERS_KEY,
+    ) -> None:
+        self.session_factory = session_factory
+        self.redis = redis
+        self.lru_size = max(1, lru_size)
+        self.flush_interval = flush_interval
+        self.known_key = known_key
+        self._known: OrderedDict[int, None] = OrderedDict()
+        self._seen: dict[int, datetime] = {}
+        self._flush_lock = asyncio.Lock()
+        self._task: asyncio.Task[None] | None = None
+
+    async def touch(self, user_id: int) -> bool:
+        """Mark ``user_id`` as seen now; return True if the user was just created."""
+        self._seen[user_id] = datetime.now(timezone.utc)
+        if user_id in self._known:
+            self._known.move_to_end(user_id)
+            return False
+        if await self._is_known_in_redis(user_id):
+            self._remember(user_id)
+            return False
+
+        # Unknown here: insert right away (idempotent), in its own transaction so
+        # the row exists even if the handler that follows fails
+        async with self.session_factory() as session:
+            async with session.begin():
+                created = await DB(session).users.add(user_id=user_id, roles=["guest"])
+        if self.redis is not None:
+            try:
+                await self.redis.sadd(self.known_key, user_id)
+            except RedisError as exc:
+                logger.warning("Failed to add user %s to %s: %s", user_id, self.known_key, exc)
+        self._remember(user_id)
+        return created
+
+    async def _is_known_in_redis(self, user_id: int) -> bool:
+        if self.redis is None:
+            return False
+        try:
+            return bool(await self.redis.sismember(self.known_key, user_id))
+        except RedisError as exc:
+            logger.warning("Known-users lookup failed for %s: %s", user_id, exc)
+            return False
+
+    def _remember(self, user_id: int) -> None:
+        self._known[user_id] = None
+        if len(self._known) > self.lru_size:
+            self._known.popitem(last=False)
+
+    async def rebuild_known(self) -> int:
+        """Replace the Redis set with the ids in ``users``; return how many there are."""
+        if self.redis is None:
+            return 0
+        staging = f"{self.known_key}:rebuild:{uuid.uuid4().hex}"
+        total = 0
+        after = None
+        try:
+            while True:
+                async with self.session_factory() as session:
+                    page = await DB(session).users.list_user_ids_page(after=after, limit=REBUILD_PAGE_SIZE)
+                if not page:
+                    break
+                await self.redis.sadd(staging, *page)
+                total += len(page)
+                after = page[-1]
+            if total:
+                await self.redis.rename(staging, self.known_key)
+            else:
+                await self.redis.delete(self.known_key)
+        finally:
+            await self.redis.delete(staging)
+        logger.info("Rebuilt %s: %d users", self.known_key, total)
+        return total
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            if not self._seen:
+                return
+            batch, self._seen = self._seen, {}
+            try:
+                async with self.session_factory() as session:
+                    async with session.begin():
+                        db = DB(session)
+                        missing = set(batch) - await db.users.mark_seen(seen=batch)
+                        for user_id in missing:
+                            await db.users.add(user_id=user_id, roles=["guest"])
+            except Exception:
+                # Newer marks win; keep the rest for the next flush
+                for user_id, seen_at in batch.items():
+                    self._seen.setdefault(user_id, seen_at)
+                raise
+            if missing:
+                logger.warning("%d known users had no row and were registered again", len(missing))
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._flush_forever())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.error("Final presence flush failed, %d marks lost: %s", len(self._seen), exc)
+
+    async def _flush_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.error("Presence flush failed (%d pending): %s", len(self._seen), exc)
@@ -1,24 +1,32 @@
-"""APScheduler-based timer service for volunteer selection part 2.
+"""Deadline timers for volunteer selection part 2.
 
 Timer flow (per user):
   T+0   -> test starts (on_start_yes handler)
-  T+35m -> reminder: 10 minutes left
-  T+40m -> reminder: 5 minutes left
-  T+45m -> force_finish (notify + clear FSM state)
+  T+10m -> reminder: 10 minutes left
+  T+25m -> reminder: 5 minutes left
+  T+35m -> force_finish (notify + clear FSM state)
 
-Jobs are stored in Redis (db=2) for persistence across bot restarts.
-Falls back to in-memory store if RedisJobStore is unavailable.
+The three deadlines of a user are members of one Redis ZSET
+(``DeadlineWheel``, key ``vol2:timers``) polled by every bot process, so they
+survive restarts and fire once even with several processes running.
 """
 from __future__ import annotations
 
 import logging
-from datetime import datetime, timedelta, timezone
+import time
+from datetime import timedelta
+from functools import partial
 
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.services.deadline_wheel import DeadlineWheel
 
 logger = logging.getLogger(__name__)
 
-_timer_scheduler: AsyncIOScheduler | None = None
+_timer_wheel: DeadlineWheel | None = None
+
+TIMERS_KEY = "vol2:timers"
 
 # ── Timer durations (change these for testing) ───────────────────────────────
 TEST_DURATION_MIN = 35       # total test length in minutes
@@ -50,118 +58,64 @@ _TIMEOUT_TEXT = (
 )
 
 
-def init_timer_scheduler(
-    redis_host: str,
-    redis_port: int,
-    redis_password: str | None = None,
-) -> AsyncIOScheduler:
-    """Initialize the timer scheduler with RedisJobStore (falls back to in-memory)."""
-    global _timer_scheduler  # noqa: PLW0603
-
-    try:
-        from apscheduler.jobstores.redis import RedisJobStore
+def init_timer_wheel(redis: Redis) -> DeadlineWheel:
+    """Create the timer wheel; the caller starts and stops its poller."""
+    global _timer_wheel  # noqa: PLW0603
 
-        redis_kwargs: dict = {"host": redis_host, "port": redis_port, "db": 2}
-        if redis_password:
-            redis_kwargs["password"] = redis_password
+    wheel = DeadlineWheel(redis, key=TIMERS_KEY)
+    # Late reminders are pointless; a late force_finish still has to happen soon after a restart
+    wheel.register("r10", partial(_send_reminder_job, text=_REMINDER_10_TEXT), grace=120)
+    wheel.register("r5", partial(_send_reminder_job, text=_REMINDER_5_TEXT), grace=120)
+    wheel.register("finish", _force_finish_job, grace=300)
+    _timer_wheel = wheel
+    logger.info("\u2705 Vol2 timer wheel initialized (%s)", TIMERS_KEY)
+    return wheel
 
-        jobstores = {
-            "timers": RedisJobStore(
-                jobs_key="vol2_timer_jobs",
-                run_times_key="vol2_timer_run_times",
-                **redis_kwargs,
-            )
-        }
-        _timer_scheduler = AsyncIOScheduler(
-            jobstores=jobstores,
-            timezone="Europe/Moscow",
-        )
-        logger.info("\u2705 Vol2 timer scheduler init with RedisJobStore (db=2)")
-    except Exception as exc:
-        logger.warning(
-            "[VOL2_TIMER] RedisJobStore unavailable (%s); using in-memory scheduler"
-            " (timers won't survive restarts)",
-            exc,
-        )
-        from apscheduler.jobstores.memory import MemoryJobStore
-
-        _timer_scheduler = AsyncIOScheduler(
-            jobstores={"timers": MemoryJobStore()},
-            timezone="Europe/Moscow",
-        )
 
-    return _timer_scheduler
+def get_timer_wheel() -> DeadlineWheel | None:
+    """Return the active timer wheel instance."""
+    return _timer_wheel
 
 
-def get_timer_scheduler() -> AsyncIOScheduler | None:
-    """Return the active timer scheduler instance."""
-    return _timer_scheduler
-
-
-def schedule_user_timer(user_id: int) -> None:
-    """Schedule 3 timed jobs for a user's test session."""
-    scheduler = _timer_scheduler
-    if scheduler is None or not scheduler.running:
+async def schedule_user_timer(user_id: int) -> None:
+    """Schedule the 3 deadlines of a user's test session."""
+    wheel = _timer_wheel
+    if wheel is None:
         logger.warning(
-            "[VOL2_TIMER] Scheduler not running; timer not scheduled for user_id=%d",
+            "[VOL2_TIMER] Timer wheel not initialized; timer not scheduled for user_id=%d",
             user_id,
         )
         return
 
-    now = datetime.now(tz=timezone.utc)
-    scheduler.add_job(
-        _send_reminder_job,
-        trigger="date",
-        run_date=now + timedelta(minutes=REMINDER_1_OFFSET_MIN),
-        args=[user_id, _REMINDER_10_TEXT],
-        id=f"vol2_r10_{user_id}",
-        jobstore="timers",
-        replace_existing=True,
-        misfire_grace_time=120,
-    )
-    scheduler.add_job(
-        _send_reminder_job,
-        trigger="date",
-        run_date=now + timedelta(minutes=REMINDER_2_OFFSET_MIN),
-        args=[user_id, _REMINDER_5_TEXT],
-        id=f"vol2_r5_{user_id}",
-        jobstore="timers",
-        replace_existing=True,
-        misfire_grace_time=120,
-    )
-    scheduler.add_job(
-        _force_finish_job,
-        trigger="date",
-        run_date=now + timedelta(minutes=FINISH_OFFSET_MIN),
-        args=[user_id],
-        id=f"vol2_finish_{user_id}",
-        jobstore="timers",
-        replace_existing=True,
-        misfire_grace_time=300,
+    now = time.time()
+    try:
+        await wheel.schedule(user_id, {
+            "r10": now + REMINDER_1_OFFSET_MIN * 60,
+            "r5": now + REMINDER_2_OFFSET_MIN * 60,
+            "finish": now + FINISH_OFFSET_MIN * 60,
+        })
+    except RedisError as exc:
+        logger.error("[VOL2_TIMER] Could not schedule timer for user_id=%d: %s", user_id, exc)
+        return
+    logger.info(
+        "[VOL2_TIMER] Timer scheduled for user_id=%d (deadline in %d min)",
+        user_id, FINISH_OFFSET_MIN,
     )
-    logger.info("[VOL2_TIMER] Timer scheduled for user_id=%d (deadline in 45 min)", user_id)
 
 
-def cancel_user_timer(user_id: int) -> None:
-    """Remove all pending timer jobs for a user (call when test is completed)."""
-    scheduler = _timer_scheduler
-    if scheduler is None:
+async def cancel_user_timer(user_id: int) -> None:
+    """Remove all pending deadlines of a user (call when test is completed)."""
+    wheel = _timer_wheel
+    if wheel is None:
         return
-    for job_id in (
-        f"vol2_r10_{user_id}",
-        f"vol2_r5_{user_id}",
-        f"vol2_finish_{user_id}",
-    ):
-        try:
-            job = scheduler.get_job(job_id, jobstore="timers")
-            if job:
-                job.remove()
-                logger.info("[VOL2_TIMER] Cancelled job %s", job_id)
-        except Exception as exc:
-            logger.warning("[VOL2_TIMER] Could not cancel job %s: %s", job_id, exc)
-
-
-# Job functions must be at module level for APScheduler pickle serialisation
+    try:
+        if await wheel.cancel(user_id):
+            logger.info("[VOL2_TIMER] Cancelled timer for user_id=%d", user_id)
+    except RedisError as exc:
+        logger.warning("[VOL2_TIMER] Could not cancel timer for user_id=%d: %s", user_id, exc)
+
+
+# Deadline handlers (registered in init_timer_wheel)
 
 async def _send_reminder_job(user_id: int, text: str) -> None:
     """Send a timed reminder if the user has not finished the test yet."""
@@ -194,7 +148,6 @@ async def _send_reminder_job(user_id: int, text: str) -> None:
 
 async def _force_finish_job(user_id: int) -> None:
     """Force-finish the test: save partial answers to DB, clear FSM state, notify user."""
-    import json
     from app.services.app_container import get_container
     from app.infrastructure.database.sqlalchemy_core import get_session_factory
     from app.infrastructure.database.database.db import DB
@@ -218,18 +171,14 @@ async def _force_finish_job(user_id: int) -> None:
 
     c = get_container()
 
-    # 2. Read FSM context keys to extract partial dialog_data before clearing.
-    #    aiogram-dialog stores dialog_data in keys matching:
-    #    fsm:{bot_id}:{chat_id}:{user_id}:aiogd:context:*:data
+    # 2. Read FSM context records to extract partial dialog_data before clearing.
+    #    aiogram-dialog stores dialog_data in fsm:{bot_id}:{chat_id}:{user_id}:aiogd:context:*:data;
+    #    the storage indexes every key of the chat, so no keyspace SCAN is needed.
+    storage = c.dp.storage
     dialog_data: dict = {}
     try:
-        redis = c.dp.storage.redis
-        ctx_pattern = f"fsm:{c.bot.id}:{user_id}:{user_id}:aiogd:context:*:data"
-        async for key in redis.scan_iter(ctx_pattern):
-            raw = await redis.get(key)
-            if raw is None:
-                continue
-            ctx = json.loads(raw)
+        records = await storage.get_chat_data(c.bot.id, user_id)
+        for ctx in records.values():
             if "VolSelPart2SG" in ctx.get("state", ""):
                 dialog_data = ctx.get("dialog_data", {})
                 logger.info(
@@ -271,21 +220,14 @@ async def _force_finish_job(user_id: int) -> None:
             "[VOL2_TIMER] Failed to save partial answers for user_id=%d: %s", user_id, exc
         )
 
-    # 4. Clear FSM / dialog state via direct Redis key deletion.
-    #    aiogram-dialog scatters state across multiple Redis keys with pattern
-    #    fsm:{bot_id}:{chat_id}:{user_id}:* (stack, context entries, etc.).
+    # 4. Clear FSM / dialog state.
+    #    aiogram-dialog scatters state across multiple keys (stack, context entries, etc.);
     #    state.clear() on a single StorageKey only removes one destiny's data,
-    #    so we must scan and delete every matching key explicitly.
+    #    so every key indexed for the chat is deleted.
     try:
-        redis = c.dp.storage.redis
-        pattern = f"fsm:{c.bot.id}:{user_id}:{user_id}:*"
-        keys = [key async for key in redis.scan_iter(pattern)]
-        if keys:
-            await redis.delete(*keys)
-            logger.info(
-                "[VOL2_TIMER] Deleted %d FSM keys for user_id=%d (pattern=%s)",
-                len(keys), user_id, pattern,
-            )
+        deleted = await storage.clear_chat(c.bot.id, user_id)
+        if deleted:
+            logger.info("[VOL2_TIMER] Deleted %d FSM keys for user_id=%d", deleted, user_id)
         else:
             logger.info("[VOL2_TIMER] No FSM keys found for user_id=%d", user_id)
     except Exception as exc:
@@ -2,6 +2,7 @@
 import logging
 import asyncio
 import inspect
+import time
 from typing import Any
 
 from aiogram.fsm.storage.redis import RedisStorage
@@ -11,6 +12,10 @@ logger = logging.getLogger(__name__)
 
 
 LOCK_REDIS_KEY = "bot:lock_mode"
+# Every bot process listens here; set_lock_mode publishes b"1" / b"0"
+LOCK_CHANNEL = "bot:lock_mode:changed"
+# How long a cached flag is trusted if a pub/sub message was missed
+LOCK_FLAG_TTL = 15.0
 
 
 async def is_lock_mode_enabled(storage: RedisStorage | Any) -> bool:
@@ -48,3 +53,61 @@ async def is_lock_mode_enabled(storage: RedisStorage | Any) -> bool:
     except Exception as e:  # pylint: disable=broad-exception-caught
         logger.exception("Exception while checking lock mode in Redis: %s", e)
         return False
+
+
+class LockModeFlag:
+    """Process-local copy of ``bot:lock_mode`` kept current through pub/sub.
+
+    ``is_enabled()`` answers from memory. A listener task applies changes
+    published on ``LOCK_CHANNEL`` by ``set_lock_mode`` the moment they
+    happen; the value is re-read from Redis once it is older than ``ttl``
+    (e.g. while the subscription is reconnecting).
+    """
+
+    def __init__(self, redis: Any, *, ttl: float = LOCK_FLAG_TTL) -> None:
+        self.redis = redis
+        self.ttl = ttl
+        self._enabled = False
+        self._expires = 0.0
+        self._listener: asyncio.Task | None = None
+
+    async def is_enabled(self) -> bool:
+        if self._listener is None:
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+        if time.monotonic() >= self._expires:
+            self._update(await is_lock_mode_enabled(self.redis))
+        return self._enabled
+
+    def _update(self, enabled: bool) -> None:
+        if enabled != self._enabled:
+            logger.info("Lock mode flag changed: %s", enabled)
+        self._enabled = enabled
+        self._expires = time.monotonic() + self.ttl
+
+    async def _listen(self) -> None:
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(LOCK_CHANNEL)
+                # Changes made before the subscription was active
+                self._update(await is_lock_mode_enabled(self.redis))
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._update(message.get("data") in (b"1", "1"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                logger.warning("Lock mode subscription lost, retrying: %s", e)
+                self._expires = 0.0
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
@@ -45,6 +45,53 @@ class SQLAlchemyEngineConfig:
     db_connect_timeout: int
     db_echo_sql: bool
 
+@dataclass
+class UpdatesConfig:
+    ordered: bool = True  # strict per-chat order (ChatOrderingMiddleware)
+    max_concurrency: int = 64  # handlers running at once across all chats
+    throttle: bool = True  # per-user flood control (ThrottlingMiddleware)
+    throttle_rate: float = 2.0  # updates per second per user
+    throttle_burst: int = 8
+    throttle_dedup_window: float = 1.0  # seconds; repeated callback_data is dropped
+    # local: this process receives and handles updates;
+    # ingest / worker: Redis Stream between one receiver and N handler processes
+    mode: str = "local"
+    stream_partitions: int = 16
+    stream_maxlen: int = 100_000  # per partition, approximate
+    workers: int = 1
+    worker_index: int = 0
+
+
+@dataclass
+class StorageConfig:
+    backend: str = "redis"  # redis | nats (JetStream KV)
+    # FSM / aiogram-dialog records: json (stock) or msgpack; reads accept both
+    format: str = "json"
+    compress_min_bytes: int = 0  # zstd for data records at least this big; 0 = off
+    state_ttl: int = 86400  # seconds
+    data_ttl: int = 86400
+    pipeline: bool = True  # one prefetch + one write-back per update; needs UPDATES_ORDERED
+    prefetch_max_keys: int = 64  # chats with more keys are read key by key
+    nats_servers: list[str] = field(default_factory=lambda: ["nats://localhost:4222"])
+    nats_history: int = 5  # revisions kept per key
+
+
+@dataclass
+class WebhookConfig:
+    secret: str  # X-Telegram-Bot-Api-Secret-Token, 1-256 of A-Z a-z 0-9 _ -
+    base_url: str = ""  # public https origin behind the reverse proxy
+    path: str = "/telegram/webhook"
+    host: str = "0.0.0.0"
+    port: int = 8080
+    set_webhook: bool = True  # only one worker of a group needs to call setWebhook
+    drop_pending_updates: bool = False
+    queue_size: int = 1000  # accepted but not dispatched yet; 503 above it
+
+    @property
+    def url(self) -> str:
+        return f"{self.base_url.rstrip('/')}{self.path}"
+
+
 @dataclass
 class Config:
     tg_bot: TgBot
@@ -53,6 +100,9 @@ class Config:
     sqlalchemy_eng: SQLAlchemyEngineConfig
     google: Optional[GoogleConfig] = None
     admin_ids: list[int] = field(default_factory=list)
+    updates: UpdatesConfig = field(default_factory=UpdatesConfig)
+    webhook: Optional[WebhookConfig] = None  # None: long polling
+    storage: StorageConfig = field(default_factory=StorageConfig)
 
 
 _CONFIG_CACHE: Optional[Config] = None
@@ -146,6 +196,54 @@ def _build_config(path: str | None = None) -> Config:
         db_echo_sql=env.bool("DB_ECHO_SQL", False)
     )
 
+    updates = UpdatesConfig(
+        ordered=env.bool("UPDATES_ORDERED", True),
+        max_concurrency=env.int("UPDATES_MAX_CONCURRENCY", 64),
+        throttle=env.bool("THROTTLE_ENABLED", True),
+        throttle_rate=env.float("THROTTLE_RATE", 2.0),
+        throttle_burst=env.int("THROTTLE_BURST", 8),
+        throttle_dedup_window=env.float("THROTTLE_DEDUP_WINDOW", 1.0),
+        mode=env.str("UPDATES_MODE", "local"),
+        stream_partitions=env.int("UPDATES_STREAM_PARTITIONS", 16),
+        stream_maxlen=env.int("UPDATES_STREAM_MAXLEN", 100_000),
+        workers=env.int("UPDATES_WORKERS", 1),
+        worker_index=env.int("UPDATES_WORKER_INDEX", 0),
+    )
+    if updates.mode not in ("local", "ingest", "worker"):
+        raise ValueError(f"UPDATES_MODE must be local, ingest or worker, got {updates.mode!r}")
+
+    storage = StorageConfig(
+        backend=env.str("FSM_STORAGE_BACKEND", "redis"),
+        format=env.str("FSM_STORAGE_FORMAT", "json"),
+        compress_min_bytes=env.int("FSM_COMPRESS_MIN_BYTES", 0),
+        state_ttl=env.int("FSM_STATE_TTL", 86400),
+        data_ttl=env.int("FSM_DATA_TTL", 86400),
+        pipeline=env.bool("FSM_PIPELINE", True),
+        prefetch_max_keys=env.int("FSM_PREFETCH_MAX_KEYS", 64),
+        nats_servers=env.list("NATS_SERVERS", ["nats://localhost:4222"]),
+        nats_history=env.int("NATS_FSM_HISTORY", 5),
+    )
+    if storage.backend not in ("redis", "nats"):
+        raise ValueError(f"FSM_STORAGE_BACKEND must be redis or nats, got {storage.backend!r}")
+
+    # Webhook mode (optional, polling otherwise)
+    webhook_config = None
+    if env.bool("WEBHOOK_ENABLED", False):
+        webhook_config = WebhookConfig(
+            secret=env.str("WEBHOOK_SECRET"),
+            base_url=env.str("WEBHOOK_BASE_URL", ""),
+            path=env.str("WEBHOOK_PATH", "/telegram/webhook"),
+            host=env.str("WEBHOOK_HOST", "0.0.0.0"),
+            port=env.int("WEBHOOK_PORT", 8080),
+            set_webhook=env.bool("WEBHOOK_SET", True),
+            drop_pending_updates=env.bool("WEBHOOK_DROP_PENDING", False),
+            queue_size=env.int("WEBHOOK_QUEUE_SIZE", 1000),
+        )
+        if not webhook_config.secret:
+            raise ValueError("WEBHOOK_SECRET must not be empty")
+        if webhook_config.set_webhook and not webhook_config.base_url:
+            raise ValueError("WEBHOOK_BASE_URL is required when WEBHOOK_SET is on")
+
     return Config(
         tg_bot=tg_bot,
         db=db_config,
@@ -153,7 +251,10 @@ def _build_config(path: str | None = None) -> Config:
         # selection=selection_config,
         google=google_config,
         admin_ids=admin_ids,
-        sqlalchemy_eng=sqlalchemy_eng
+        sqlalchemy_eng=sqlalchemy_eng,
+        updates=updates,
+        webhook=webhook_config,
+        storage=storage,
     )
 
 
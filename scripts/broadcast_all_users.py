@@ -2,8 +2,8 @@
 """
 Broadcast a message to ALL users in the users table.
 
-Fetches every non-blocked user_id directly from the database and sends
-the hardcoded MESSAGE via the bot.
+Streams every non-blocked, reachable user_id from the database page by page
+and sends the hardcoded MESSAGE via the bot.
 
 Usage (run from the project root):
     python3 scripts/broadcast_all_users.py
@@ -22,13 +22,18 @@ from datetime import datetime
 from pathlib import Path
 
 from aiogram import Bot
-from aiogram.exceptions import TelegramForbiddenError, TelegramBadRequest, TelegramRetryAfter
-from sqlalchemy import select
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from app.infrastructure.database.models.users import Users
-from app.infrastructure.database.sqlalchemy_core import session_scope
+from app.infrastructure.database.sqlalchemy_core import get_session_factory
+from app.services.broadcast import (
+    BroadcastEngine,
+    DeadRecipientSink,
+    KeysetAudience,
+    RunCheckpoint,
+    make_run_key,
+)
 from config.config import load_config
 
 # ============================================================================
@@ -55,7 +60,7 @@ MESSAGE = """Уже завтра! 🔥
 # ============================================================================
 
 ADMIN_USER_ID = 257026813
-DELAY_BETWEEN_MESSAGES = 0.05  # seconds — keeps well within Telegram rate limits
+PROGRESS_EVERY = 50  # rate limiting is handled by the shared BroadcastEngine
 
 
 # ── Logging ──────────────────────────────────────────────────────────────────
@@ -79,16 +84,14 @@ def setup_logging() -> logging.Logger:
 
 # ── Database ─────────────────────────────────────────────────────────────────
 
-async def fetch_all_user_ids() -> list[int]:
-    """Return all non-blocked user_ids from the users table."""
-    async with session_scope() as session:
-        stmt = (
-            select(Users.user_id)
-            .where(Users.is_blocked.is_(False))
-            .order_by(Users.user_id)
-        )
-        result = await session.execute(stmt)
-        return [row[0] for row in result.fetchall()]
+def all_users_audience(checkpoint: RunCheckpoint | None = None) -> KeysetAudience:
+    """Non-blocked, reachable users, streamed in user_id order."""
+    return KeysetAudience(
+        get_session_factory(),
+        Users.is_blocked.is_(False),
+        Users.is_alive.is_(True),
+        checkpoint=checkpoint,
+    )
 
 
 # ── Interactive ───────────────────────────────────────────────────────────────
@@ -128,52 +131,36 @@ def select_mode(logger: logging.Logger) -> str:
 
 async def send_broadcast(
     bot: Bot,
-    user_ids: list[int],
     logger: logging.Logger,
+    *,
+    live: bool = False,
 ) -> None:
-    stats = {"total": len(user_ids), "sent": 0, "blocked": 0, "errors": 0}
-
-    for idx, user_id in enumerate(user_ids, 1):
-        try:
-            await bot.send_message(
-                chat_id=user_id,
-                text=MESSAGE,
-                parse_mode="HTML",
-            )
-            stats["sent"] += 1
-            if idx % 50 == 0 or idx == stats["total"]:
-                logger.info(
-                    "Progress: %d/%d  sent=%d  blocked=%d  errors=%d",
-                    idx, stats["total"], stats["sent"], stats["blocked"], stats["errors"],
-                )
-            await asyncio.sleep(DELAY_BETWEEN_MESSAGES)
-
-        except TelegramRetryAfter as e:
-            logger.warning("Rate limited — sleeping %ds", e.retry_after)
-            await asyncio.sleep(e.retry_after)
-            # retry once
-            try:
-                await bot.send_message(chat_id=user_id, text=MESSAGE, parse_mode="HTML")
-                stats["sent"] += 1
-            except Exception as retry_exc:
-                logger.error("Retry failed for %d: %s", user_id, retry_exc)
-                stats["errors"] += 1
-
-        except TelegramForbiddenError:
-            logger.warning("User %d blocked the bot", user_id)
-            stats["blocked"] += 1
-
-        except TelegramBadRequest as e:
-            logger.warning("Bad request for user %d: %s", user_id, e)
-            stats["blocked"] += 1
-
-        except Exception as e:
-            logger.error("Unexpected error for user %d: %s", user_id, e)
-            stats["errors"] += 1
-
-    logger.info(
-        "Broadcast complete. total=%d  sent=%d  blocked=%d  errors=%d",
-        stats["total"], stats["sent"], stats["blocked"], stats["errors"],
+    async def _send(bot: Bot, chat_id: int) -> None:
+        await bot.send_message(chat_id=chat_id, text=MESSAGE, parse_mode="HTML")
+
+    recipients: list[int] | KeysetAudience = [ADMIN_USER_ID]
+    total: int | None = None
+    checkpoint = dead_sink = None
+    if live:
+        # LIVE runs stream recipients and are checkpointed by keyset position
+        # (re-running the script resumes where it stopped); unreachable chats
+        # are written back to users.is_alive
+        checkpoint = RunCheckpoint(
+            get_session_factory(), make_run_key(Path(__file__).stem, MESSAGE), keyset=True
+        )
+        dead_sink = DeadRecipientSink(get_session_factory())
+        recipients = all_users_audience(checkpoint)
+        total = await recipients.count()
+        logger.info("Found %d users", total)
+        if not total:
+            logger.warning("No users found — aborting.")
+            return
+    else:
+        logger.info("TEST mode: sending to %d", ADMIN_USER_ID)
+
+    engine = BroadcastEngine(bot, progress_every=PROGRESS_EVERY, log=logger)
+    await engine.run(
+        recipients, _send, total=total, checkpoint=checkpoint, dead_sink=dead_sink
     )
 
 
@@ -189,18 +176,7 @@ async def main() -> None:
     bot = Bot(token=config.tg_bot.token)
 
     try:
-        if mode == "test":
-            user_ids = [ADMIN_USER_ID]
-            logger.info("TEST mode: sending to %d", ADMIN_USER_ID)
-        else:
-            logger.info("Fetching user IDs from database…")
-            user_ids = await fetch_all_user_ids()
-            logger.info("Found %d users", len(user_ids))
-            if not user_ids:
-                logger.warning("No users found — aborting.")
-                return
-
-        await send_broadcast(bot, user_ids, logger)
+        await send_broadcast(bot, logger, live=mode != "test")
     finally:
         await bot.session.close()
 
@@ -6,7 +6,7 @@ This script sends a media group with 3 images and a text message with a button
 to start the creative selection process to all active users in the database.
 
 Features:
-- Image preparation phase (get file_ids by sending to admin)
+- Image preparation phase (file_ids from the media registry; only new images are uploaded)
 - Message preview before sending
 - Multiple send modes: test (admin only), dry-run (no actual send), full broadcast
 - Automatic is_alive status update on delivery failures
@@ -21,11 +21,9 @@ from pathlib import Path
 from typing import Optional
 
 from aiogram import Bot
-from aiogram.exceptions import TelegramForbiddenError, TelegramBadRequest, TelegramRetryAfter
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-from aiogram.types.input_file import FSInputFile
 from aiogram.utils.media_group import MediaGroupBuilder
-from sqlalchemy import select, update
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 
@@ -35,6 +33,8 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from config.config import load_config
 from app.infrastructure.database.database.db import DB
 from app.infrastructure.database.models.users import Users
+from app.services.broadcast import BroadcastEngine, RunCheckpoint, make_run_key
+from app.services.media_registry import MediaRegistry
 
 
 # ============================================================================
@@ -107,45 +107,35 @@ def setup_logging() -> logging.Logger:
 # HELPER FUNCTIONS
 # ============================================================================
 
-async def prepare_images(bot: Bot, logger: logging.Logger) -> list[str]:
+async def prepare_images(bot: Bot, session_factory, logger: logging.Logger) -> list[str]:
     """
-    Send images to admin user to get file_ids for faster broadcasting.
-    
+    Resolve image file_ids through the shared media registry.
+
+    Only images whose content is not in the registry yet are uploaded
+    (to the admin chat); unchanged images reuse their stored file_ids.
+
     Returns:
-        List of file_ids for the images.
+        List of file_ids for the images, in IMAGE_PATHS order.
     """
     logger.info("=" * 60)
     logger.info("PHASE 1: IMAGE PREPARATION")
     logger.info("=" * 60)
-    logger.info(f"Sending {len(IMAGE_PATHS)} images to admin user {ADMIN_USER_ID} to get file_ids...")
-    
-    file_ids = []
-    
+
+    for img_path in IMAGE_PATHS:
+        if not Path(img_path).exists():
+            logger.error(f"Image not found: {img_path}")
+            raise FileNotFoundError(f"Image not found: {img_path}")
+
     try:
-        # Build media group
-        media_group = MediaGroupBuilder()
-        for img_path in IMAGE_PATHS:
-            if not Path(img_path).exists():
-                logger.error(f"Image not found: {img_path}")
-                raise FileNotFoundError(f"Image not found: {img_path}")
-            media_group.add_photo(media=FSInputFile(img_path))
-        
-        # Send media group to admin
-        messages = await bot.send_media_group(
-            chat_id=ADMIN_USER_ID,
-            media=media_group.build()
-        )
-        
-        # Extract file_ids
-        for msg in messages:
-            if msg.photo:
-                file_id = msg.photo[-1].file_id  # Get largest photo
-                file_ids.append(file_id)
-                logger.debug(f"Got file_id: {file_id[:50]}...")
-        
+        registry = MediaRegistry(bot, session_factory, upload_chat_id=ADMIN_USER_ID)
+        resolved = await registry.resolve(IMAGE_PATHS, kind="photo")
+        missing = [p for p in IMAGE_PATHS if p not in resolved]
+        if missing:
+            raise RuntimeError(f"Could not obtain file_ids for: {', '.join(missing)}")
+        file_ids = [resolved[p] for p in IMAGE_PATHS]
         logger.info(f"✅ Successfully obtained {len(file_ids)} file_ids")
         return file_ids
-        
+
     except Exception as e:
         logger.error(f"❌ Failed to prepare images: {e}")
         raise
@@ -249,7 +239,8 @@ async def send_broadcast(
     file_ids: list[str],
     user_ids: list[int],
     mode: str,
-    logger: logging.Logger
+    logger: logging.Logger,
+    session_factory=None,
 ) -> dict:
     """
     Send broadcast messages to users.
@@ -261,6 +252,7 @@ async def send_broadcast(
         user_ids: List of user_ids to send to
         mode: 'test', 'dry-run', or 'full'
         logger: Logger instance
+        session_factory: If given, a full broadcast is checkpointed and resumable
         
     Returns:
         Dictionary with statistics
@@ -282,104 +274,42 @@ async def send_broadcast(
             "dry_run": True
         }
     
-    stats = {
-        "total": len(user_ids),
-        "sent": 0,
-        "blocked": 0,
-        "errors": 0,
-        "dry_run": False
-    }
-    
-    # Collect blocked user IDs for batch update
-    blocked_user_ids = []
-    
     keyboard = create_keyboard()
-    
+
+    async def _send_media(bot: Bot, chat_id: int) -> None:
+        media_group = MediaGroupBuilder()
+        for file_id in file_ids:
+            media_group.add_photo(media=file_id)
+        await bot.send_media_group(chat_id=chat_id, media=media_group.build())
+
+    async def _send_text(bot: Bot, chat_id: int) -> None:
+        await bot.send_message(
+            chat_id=chat_id,
+            text=_BROADCAST_MESSAGE,
+            reply_markup=keyboard,
+            parse_mode="HTML"
+        )
+
     logger.info(f"Starting broadcast to {len(user_ids)} users...")
-    
-    for idx, user_id in enumerate(user_ids, 1):
-        try:
-            # Build media group with file_ids
-            media_group = MediaGroupBuilder()
-            for file_id in file_ids:
-                media_group.add_photo(media=file_id)
-            
-            # Send media group
-            await bot.send_media_group(
-                chat_id=user_id,
-                media=media_group.build()
-            )
-            
-            # Send text message with button
-            await bot.send_message(
-                chat_id=user_id,
-                text=_BROADCAST_MESSAGE,
-                reply_markup=keyboard,
-                parse_mode="HTML"
-            )
-            
-            stats["sent"] += 1
-            
-            # Log progress every 10 users
-            if idx % 10 == 0:
-                logger.info(f"Progress: {idx}/{len(user_ids)} ({stats['sent']} sent, {stats['blocked']} blocked, {stats['errors']} errors)")
-            
-            # Delay between sends to avoid rate limits
-            await asyncio.sleep(0.5)
-            
-        except TelegramForbiddenError:
-            # User blocked the bot
-            logger.warning(f"User {user_id} blocked the bot, will update is_alive=False")
-            blocked_user_ids.append(user_id)
-            stats["blocked"] += 1
-            
-        except TelegramBadRequest as e:
-            # User not found or blocked
-            error_msg = str(e).lower()
-            logger.warning(f"Bad request for user {user_id}: {e}")
-            if any(keyword in error_msg for keyword in ["chat not found", "user not found", "user is blocked", "user_is_blocked", "blocked"]):
-                logger.info(f"Will update is_alive=False for user {user_id}")
-                blocked_user_ids.append(user_id)
-                stats["blocked"] += 1
-            else:
-                stats["errors"] += 1
-                
-        except TelegramRetryAfter as e:
-            # Rate limit hit, wait and retry
-            logger.warning(f"Rate limit hit, waiting {e.retry_after} seconds...")
-            await asyncio.sleep(e.retry_after)
-            # Retry this user
-            try:
-                media_group = MediaGroupBuilder()
-                for file_id in file_ids:
-                    media_group.add_photo(media=file_id)
-                await bot.send_media_group(chat_id=user_id, media=media_group.build())
-                await bot.send_message(
-                    chat_id=user_id,
-                    text=_BROADCAST_MESSAGE,
-                    reply_markup=keyboard,
-                    parse_mode="HTML"
-                )
-                stats["sent"] += 1
-            except Exception as retry_error:
-                logger.error(f"Retry failed for user {user_id}: {retry_error}")
-                stats["errors"] += 1
-                
-        except Exception as e:
-            logger.error(f"Unexpected error sending to user {user_id}: {e}")
-            stats["errors"] += 1
-    
+
+    # Full runs are checkpointed: re-running the script resumes where it stopped
+    checkpoint = None
+    if mode == "full" and session_factory is not None:
+        checkpoint = RunCheckpoint(
+            session_factory,
+            make_run_key(Path(__file__).stem, _BROADCAST_MESSAGE, *IMAGE_PATHS),
+        )
+
+    engine = BroadcastEngine(bot, progress_every=10, log=logger)
+    result = await engine.run(user_ids, [_send_media, _send_text], checkpoint=checkpoint)
+    stats = {**result.as_dict(), "dry_run": False}
+    blocked_user_ids = result.blocked_ids
+
     # Batch update all blocked users at once
     if blocked_user_ids:
         logger.info(f"Updating is_alive=False for {len(blocked_user_ids)} blocked users in batch...")
-        from app.infrastructure.database.models.users import Users
-        stmt = (
-            update(Users)
-            .where(Users.user_id.in_(blocked_user_ids))
-            .values(is_alive=False)
-        )
-        await db.session.execute(stmt)
-        logger.info(f"✅ Batch update completed for {len(blocked_user_ids)} users")
+        updated = await db.users.mark_dead(user_ids=blocked_user_ids)
+        logger.info(f"✅ Batch update completed for {updated} users")
     
     return stats
 
@@ -412,7 +342,7 @@ async def main():
     
     try:
         # Phase 1: Prepare images
-        file_ids = await prepare_images(bot, logger)
+        file_ids = await prepare_images(bot, async_session_maker, logger)
         
         # Phase 2: Preview and mode selection
         logger.info("\n" + "=" * 60)
@@ -432,7 +362,10 @@ async def main():
                 return
             
             # Send broadcast
-            stats = await send_broadcast(bot, db, file_ids, user_ids, mode, logger)
+            stats = await send_broadcast(
+                bot, db, file_ids, user_ids, mode, logger,
+                session_factory=async_session_maker,
+            )
             
             # Commit database changes (is_alive updates)
             if mode != "dry-run":
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Replay captured Telegram updates against a locally running webhook.
+
+Usage:
+    python3 scripts/post_updates.py <updates.json|updates.jsonl> [--url URL] [--repeat N]
+
+The file holds one update object, a JSON list of updates, or one update per
+line. Run the bot with WEBHOOK_ENABLED=true and WEBHOOK_SET=false so it does
+not register itself with Telegram; WEBHOOK_SECRET, WEBHOOK_PORT and
+WEBHOOK_PATH are read from the .env file in the project root.
+
+Example:
+    python3 scripts/post_updates.py captured.jsonl --repeat 100
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import aiohttp
+from dotenv import load_dotenv
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def load_updates(path: Path) -> list[dict]:
+    raw = path.read_text(encoding="utf-8").strip()
+    try:
+        data = json.loads(raw)
+    except json.JSONDecodeError:
+        return [json.loads(line) for line in raw.splitlines() if line.strip()]
+    return data if isinstance(data, list) else [data]
+
+
+async def post_all(url: str, secret: str, updates: list[dict], repeat: int) -> None:
+    statuses: dict[int, int] = {}
+    started = time.monotonic()
+    async with aiohttp.ClientSession(headers={SECRET_HEADER: secret}) as session:
+        update_id = 0
+        for _ in range(repeat):
+            for update in updates:
+                # Unique ids, as Telegram would send them
+                update_id += 1
+                async with session.post(url, json={**update, "update_id": update_id}) as response:
+                    statuses[response.status] = statuses.get(response.status, 0) + 1
+    elapsed = time.monotonic() - started
+    total = sum(statuses.values())
+    print(f"Posted {total} updates in {elapsed:.2f}s ({total / elapsed:.0f}/s)")
+    for status, count in sorted(statuses.items()):
+        print(f"  HTTP {status}: {count}")
+
+
+def main() -> None:
+    load_dotenv(dotenv_path=Path(__file__).parent.parent / ".env")
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("file", type=Path)
+    parser.add_argument(
+        "--url",
+        default=f"http://127.0.0.1:{os.getenv('WEBHOOK_PORT', '8080')}"
+                f"{os.getenv('WEBHOOK_PATH', '/telegram/webhook')}",
+    )
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    secret = os.getenv("WEBHOOK_SECRET")
+    if not secret:
+        print("ERROR: WEBHOOK_SECRET not found in .env file.")
+        sys.exit(1)
+
+    asyncio.run(post_all(args.url, secret, load_updates(args.file), args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Broadcast a message to an audience segment described in JSON.
+
+The segment (see app/services/broadcast/segments.py) is compiled into one
+SQL query over users; its exact size is shown before anything is sent.
+
+Usage (run from the project root):
+    python3 scripts/segment_broadcast.py <segment.json> <message.html>
+    python3 scripts/segment_broadcast.py <segment.json> --count
+    python3 scripts/segment_broadcast.py <segment.json> <message.html> --processes 4
+
+Example segment:
+    {"all": [{"role": "volunteer"}, {"not": {"cohort": "export_fair.csv"}}]}
+
+The message may use placeholders filled per recipient (see
+app/services/broadcast/templating.py): {name}, {full_name}, {username},
+{track}. Write {{ and }} for literal braces.
+
+Modes (interactive):
+    1. TEST — send only to ADMIN_USER_ID
+    2. LIVE — send to every user in the segment
+
+With --processes N the LIVE run is split by user_id % N across N worker
+processes that share one Redis rate limiter (app/services/broadcast/sharded.py).
+Resume a sharded run with the same N: each shard has its own checkpoint.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from aiogram import Bot
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.infrastructure.database.sqlalchemy_core import get_session_factory
+from app.services.broadcast import (
+    BroadcastEngine,
+    DeadRecipientSink,
+    KeysetAudience,
+    MessageTemplate,
+    PersonalizedMessage,
+    RunCheckpoint,
+    compile_segment,
+    load_segment,
+    make_run_key,
+)
+from app.services.broadcast.sharded import run_sharded
+from config.config import load_config
+
+ADMIN_USER_ID = 257026813
+
+
+# ── Logging ──────────────────────────────────────────────────────────────────
+
+def setup_logging() -> logging.Logger:
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    Path("storage").mkdir(exist_ok=True)
+    logger = logging.getLogger("segment_broadcast")
+    logger.setLevel(logging.INFO)
+    fmt = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s", datefmt="%H:%M:%S")
+    ch = logging.StreamHandler()
+    ch.setFormatter(fmt)
+    fh = logging.FileHandler(f"storage/segment_broadcast_{timestamp}.log", encoding="utf-8")
+    fh.setFormatter(fmt)
+    logger.addHandler(ch)
+    logger.addHandler(fh)
+    return logger
+
+
+# ── Interactive ───────────────────────────────────────────────────────────────
+
+def preview(logger: logging.Logger, segment: dict, size: int, template: MessageTemplate) -> None:
+    logger.info("=" * 60)
+    logger.info("SEGMENT PREVIEW")
+    logger.info("=" * 60)
+    print(json.dumps(segment, ensure_ascii=False, indent=2))
+    print(f"\n👥 Recipients: {size}")
+    if template.personalized:
+        print(f"🧩 Placeholders: {', '.join(sorted(template.fields))}")
+    print("\n📝 Message text:\n")
+    print(template.text)
+    print("\n" + "=" * 60 + "\n")
+
+
+def select_mode(logger: logging.Logger, size: int) -> str:
+    print("\n" + "=" * 60)
+    print("BROADCAST MODE")
+    print("=" * 60)
+    print(f"1. 🧪 TEST  — send only to admin ({ADMIN_USER_ID})")
+    print(f"2. 🚀 LIVE  — send to all {size} users in the segment")
+    print("=" * 60)
+    while True:
+        choice = input("\nSelect mode (1/2): ").strip()
+        if choice == "1":
+            logger.info("Mode: TEST")
+            return "test"
+        if choice == "2":
+            confirm = input(f"⚠️  Send to {size} users? (yes/no): ").strip().lower()
+            if confirm == "yes":
+                logger.info("Mode: LIVE")
+                return "live"
+            print("Cancelled.")
+        else:
+            print("Enter 1 or 2.")
+
+
+# ── Entry point ───────────────────────────────────────────────────────────────
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Broadcast to a JSON audience segment")
+    parser.add_argument("segment", type=Path)
+    parser.add_argument("message", type=Path, nargs="?")
+    parser.add_argument("--count", action="store_true", help="only print the segment size")
+    parser.add_argument(
+        "--processes", type=int, default=1, help="worker processes for a LIVE run (default 1)"
+    )
+    args = parser.parse_args()
+    if not args.count and args.message is None:
+        parser.error("message file is required unless --count is given")
+
+    logger = setup_logging()
+    segment = load_segment(args.segment)
+    where = compile_segment(segment)
+
+    started = time.perf_counter()
+    size = await KeysetAudience(get_session_factory(), where).count()
+    logger.info("Segment size: %d (counted in %.0f ms)", size, (time.perf_counter() - started) * 1000)
+    if args.count:
+        return
+
+    message = args.message.read_text(encoding="utf-8")
+    template = MessageTemplate(message)
+    preview(logger, segment, size, template)
+    if not size:
+        logger.warning("Segment is empty — aborting.")
+        return
+    mode = select_mode(logger, size)
+
+    config = load_config()
+    bot = Bot(token=config.tg_bot.token)
+
+    # Keyed on the segment and the message: re-running resumes the same run
+    run_key = make_run_key(args.segment.stem, json.dumps(segment, sort_keys=True), message)
+
+    try:
+        engine = BroadcastEngine(bot, log=logger)
+        if mode == "test":
+            personalized = PersonalizedMessage(get_session_factory(), template)
+            stats = await engine.run(personalized.recipients([ADMIN_USER_ID]), personalized.send)
+        elif args.processes > 1:
+            stats = await run_sharded(
+                run_key=run_key,
+                segment=segment,
+                text=message,
+                processes=args.processes,
+                log=logger,
+            )
+        else:
+            checkpoint = RunCheckpoint(get_session_factory(), run_key, keyset=True)
+            audience = KeysetAudience(get_session_factory(), where, checkpoint=checkpoint)
+            personalized = PersonalizedMessage(get_session_factory(), template, checkpoint=checkpoint)
+            stats = await engine.run(
+                personalized.recipients(audience),
+                personalized.send,
+                total=size,
+                checkpoint=checkpoint,
+                dead_sink=DeadRecipientSink(get_session_factory()),
+            )
+        logger.info("Done: %s", stats.as_dict())
+    finally:
+        await bot.session.close()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\nCancelled.")
+        sys.exit(0)
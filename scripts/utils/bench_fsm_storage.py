@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Сравнение FSM-хранилищ на синтетических контекстах диалогов.
+
+Варианты: стандартный RedisStorage (JSON), IndexedRedisStorage с json,
+msgpack и msgpack+zstd (если установлен zstandard), с --nats-url ещё
+NatsStorage (JetStream KV, msgpack). Для каждого — задержки
+set_data/get_data (p50/p95) и объём значений: в Redis MEMORY USAGE (при
+его отсутствии STRLEN), в NATS — байты потока бакета (history=1, чтобы
+считались только живые значения). Данные детерминированы (фиксированный
+seed): длинные ответы анкеты на русском, как в dialog_data волонтёрского
+отбора.
+
+Ключи Redis пишутся с префиксом fsmbench (индексы — fsm:index:0:*), в NATS —
+в бакеты fsmbench_*; всё удаляется по завершении. По умолчанию используется
+отдельная БД Redis 15, чтобы не задеть данные бота.
+
+Использование (из корня проекта; локально: redis-server, nats-server -js):
+    python scripts/utils/bench_fsm_storage.py [--redis-url redis://localhost:6379/15]
+        [--nats-url nats://localhost:4222] [--contexts 200] [--rounds 5] [--answer-chars 4000]
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, StorageKey
+from aiogram.fsm.storage.redis import RedisStorage
+from nats.js.errors import NotFoundError
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from app.infrastructure.storage.nats_connect import connect_to_nats
+from app.infrastructure.storage.storage.codec import FORMAT_JSON, FORMAT_MSGPACK, FsmCodec, zstandard
+from app.infrastructure.storage.storage.nats_storage import NatsStorage
+from app.infrastructure.storage.storage.redis_storage import IndexedRedisStorage
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+PREFIX = "fsmbench"
+NATS_STATES_BUCKET = "fsmbench_states"
+NATS_DATA_BUCKET = "fsmbench_data"
+BOT_ID = 0  # no real bot has it; the index sets (fsm:index:0:*) do not clash either
+SEED = 20240917
+
+_WORDS = (
+    "опыт волонтёрство мероприятие команда организация участники помощь "
+    "ответственность коммуникация университет форум проект задача решение "
+    "регистрация площадка гости программа расписание спикеры партнёры"
+).split()
+
+
+def make_contexts(count: int, answer_chars: int) -> list[dict]:
+    rnd = random.Random(SEED)
+
+    def text(chars: int) -> str:
+        words: list[str] = []
+        length = 0
+        while length < chars:
+            word = rnd.choice(_WORDS)
+            words.append(word)
+            length += len(word) + 1
+        return " ".join(words)[:chars]
+
+    contexts = []
+    for i in range(count):
+        contexts.append({
+            "intent_id": f"{rnd.getrandbits(48):012x}",
+            "stack_id": "",
+            "state": "VolunteerPart2SG:question_3",
+            "start_data": {"part": 2},
+            "dialog_data": {
+                "answers": {f"q{n}": text(answer_chars) for n in range(1, 4)},
+                "current_question": rnd.randint(1, 8),
+                "started_at": 1726500000 + i,
+                "user_id": 100000 + i,
+            },
+            "widget_data": {"consent": True},
+        })
+    return contexts
+
+
+def percentile(samples: list[float], q: float) -> float:
+    return statistics.quantiles(samples, n=100)[int(q) - 1] if len(samples) > 1 else samples[0]
+
+
+async def redis_bytes(redis: Redis, keys: list[str]) -> int:
+    total = 0
+    for key in keys:
+        try:
+            total += await redis.memory_usage(key) or 0
+        except ResponseError:
+            total += await redis.strlen(key)
+    return total
+
+
+def storage_keys(contexts: list[dict]) -> list[StorageKey]:
+    return [
+        StorageKey(bot_id=BOT_ID, chat_id=i + 1, user_id=i + 1, destiny=f"aiogd:context:{c['intent_id']}")
+        for i, c in enumerate(contexts)
+    ]
+
+
+async def run_variant(storage: BaseStorage, contexts: list[dict], rounds: int) -> dict:
+    keys = storage_keys(contexts)
+    set_times: list[float] = []
+    get_times: list[float] = []
+    for _ in range(rounds):
+        for key, data in zip(keys, contexts, strict=True):
+            started = time.perf_counter()
+            await storage.set_data(key, data)
+            set_times.append(time.perf_counter() - started)
+        for key, data in zip(keys, contexts, strict=True):
+            started = time.perf_counter()
+            loaded = await storage.get_data(key)
+            get_times.append(time.perf_counter() - started)
+            assert loaded == data, "round trip mismatch"
+    return {
+        "set_p50": percentile(set_times, 50) * 1000,
+        "set_p95": percentile(set_times, 95) * 1000,
+        "get_p50": percentile(get_times, 50) * 1000,
+        "get_p95": percentile(get_times, 95) * 1000,
+    }
+
+
+async def cleanup(redis: Redis) -> None:
+    for match in (f"{PREFIX}:*", f"fsm:index:{BOT_ID}:*"):
+        async for key in redis.scan_iter(match=match, count=1000):
+            await redis.delete(key)
+
+
+async def bench(redis: Redis, contexts: list[dict], rounds: int) -> list[tuple[str, dict]]:
+    key_builder = DefaultKeyBuilder(prefix=PREFIX, with_bot_id=True, with_destiny=True)
+    variants = [
+        ("RedisStorage json", RedisStorage(redis=redis, key_builder=key_builder)),
+        ("Indexed json", IndexedRedisStorage(redis=redis, key_builder=key_builder, codec=FsmCodec(FORMAT_JSON))),
+        ("Indexed msgpack", IndexedRedisStorage(redis=redis, key_builder=key_builder, codec=FsmCodec(FORMAT_MSGPACK))),
+    ]
+    if zstandard is not None:
+        variants.append((
+            "Indexed msgpack+zstd",
+            IndexedRedisStorage(
+                redis=redis,
+                key_builder=key_builder,
+                codec=FsmCodec(FORMAT_MSGPACK, compress_min_bytes=1024),
+            ),
+        ))
+    else:
+        logger.info("zstandard не установлен, вариант msgpack+zstd пропущен")
+
+    results = []
+    for name, storage in variants:
+        await cleanup(redis)
+        result = await run_variant(storage, contexts, rounds)
+        result["bytes"] = await redis_bytes(
+            redis, [storage.key_builder.build(key, "data") for key in storage_keys(contexts)]
+        )
+        results.append((name, result))
+    await cleanup(redis)
+    return results
+
+
+async def bench_nats(servers: list[str], contexts: list[dict], rounds: int) -> tuple[str, dict]:
+    nc, js = await connect_to_nats(servers)
+    try:
+        for bucket in (NATS_STATES_BUCKET, NATS_DATA_BUCKET):
+            try:
+                await js.delete_key_value(bucket)
+            except NotFoundError:
+                pass
+        storage = await NatsStorage(
+            nc,
+            js,
+            fsm_states_bucket=NATS_STATES_BUCKET,
+            fsm_data_bucket=NATS_DATA_BUCKET,
+            history=1,
+            codec=FsmCodec(FORMAT_MSGPACK),
+        ).create_storage()
+        result = await run_variant(storage, contexts, rounds)
+        result["bytes"] = (await js.stream_info(f"KV_{NATS_DATA_BUCKET}")).state.bytes
+        for bucket in (NATS_STATES_BUCKET, NATS_DATA_BUCKET):
+            await js.delete_key_value(bucket)
+    finally:
+        await nc.close()
+    return "NatsStorage msgpack", result
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк форматов FSM-хранилища")
+    parser.add_argument("--redis-url", default="redis://localhost:6379/15")
+    parser.add_argument("--nats-url", action="append", help="сервер NATS с JetStream; можно несколько")
+    parser.add_argument("--contexts", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--answer-chars", type=int, default=4000)
+    args = parser.parse_args()
+
+    contexts = make_contexts(args.contexts, args.answer_chars)
+    redis = Redis.from_url(args.redis_url)
+    try:
+        results = await bench(redis, contexts, args.rounds)
+    finally:
+        await redis.aclose()
+    if args.nats_url:
+        results.append(await bench_nats(args.nats_url, contexts, args.rounds))
+
+    base = results[0][1]["bytes"] or 1
+    print(f"{'variant':<24}{'set p50':>10}{'set p95':>10}{'get p50':>10}{'get p95':>10}{'KiB':>10}{'mem':>8}")
+    for name, r in results:
+        print(
+            f"{name:<24}{r['set_p50']:>8.3f}ms{r['set_p95']:>8.3f}ms"
+            f"{r['get_p50']:>8.3f}ms{r['get_p95']:>8.3f}ms"
+            f"{r['bytes'] / 1024:>10.1f}{100 * r['bytes'] / base:>7.0f}%"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Перекодирует FSM-данные (fsm:*:data) в формат из конфигурации
+(FSM_STORAGE_FORMAT, FSM_COMPRESS_MIN_BYTES).
+
+Переключение формата работает и без этого скрипта: старые записи читаются,
+а при следующем сохранении пишутся в новом формате. Скрипт делает это сразу
+для всех ключей, сохраняя TTL. Запись, изменённая ботом во время миграции,
+не перезаписывается (сравнение со старым значением в Lua). Повторный запуск
+безопасен; в обратную сторону (FSM_STORAGE_FORMAT=json) тоже работает.
+
+Использование (из корня проекта):
+    python scripts/utils/migrate_fsm_storage.py [--dry-run]
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+from redis.asyncio import Redis
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from config.config import load_config
+from app.infrastructure.storage.storage.codec import FsmCodec
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+BATCH = 500
+
+# Replace only if the bot has not changed the value since it was read
+_SWAP = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  redis.call('SET', KEYS[1], ARGV[2], 'KEEPTTL')
+  return 1
+end
+return 0
+"""
+
+
+async def migrate(redis: Redis, codec: FsmCodec, dry_run: bool) -> None:
+    swap = redis.register_script(_SWAP)
+    scanned = converted = skipped = 0
+    size_before = size_after = 0
+
+    async def flush(keys: list) -> None:
+        nonlocal converted, skipped, size_before, size_after
+        changed = []
+        for key, old in zip(keys, await redis.mget(keys), strict=True):
+            if old is None:
+                continue
+            new = codec.dumps(codec.loads(old))
+            size_before += len(old)
+            size_after += len(new)
+            if new != old:
+                changed.append((key, old, new))
+        if dry_run or not changed:
+            converted += len(changed)
+            return
+        async with redis.pipeline(transaction=False) as pipe:
+            for key, old, new in changed:
+                await swap(keys=[key], args=[old, new], client=pipe)
+            for done in await pipe.execute():
+                if done:
+                    converted += 1
+                else:
+                    skipped += 1
+
+    batch: list = []
+    async for key in redis.scan_iter(match="fsm:*:data", count=BATCH):
+        scanned += 1
+        batch.append(key)
+        if len(batch) >= BATCH:
+            await flush(batch)
+            batch = []
+    if batch:
+        await flush(batch)
+
+    logger.info(
+        "Ключей: %d, перекодировано: %d, изменены ботом во время миграции: %d",
+        scanned, converted, skipped,
+    )
+    if size_before:
+        logger.info(
+            "Размер значений: %.1f KiB -> %.1f KiB (%.0f%%)%s",
+            size_before / 1024, size_after / 1024, 100 * size_after / size_before,
+            " [dry run]" if dry_run else "",
+        )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Перекодирование FSM-данных в Redis")
+    parser.add_argument("--dry-run", action="store_true", help="только посчитать размеры")
+    args = parser.parse_args()
+
+    config = load_config()
+    codec = FsmCodec(config.storage.format, compress_min_bytes=config.storage.compress_min_bytes)
+    redis = Redis(
+        host=config.redis.host,
+        port=config.redis.port,
+        password=config.redis.password or None,
+    )
+    try:
+        logger.info(
+            "Целевой формат: %s, zstd от %s байт",
+            config.storage.format, config.storage.compress_min_bytes or "-",
+        )
+        await migrate(redis, codec, args.dry_run)
+    finally:
+        await redis.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
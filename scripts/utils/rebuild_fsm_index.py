@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Индексирует FSM-ключи, записанные до перехода на IndexedRedisStorage.
+
+Один полный SCAN по fsm:*; после него force-finish таймера volunteer part 2
+видит и старые диалоги. Повторный запуск безопасен.
+
+Использование (из корня проекта):
+    python scripts/utils/rebuild_fsm_index.py
+"""
+
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+from redis.asyncio import Redis
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from config.config import load_config
+from app.infrastructure.storage.storage.redis_storage import IndexedRedisStorage
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+async def main() -> None:
+    config = load_config()
+    redis = Redis(
+        host=config.redis.host,
+        port=config.redis.port,
+        password=config.redis.password or None,
+    )
+    try:
+        # TTLs as in bot.py: the index sets expire together with the keys
+        storage = IndexedRedisStorage(
+            redis=redis,
+            state_ttl=config.storage.state_ttl,
+            data_ttl=config.storage.data_ttl,
+        )
+        indexed = await storage.rebuild_index()
+        logger.info("✅ Проиндексировано ключей: %d", indexed)
+    finally:
+        await redis.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -18,11 +18,17 @@ from datetime import datetime
 from pathlib import Path
 
 from aiogram import Bot
-from aiogram.exceptions import TelegramForbiddenError, TelegramBadRequest, TelegramRetryAfter
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from app.infrastructure.database.sqlalchemy_core import get_session_factory
+from app.services.broadcast import (
+    BroadcastEngine,
+    DeadRecipientSink,
+    RunCheckpoint,
+    make_run_key,
+)
 from config.config import load_config
 
 # ── Config ────────────────────────────────────────────────────────────────────
@@ -129,57 +135,31 @@ async def send_broadcast(
     bot: Bot,
     user_ids: list[int],
     logger: logging.Logger,
+    *,
+    live: bool = False,
 ) -> dict:
     keyboard = create_keyboard()
-    stats = {"total": len(user_ids), "sent": 0, "blocked": 0, "errors": 0}
-
-    for idx, user_id in enumerate(user_ids, 1):
-        try:
-            await bot.send_message(
-                chat_id=user_id,
-                text=_MESSAGE_TEXT,
-                reply_markup=keyboard,
-                parse_mode="HTML",
-            )
-            stats["sent"] += 1
-            if idx % 10 == 0:
-                logger.info(
-                    "Progress: %d/%d sent=%d blocked=%d errors=%d",
-                    idx, stats["total"], stats["sent"], stats["blocked"], stats["errors"],
-                )
-            await asyncio.sleep(0.4)
-
-        except TelegramForbiddenError:
-            logger.warning("User %d blocked bot", user_id)
-            stats["blocked"] += 1
-
-        except TelegramBadRequest as e:
-            logger.warning("Bad request for user %d: %s", user_id, e)
-            if any(k in str(e).lower() for k in ("chat not found", "user not found", "blocked")):
-                stats["blocked"] += 1
-            else:
-                stats["errors"] += 1
-
-        except TelegramRetryAfter as e:
-            logger.warning("Rate limit — sleeping %ds", e.retry_after)
-            await asyncio.sleep(e.retry_after)
-            try:
-                await bot.send_message(
-                    chat_id=user_id,
-                    text=_MESSAGE_TEXT,
-                    reply_markup=keyboard,
-                    parse_mode="HTML",
-                )
-                stats["sent"] += 1
-            except Exception as retry_err:
-                logger.error("Retry failed for %d: %s", user_id, retry_err)
-                stats["errors"] += 1
-
-        except Exception as e:
-            logger.error("Unexpected error for user %d: %s", user_id, e)
-            stats["errors"] += 1
-
-    return stats
+
+    async def _send(bot: Bot, chat_id: int) -> None:
+        await bot.send_message(
+            chat_id=chat_id,
+            text=_MESSAGE_TEXT,
+            reply_markup=keyboard,
+            parse_mode="HTML",
+        )
+
+    # LIVE runs are checkpointed (re-running the script resumes where it
+    # stopped) and write unreachable chats back to users.is_alive
+    checkpoint = dead_sink = None
+    if live:
+        dead_sink = DeadRecipientSink(get_session_factory())
+        checkpoint = RunCheckpoint(
+            get_session_factory(), make_run_key(Path(__file__).stem, _MESSAGE_TEXT)
+        )
+
+    engine = BroadcastEngine(bot, log=logger)
+    stats = await engine.run(user_ids, _send, checkpoint=checkpoint, dead_sink=dead_sink)
+    return stats.as_dict()
 
 
 # ── Main ──────────────────────────────────────────────────────────────────────
@@ -204,7 +184,7 @@ async def main() -> None:
         user_ids = [ADMIN_USER_ID] if mode == "test" else all_ids
 
         logger.info("Sending to %d users...", len(user_ids))
-        stats = await send_broadcast(bot, user_ids, logger)
+        stats = await send_broadcast(bot, user_ids, logger, live=mode != "test")
 
         logger.info("=" * 60)
         logger.info("DONE  total=%d sent=%d blocked=%d errors=%d",